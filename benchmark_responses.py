@@ -0,0 +1,85 @@
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse as StdlibJSONResponse
+
+from common.custom_responses import JSONResponse
+from schemas.reply import Reply
+from schemas.topic import SingleTopic, Topic, ViewAllTopics
+
+CREATED_AT = datetime(2024, 11, 5, 18, 30, 15)
+
+
+def single_topic(replies: int) -> SingleTopic:
+    """
+    A topic with a full page of replies, as returned by GET /api/topics/{topic_id}.
+    """
+    topic = Topic(id=1, title="Benchmark topic", content="Content of the benchmark topic.",
+                  category_id=1, created_at=CREATED_AT, author_id=1)
+    all_replies = [Reply(id=reply_id, content=f"Reply number {reply_id} to the benchmark topic.", topic_id=1,
+                         created_at=CREATED_AT + timedelta(minutes=reply_id), author_id=reply_id % 50,
+                         vote_count=reply_id % 7)
+                   for reply_id in range(1, replies + 1)]
+
+    return SingleTopic(topic=topic, all_replies=all_replies)
+
+
+def topics_page(topics: int) -> list[ViewAllTopics]:
+    """
+    A full page of topics, as returned by GET /api/topics/.
+    """
+    return [ViewAllTopics(id=topic_id, title=f"Topic {topic_id}", is_locked=False, created_at=CREATED_AT,
+                          author_id=topic_id % 50, category_id=topic_id % 10, replies_count=topic_id,
+                          last_activity=CREATED_AT + timedelta(hours=topic_id), score=topic_id % 13,
+                          author_username=f"user{topic_id % 50}", category_title=f"Category {topic_id % 10}")
+            for topic_id in range(1, topics + 1)]
+
+
+def messages_page(messages: int) -> list[dict]:
+    """
+    A full page of conversation messages, as returned by GET /api/conversations/{receiver_id}.
+    """
+    return [{"id": message_id, "text": f"Message number {message_id}", "sender_id": message_id % 2 + 1,
+             "sent_at": CREATED_AT + timedelta(seconds=message_id)}
+            for message_id in range(1, messages + 1)]
+
+
+def stdlib_render(content) -> bytes:
+    # the previous path: FastAPI's jsonable_encoder, then Starlette's json.dumps based response
+    return StdlibJSONResponse(jsonable_encoder(content)).body
+
+
+def orjson_render(content) -> bytes:
+    return JSONResponse(content).body
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare the serialization time of the largest API responses")
+    parser.add_argument("--number", type=int, default=200, help="Serializations per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements; the fastest one is reported")
+    args = parser.parse_args(argv)
+
+    payloads = {
+        "GET /api/topics/{id} (500 replies)": single_topic(500),
+        "GET /api/topics/ (100 topics)": topics_page(100),
+        "GET /api/conversations/{id} (500 messages)": messages_page(500),
+    }
+
+    print(f"{'endpoint':<45}{'stdlib ms':>12}{'orjson ms':>12}{'speedup':>10}")
+    for name, payload in payloads.items():
+        if json.loads(stdlib_render(payload)) != json.loads(orjson_render(payload)):
+            raise SystemExit(f"{name}: the responses differ")
+
+        timings = []
+        for render in (stdlib_render, orjson_render):
+            best = min(timeit.repeat(lambda: render(payload), number=args.number, repeat=args.repeat))
+            timings.append(best / args.number * 1000)
+
+        print(f"{name:<45}{timings[0]:>12.3f}{timings[1]:>12.3f}{timings[0] / timings[1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
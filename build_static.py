@@ -0,0 +1,21 @@
+import argparse
+import logging
+
+from common.static_assets import STATIC_DIRECTORY, precompress
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Write the precompressed variants of the static files")
+    parser.add_argument("--directory", default=STATIC_DIRECTORY)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    written = precompress(args.directory)
+    logger.info("Wrote %s precompressed static files to %s", written, args.directory)
+
+
+if __name__ == "__main__":
+    main()
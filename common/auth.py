@@ -1,34 +1,181 @@
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
 from datetime import timedelta, datetime, timezone
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from dotenv import load_dotenv
+from common.ttl_cache import TTLCache
 from data.database import read_query
-from schemas.token import TokenData
+from schemas.token import TokenData, Principal
 
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 _SECRET_KEY = os.getenv("SECRET_KEY")
 _ALGORITHM = os.getenv("ALGORITHM")
 _ACCESS_TOKEN_EXPIRE = int(os.getenv("ACCESS_TOKEN_EXPIRE"))
+# every worker process has its own cache and only the worker that changes a user drops its entry,
+# so the TTL is how long the other workers keep honouring a revoked admin right
+_PRINCIPAL_CACHE_MAX_TTL = 5
+_PRINCIPAL_CACHE_TTL = min(float(os.getenv("PRINCIPAL_CACHE_TTL", _PRINCIPAL_CACHE_MAX_TTL)), _PRINCIPAL_CACHE_MAX_TTL)
+_PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+_PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 16))
+_PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
 
 
 pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='token')
 
+# user id -> Principal
+_principal_cache = TTLCache(_PRINCIPAL_CACHE_TTL)
+
+# bcrypt is CPU-bound, so it runs in worker processes instead of request threads.
+# At most workers + queue limit operations may be in flight; the rest are refused.
+_password_executor: ProcessPoolExecutor | None = None
+_password_executor_lock = threading.Lock()
+_password_slots = threading.BoundedSemaphore(max(_PASSWORD_HASH_WORKERS, 1) + _PASSWORD_HASH_QUEUE_LIMIT)
+_password_stats_lock = threading.Lock()
+_password_stats = {
+    operation: {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+    for operation in ("verify", "hash")
+}
+_password_stats["rejected"] = 0
+
 
 # utility funcs
 def verify_password(plain_password: str, hash_password: str):
-    return pwd_context.verify(plain_password, hash_password)
+    return _run_password_task("verify", _verify_in_worker, plain_password, hash_password)
 
 
 def get_password_hash(password: str):
+    return _run_password_task("hash", _hash_in_worker, password)
+
+
+def _verify_in_worker(plain_password: str, hash_password: str) -> bool:
+    return pwd_context.verify(plain_password, hash_password)
+
+
+def _hash_in_worker(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _get_password_executor() -> ProcessPoolExecutor | None:
+    global _password_executor
+    if _PASSWORD_HASH_WORKERS < 1:
+        return None
+
+    if _password_executor is None:
+        with _password_executor_lock:
+            if _password_executor is None:
+                # spawn, not fork: forking a process that runs request threads is unsafe
+                _password_executor = ProcessPoolExecutor(
+                    max_workers=_PASSWORD_HASH_WORKERS, mp_context=get_context("spawn"))
+
+    return _password_executor
+
+
+def _discard_password_executor(executor: ProcessPoolExecutor) -> None:
+    # a worker died; the next operation starts a new pool
+    global _password_executor
+    with _password_executor_lock:
+        if _password_executor is executor:
+            _password_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+    logger.error("Password hashing worker pool broke down and will be restarted")
+
+
+def _run_password_task(operation: str, func, *args):
+    """
+    Run a password hashing operation in the worker pool.
+
+    Parameters:
+        operation (str): "verify" or "hash", the key its timing is recorded under.
+        func: The module-level function executed in the worker process.
+        *args: Arguments passed to `func`.
+
+    Returns:
+        The result of `func`.
+
+    Raises:
+        HTTPException: 503 if too many operations are already queued, the operation
+        did not finish within PASSWORD_HASH_TIMEOUT seconds or a worker process died.
+    """
+    busy_exception = HTTPException(
+        status_code=503,
+        detail="Too many login attempts right now, please try again shortly",
+        headers={"Retry-After": "1"})
+
+    slots = _password_slots
+    if not slots.acquire(blocking=False):
+        with _password_stats_lock:
+            _password_stats["rejected"] += 1
+        raise busy_exception
+
+    started = time.perf_counter()
+    executor = None
+    release_slot = True
+    try:
+        executor = _get_password_executor()
+        if executor is None:
+            return func(*args)
+
+        future = executor.submit(func, *args)
+        # the slot is held until the job really ends, not until the caller stops waiting for it
+        future.add_done_callback(lambda _: slots.release())
+        release_slot = False
+
+        try:
+            return future.result(timeout=_PASSWORD_HASH_TIMEOUT)
+        except FutureTimeoutError:
+            # succeeds only while the job is still queued; a running job keeps its slot until it is done
+            future.cancel()
+            raise busy_exception
+
+    except BrokenProcessPool:
+        _discard_password_executor(executor)
+        raise busy_exception
+
+    finally:
+        if release_slot:
+            slots.release()
+        elapsed = time.perf_counter() - started
+        with _password_stats_lock:
+            stats = _password_stats[operation]
+            stats["count"] += 1
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+
+def password_hashing_stats() -> dict:
+    """
+    Return the timing metrics of password operations.
+
+    Returns:
+        dict: For "verify" and "hash", the number of operations and their total and
+        maximum duration (queueing included), plus the number of rejected operations.
+    """
+    with _password_stats_lock:
+        return {key: dict(value) if isinstance(value, dict) else value
+                for key, value in _password_stats.items()}
+
+
+def shutdown_password_executor() -> None:
+    global _password_executor
+    with _password_executor_lock:
+        if _password_executor is not None:
+            _password_executor.shutdown(cancel_futures=True)
+            _password_executor = None
+
+
 def authenticate_user(
         username: str,
         password: str):
@@ -60,7 +207,53 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+def get_principal(user_id: int | None) -> Principal | None:
+    """
+    Retrieve the id and admin flag of a user, served from an in-process cache.
+
+    Entries expire after PRINCIPAL_CACHE_TTL seconds, at most 5, and are dropped immediately by
+    `invalidate_principal` when the user changes. In a multi-process deployment the other
+    workers still use the old principal until their entry expires, so a demotion takes
+    effect everywhere within those few seconds.
+
+    Parameters:
+        user_id (int | None): The ID of the user.
+
+    Returns:
+        Principal | None: The user's principal, or None if the user does not exist.
+    """
+    if user_id is None:
+        return None
+
+    cached = _principal_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    query = "SELECT id, is_admin FROM users WHERE id = ?"
+    result = read_query(query, (user_id,))
+    if not result:
+        return None
+
+    principal = Principal.from_query_result(*result[0])
+    _principal_cache.set(user_id, principal)
+
+    return principal
+
+
+def invalidate_principal(user_id: int | None = None) -> None:
+    """
+    Drop a user's cached principal, or the whole cache when no user ID is given.
+
+    Parameters:
+        user_id (int | None): The ID of the user whose principal changed.
+    """
+    if user_id is None:
+        _principal_cache.clear()
+    else:
+        _principal_cache.invalidate(user_id)
+
+
+def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
     credential_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
@@ -77,12 +270,13 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credential_exception
 
-    query = "SELECT id FROM users WHERE id = ?"
-    user = read_query(query, (user_identifier,))
+    principal = get_principal(user_identifier)
 
-    if user is None:
+    if principal is None:
         raise credential_exception
 
-    return user[0][0]
+    return principal
 
 
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    return get_current_principal(token).id
@@ -0,0 +1,239 @@
+import gzip
+import os
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    # optional: without it responses are only gzip-compressed
+    brotli = None
+
+_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+# load average per CPU above which responses are compressed at the fastest level
+_BUSY_LOAD = float(os.getenv("COMPRESSION_BUSY_LOAD", 0.8))
+
+_FAST_LEVELS = {"br": 1, "gzip": 1}
+
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+# compressing server-sent events would hold them back until enough bytes are buffered
+_UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def is_compressible(content_type: str) -> bool:
+    """
+    Tell whether a response of the given content type is worth compressing.
+    """
+    return content_type.startswith(_COMPRESSIBLE_TYPES) and not content_type.startswith(_UNCOMPRESSED_TYPES)
+
+
+def accepted_encodings(accept_encoding: str) -> list[str]:
+    """
+    List the content codings a client accepts, most preferred first, leaving out those refused with q=0.
+
+    Parameters:
+        accept_encoding (str): The Accept-Encoding request header.
+
+    Returns:
+        list[str]: The lowercase coding names; brotli is preferred over gzip when the weights are equal.
+    """
+    weighted = []
+    for item in accept_encoding.split(","):
+        name, _, parameters = item.strip().partition(";")
+        weight = 1.0
+        if parameters.strip().startswith("q="):
+            try:
+                weight = float(parameters.strip()[2:])
+            except ValueError:
+                continue
+        if name and weight > 0:
+            weighted.append((weight, name.strip().lower() == "br", name.strip().lower()))
+
+    return [name for _, _, name in sorted(weighted, reverse=True)]
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """
+    Pick the coding a response is compressed with.
+
+    Parameters:
+        accept_encoding (str): The Accept-Encoding request header.
+
+    Returns:
+        str | None: "br" (only when the brotli package is installed), "gzip", or None to send the response as is.
+    """
+    for name in accepted_encodings(accept_encoding):
+        if name == "br" and brotli is not None:
+            return "br"
+        if name in ("gzip", "*"):
+            return "gzip"
+
+    return None
+
+
+_load = (0.0, False)
+
+
+def _is_busy() -> bool:
+    # read at most once a second; systems without a load average never count as busy
+    global _load
+    checked_at, busy = _load
+    now = time.monotonic()
+    if now - checked_at >= 1:
+        try:
+            busy = os.getloadavg()[0] / (os.cpu_count() or 1) >= _BUSY_LOAD
+        except (AttributeError, OSError):
+            busy = False
+        _load = (now, busy)
+
+    return busy
+
+
+class _Compressor:
+    def __init__(self, encoding: str, level: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self._encoding = encoding
+
+    def compress(self, data: bytes) -> bytes:
+        # flushed after every chunk, so a streamed response reaches the client as it is produced
+        if self._encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._encoding == "br":
+            return self._compressor.finish()
+
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compress dynamic responses with brotli or gzip, as negotiated with the client's Accept-Encoding header.
+    Responses smaller than `minimum_size`, responses that are already encoded and content types that do not
+    compress (images) are sent as they are. Streamed responses and responses sent while the CPUs are busy
+    are compressed at the fastest level, so compression never becomes the bottleneck.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = _MINIMUM_SIZE,
+                 gzip_level: int = _GZIP_LEVEL, brotli_quality: int = _BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "br": brotli_quality}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(send, encoding, self.minimum_size, self.levels,
+                                          headers.get("if-none-match", ""))
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int, levels: dict[str, int], if_none_match: str):
+        self._send = send
+        self._if_none_match = if_none_match
+        self._encoding = encoding
+        self._minimum_size = minimum_size
+        self._levels = levels
+        self._start: Message | None = None
+        self._compressor: _Compressor | None = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # held back until the first body chunk tells whether the response is worth compressing
+            self._start = message
+            return
+
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._compressor is None:
+            await self._start_response(body, more_body)
+            if self._passthrough:
+                await self._send(message)
+                return
+
+            if not more_body:
+                # already sent compressed in one piece
+                return
+
+        chunk = self._compressor.compress(body)
+        if not more_body:
+            chunk += self._compressor.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _start_response(self, body: bytes, more_body: bool) -> None:
+        headers = MutableHeaders(raw=self._start["headers"])
+
+        if not self._should_compress(headers, body, more_body):
+            # a 304 repeats the validator the client holds, which was weakened when its copy was compressed
+            if self._start["status"] == 304 and f"W/{headers.get('etag')}" in self._if_none_match:
+                self._weaken_etag(headers)
+            self._passthrough = True
+            await self._send(self._start)
+            return
+
+        headers["Content-Encoding"] = self._encoding
+        headers.add_vary_header("Accept-Encoding")
+        self._weaken_etag(headers)
+
+        level = _FAST_LEVELS[self._encoding] if more_body or _is_busy() else self._levels[self._encoding]
+
+        if not more_body:
+            compressed = compress(body, self._encoding, level)
+            headers["Content-Length"] = str(len(compressed))
+            await self._send(self._start)
+            await self._send({"type": "http.response.body", "body": compressed})
+            self._compressor = _Compressor(self._encoding, level)
+            return
+
+        del headers["Content-Length"]
+        self._compressor = _Compressor(self._encoding, level)
+        await self._send(self._start)
+
+    @staticmethod
+    def _weaken_etag(headers: MutableHeaders) -> None:
+        # the compressed bytes differ from the identity ones, so a strong validator can only stay as a weak one
+        etag = headers.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes, more_body: bool) -> bool:
+        if "content-encoding" in headers or self._start["status"] in (204, 304):
+            return False
+
+        if not is_compressible(headers.get("content-type", "")):
+            return False
+
+        return more_body or len(body) >= self._minimum_size
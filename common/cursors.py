@@ -0,0 +1,35 @@
+import base64
+import json
+
+
+def encode(payload: dict) -> str:
+    """
+    Encode a keyset position into an opaque, URL-safe cursor.
+
+    Parameters:
+        payload (dict): JSON-serializable values describing the position.
+
+    Returns:
+        str: The cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode(cursor: str) -> dict | None:
+    """
+    Decode a cursor produced by `encode`.
+
+    Parameters:
+        cursor (str): The opaque cursor received from the client.
+
+    Returns:
+        dict | None: The encoded payload, or None if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+    except ValueError:
+        return None
+
+    return payload if isinstance(payload, dict) else None
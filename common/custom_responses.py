@@ -1,5 +1,35 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
 from fastapi import Response
-from starlette.responses import JSONResponse
+from pydantic import BaseModel
+
+from common.http_cache import validator_headers
+
+
+def _serialize(value):
+    # called by orjson for the types it does not know; datetimes, dicts and lists are serialized natively
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True)
+    if isinstance(value, Decimal):
+        # aggregates such as SUM come back from the database as Decimal
+        return int(value) if value == value.to_integral_value() else float(value)
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JSONResponse(Response):
+    """
+    A JSON response serialized with orjson; the default response class of the app.
+    Pydantic models and service rows (dicts and lists holding datetimes) are serialized as they are,
+    so endpoints with large payloads return it directly to skip FastAPI's jsonable_encoder pass.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_serialize, option=orjson.OPT_NON_STR_KEYS)
+
 
 
 class BadRequest(JSONResponse):
@@ -48,4 +78,8 @@ class NoContent(Response):
 
 class InternalServerError(JSONResponse):
     def __init__(self, content=''):
-        super().__init__(status_code=500, content={"detail": "An unexpected error occurred"})
\ No newline at end of file
+        super().__init__(status_code=500, content={"detail": "An unexpected error occurred"})
+
+class NotModified(Response):
+    def __init__(self, etag: str, last_modified: int | None = None):
+        super().__init__(status_code=304, headers=validator_headers(etag, last_modified))
@@ -0,0 +1,94 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+
+class FragmentCache:
+    """
+    A thread-safe in-process LRU cache of rendered HTML fragments, bounded by the total length of the fragments.
+    Keys include the versions of the entities a fragment was rendered from, so a change makes the old
+    fragment unreachable instead of invalidating it; unreachable fragments are evicted as the least recently used.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._entries: OrderedDict = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key) -> str | None:
+        """
+        Return the cached fragment for a key and mark it as recently used, or None if it is missing.
+        """
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+
+            return fragment
+
+    def set(self, key, fragment: str) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._chars -= len(previous)
+
+            # a fragment larger than the whole cache would only evict everything else
+            if len(fragment) > self.max_chars:
+                return
+
+            self._entries[key] = fragment
+            self._chars += len(fragment)
+
+            while self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted)
+                self._evictions += 1
+
+    def get_or_render(self, key, render: Callable[[], str]) -> str:
+        """
+        Return the cached fragment for a key, rendering and caching it on a miss.
+
+        Parameters:
+            key: A hashable key covering everything the fragment depends on.
+            render (Callable[[], str]): Renders the fragment; exceptions propagate and nothing is cached.
+
+        Returns:
+            str: The fragment.
+        """
+        fragment = self.get(key)
+        if fragment is None:
+            fragment = render()
+            self.set(key, fragment)
+
+        return fragment
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "chars": self._chars,
+                "max_chars": self.max_chars,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+# shared by the web routers, so all pages compete for one memory budget
+fragment_cache = FragmentCache(int(os.getenv("FRAGMENT_CACHE_MAX_CHARS", 32_000_000)))
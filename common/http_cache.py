@@ -0,0 +1,85 @@
+import hashlib
+import json
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.requests import Request
+
+
+def make_etag(value) -> str:
+    """
+    Build a weak entity tag from a JSON-serializable value.
+
+    Parameters:
+        value: The value the response is generated from.
+
+    Returns:
+        str: The quoted, weak ETag.
+    """
+    digest = hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def make_version_etag(*parts) -> str:
+    """
+    Build a strong entity tag from version stamps (see `version_service.stamp`), without rendering the response.
+    The parts must cover everything else that selects the representation, e.g. the query parameters.
+
+    Parameters:
+        *parts: JSON-serializable values.
+
+    Returns:
+        str: The quoted, strong ETag.
+    """
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str, last_modified: int | None = None) -> bool:
+    """
+    Check whether the client's copy is still current, from its If-None-Match header or,
+    when it sends none, its If-Modified-Since header.
+    Tags are compared weakly, as RFC 9110 requires for If-None-Match.
+
+    Parameters:
+        request (Request): The incoming request.
+        etag (str): The ETag of the current representation.
+        last_modified (int | None): The UNIX time of the last change, None if it is unknown.
+
+    Returns:
+        bool: True if the client's copy is still current and a 304 can be sent.
+    """
+    header = request.headers.get("if-none-match")
+    if header:
+        if header.strip() == "*":
+            return True
+
+        current = etag.removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == current for tag in header.split(","))
+
+    since = request.headers.get("if-modified-since")
+    if not since or last_modified is None:
+        return False
+
+    try:
+        return last_modified <= parsedate_to_datetime(since).timestamp()
+    except (TypeError, ValueError):
+        # an invalid date is ignored (RFC 9110, 13.1.3)
+        return False
+
+
+def validator_headers(etag: str, last_modified: int | None = None) -> dict:
+    """
+    Build the headers that let a client revalidate its copy of a private response on every use.
+
+    Parameters:
+        etag (str): The ETag of the representation.
+        last_modified (int | None): The UNIX time of the last change, None if it is unknown.
+
+    Returns:
+        dict: The ETag, Last-Modified and Cache-Control headers.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+
+    return headers
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+_MAX_QUEUED_MESSAGES = int(os.getenv("MESSAGE_BUS_MAX_QUEUED", 100))
+_BROKER_CHANNEL_PREFIX = "forum:"
+
+
+class Subscription:
+    """
+    The messages published to one channel since subscribing, consumed from the event loop that subscribed.
+    A subscriber that falls behind loses its oldest queued messages instead of holding up publishers.
+    """
+
+    def __init__(self, bus: "InProcessBus", channel: str, max_queued: int):
+        self.channel = channel
+        self.dropped = 0
+        self._bus = bus
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(max_queued)
+
+    async def get(self, timeout: float | None = None) -> dict | None:
+        """
+        Wait for the next message.
+
+        Parameters:
+            timeout (float | None): The number of seconds to wait, or None to wait indefinitely.
+
+        Returns:
+            dict | None: The message, or None if the timeout expired first.
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._bus._unsubscribe(self)
+
+    def _deliver(self, message: dict) -> None:
+        # runs on the subscriber's event loop
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> dict:
+        return await self._queue.get()
+
+
+class InProcessBus:
+    """
+    Publish/subscribe between the request handlers of a single process.
+    `publish` may be called from any thread; messages are handed to each subscriber's event loop.
+    """
+
+    def __init__(self, max_queued: int = _MAX_QUEUED_MESSAGES):
+        self.max_queued = max_queued
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        """
+        Start receiving the messages published to a channel. Must be called from a running event loop.
+
+        Parameters:
+            channel (str): The channel name.
+
+        Returns:
+            Subscription: The subscription; close it when the client goes away.
+        """
+        subscription = Subscription(self, channel, self.max_queued)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+
+        return subscription
+
+    def publish(self, channel: str, message: dict) -> None:
+        """
+        Send a message to every current subscriber of a channel.
+
+        Parameters:
+            channel (str): The channel name.
+            message (dict): A JSON-serializable message.
+
+        Returns:
+            None
+        """
+        self._deliver_locally(channel, message)
+
+    def subscriber_count(self, channel: str | None = None) -> int:
+        with self._lock:
+            if channel is not None:
+                return len(self._subscriptions.get(channel, ()))
+
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def close(self) -> None:
+        with self._lock:
+            self._subscriptions.clear()
+
+    def _deliver_locally(self, channel: str, message: dict) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+
+        for subscription in subscriptions:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._deliver, message)
+            except RuntimeError:
+                # the subscriber's event loop is already closed
+                self._unsubscribe(subscription)
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+
+class BrokerBus(InProcessBus):
+    """
+    Publish/subscribe across several application nodes through a Redis-compatible broker.
+    Every node forwards the broker's messages to its own subscribers, so a message published
+    on one node reaches clients connected to any node. Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str, max_queued: int = _MAX_QUEUED_MESSAGES):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("MESSAGE_BUS_URL is set but the 'redis' package is not installed") from e
+
+        super().__init__(max_queued)
+        self._client = redis.Redis.from_url(url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(f"{_BROKER_CHANNEL_PREFIX}*")
+        self._listener = threading.Thread(target=self._listen, name="message-bus-listener", daemon=True)
+        self._listener.start()
+
+    def publish(self, channel: str, message: dict) -> None:
+        self._client.publish(_BROKER_CHANNEL_PREFIX + channel, json.dumps(message))
+
+    def close(self) -> None:
+        super().close()
+        self._pubsub.close()
+        self._client.close()
+
+    def _listen(self) -> None:
+        try:
+            for item in self._pubsub.listen():
+                if item["type"] != "pmessage":
+                    continue
+
+                channel = item["channel"].decode().removeprefix(_BROKER_CHANNEL_PREFIX)
+                self._deliver_locally(channel, json.loads(item["data"]))
+
+        except Exception:
+            logger.exception("Message bus listener stopped")
+
+
+_bus: InProcessBus | None = None
+_bus_lock = threading.Lock()
+
+
+def get_bus() -> InProcessBus:
+    """
+    Return the process-wide message bus, creating it on first use.
+    A BrokerBus is used when MESSAGE_BUS_URL is set, an InProcessBus otherwise.
+
+    Returns:
+        InProcessBus: The message bus.
+    """
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            url = os.getenv("MESSAGE_BUS_URL")
+            _bus = BrokerBus(url) if url else InProcessBus()
+
+        return _bus
+
+
+def close_bus() -> None:
+    global _bus
+    with _bus_lock:
+        if _bus is not None:
+            _bus.close()
+            _bus = None
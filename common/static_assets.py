@@ -0,0 +1,226 @@
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from common import compression
+
+STATIC_DIRECTORY = "static"
+STATIC_URL_PREFIX = "/static/"
+
+# precompressed variants are stored next to the original file, e.g. css/style.css.br
+VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_HASH_LENGTH = 12
+_HASH_CHUNK_SIZE = 64 * 1024
+_HASHED_NAME = re.compile(rf"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{{{_HASH_LENGTH}}})(?P<extension>\.[^./]+)$")
+
+
+def _is_compressible_file(path: str) -> bool:
+    media_type, encoding = mimetypes.guess_type(path)
+    return (encoding is None and media_type is not None and not path.endswith(".py")
+            and compression.is_compressible(media_type))
+
+
+class StaticAssets:
+    """
+    Content hashes of the files in a static directory. A file is linked as `name.<hash>.ext`,
+    so the URL changes whenever the content does and browsers may cache every URL forever.
+    Hashes are computed on first use and recomputed when a file's size or modification time changes.
+    """
+
+    def __init__(self, directory: str, url_prefix: str = STATIC_URL_PREFIX):
+        self.directory = directory
+        self._real_directory = os.path.realpath(directory)
+        self.url_prefix = url_prefix
+        self._digests: dict[str, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def digest(self, path: str) -> str | None:
+        """
+        Return the content hash of a static file, or None if there is no such file in the static directory.
+
+        Parameters:
+            path (str): The path of the file relative to the static directory, e.g. "css/style.css".
+
+        Returns:
+            str | None: The first characters of the SHA-256 of the file content.
+        """
+        # the path comes from the request URL: nothing outside the static directory is opened or cached
+        full_path = os.path.realpath(os.path.join(self._real_directory, path))
+        if os.path.commonpath([full_path, self._real_directory]) != self._real_directory:
+            return None
+
+        try:
+            stat_result = os.stat(full_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+
+        with self._lock:
+            cached = self._digests.get(full_path)
+        if cached is not None and cached[:2] == (stat_result.st_mtime_ns, stat_result.st_size):
+            return cached[2]
+
+        sha256 = hashlib.sha256()
+        with open(full_path, "rb") as file:
+            while chunk := file.read(_HASH_CHUNK_SIZE):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()[:_HASH_LENGTH]
+
+        with self._lock:
+            self._digests[full_path] = (stat_result.st_mtime_ns, stat_result.st_size, digest)
+
+        return digest
+
+    def url(self, path: str) -> str:
+        """
+        Build the content-hashed URL of a static file; used as `static_url` in the templates.
+
+        Parameters:
+            path (str): The path of the file relative to the static directory, e.g. "css/style.css".
+
+        Returns:
+            str: The URL, e.g. "/static/css/style.0123456789ab.css"; the plain URL if the file does not exist.
+        """
+        digest = self.digest(path)
+        if digest is None:
+            return self.url_prefix + path
+
+        stem, extension = os.path.splitext(path)
+        return f"{self.url_prefix}{stem}.{digest}{extension}"
+
+    def resolve(self, path: str) -> tuple[str, bool]:
+        """
+        Map a requested path to the file it names.
+
+        Parameters:
+            path (str): The requested path relative to the static directory.
+
+        Returns:
+            tuple[str, bool]: The path of the file and whether the request named its current content hash,
+            so the response may be cached forever. A hashed URL of an older version serves the current file
+            without the long-lived caching.
+        """
+        match = _HASHED_NAME.match(path)
+        if match is None:
+            return path, False
+
+        original = match["stem"] + match["extension"]
+        digest = self.digest(original)
+        if digest is None:
+            # not a hashed name after all, e.g. a file with a hex word in its name
+            return path, False
+
+        return original, digest == match["digest"]
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Static files served with the `.br` or `.gz` variant written by build_static.py when the client accepts it,
+    so static files are never compressed per request. Content-hashed URLs are cached as immutable;
+    plain URLs are revalidated with the ETag and Last-Modified headers of the file.
+    """
+
+    def __init__(self, *, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.assets = StaticAssets(directory)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        path, immutable = await anyio.to_thread.run_sync(self.assets.resolve, path)
+
+        response = None
+        if scope["method"] in ("GET", "HEAD") and _is_compressible_file(path):
+            response = await anyio.to_thread.run_sync(self._variant_response, path, scope)
+
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if _is_compressible_file(path):
+            response.headers.add_vary_header("Accept-Encoding")
+        response.headers["Cache-Control"] = IMMUTABLE if immutable else REVALIDATE
+
+        return response
+
+    def _variant_response(self, path: str, scope: Scope) -> Response | None:
+        _, original_stat = self.lookup_path(path)
+        if original_stat is None:
+            return None
+
+        for encoding in compression.accepted_encodings(Headers(scope=scope).get("accept-encoding", "")):
+            suffix = VARIANT_SUFFIXES.get(encoding)
+            if suffix is None:
+                continue
+
+            full_path, stat_result = self.lookup_path(path + suffix)
+            # a variant older than its original was built from a previous version of the file
+            if stat_result is None or stat_result.st_mtime_ns < original_stat.st_mtime_ns:
+                continue
+
+            response = FileResponse(full_path, stat_result=stat_result,
+                                    media_type=mimetypes.guess_type(path)[0],
+                                    headers={"Content-Encoding": encoding})
+            if self.is_not_modified(response.headers, Headers(scope=scope)):
+                return NotModifiedResponse(response.headers)
+
+            return response
+
+        return None
+
+
+def precompress(directory: str = STATIC_DIRECTORY) -> int:
+    """
+    Write the `.gz` variant, and the `.br` variant when the brotli package is installed,
+    of every compressible file in a static directory, at the highest compression levels.
+    Variants that would not be smaller than their original are removed instead.
+
+    Parameters:
+        directory (str): The static directory.
+
+    Returns:
+        int: The number of variants written.
+    """
+    encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+    written = 0
+
+    for root, directories, files in os.walk(directory):
+        directories[:] = [name for name in directories if name != "__pycache__"]
+
+        for name in files:
+            path = os.path.join(root, name)
+            if not _is_compressible_file(path):
+                continue
+
+            with open(path, "rb") as file:
+                content = file.read()
+
+            for encoding in encodings:
+                variant_path = path + VARIANT_SUFFIXES[encoding]
+                compressed = compression.compress(content, encoding, 11 if encoding == "br" else 9)
+
+                if len(compressed) >= len(content):
+                    if os.path.exists(variant_path):
+                        os.remove(variant_path)
+                    continue
+
+                with open(variant_path, "wb") as variant:
+                    variant.write(compressed)
+                written += 1
+
+    return written
+
+
+assets = StaticAssets(STATIC_DIRECTORY)
+static_url = assets.url
@@ -0,0 +1,14 @@
+from starlette.templating import Jinja2Templates
+
+from common.static_assets import static_url
+
+
+def create_templates(directory: str = "templates") -> Jinja2Templates:
+    """
+    Create the Jinja2 templates of a web router, with `static_url` available in every template,
+    so pages link static files by their content-hashed URLs.
+    """
+    templates = Jinja2Templates(directory=directory)
+    templates.env.globals["static_url"] = static_url
+
+    return templates
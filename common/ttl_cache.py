@@ -0,0 +1,51 @@
+import threading
+import time
+
+
+class TTLCache:
+    """
+    A thread-safe in-process cache whose entries expire a fixed number of seconds after being stored.
+    When full, expired entries are dropped first and then the oldest half.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached value for a key, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+
+        return entry[1]
+
+    def set(self, key, value) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_size:
+                self._evict(now)
+            self._entries[key] = (now + self.ttl, value)
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self, now: float) -> None:
+        # caller holds self._lock
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+
+        # still full: drop the oldest half (dicts keep insertion order)
+        if len(self._entries) >= self.max_size:
+            for key in list(self._entries)[:self.max_size // 2]:
+                del self._entries[key]
@@ -1,12 +1,33 @@
 import os
-from mariadb import connect
+import logging
+import anyio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from mariadb import connect, Error as MariaDBError
 from mariadb.connections import Connection
 from dotenv import load_dotenv
 
 load_dotenv() #if there is a problem
 
+logger = logging.getLogger(__name__)
 
-def _get_connection() -> Connection:
+_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 2))
+_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 20))
+_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', 300))
+_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', 5))
+# threads reserved for committing request transactions and returning their connections
+_FINISH_THREADS = int(os.getenv('DB_FINISH_THREADS', 4))
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the wait timeout."""
+
+
+def _connect() -> Connection:
     return connect(
         user=os.getenv('DB_USER'),
         password=os.getenv('DB_PASSWORD'),
@@ -16,6 +37,447 @@ def _get_connection() -> Connection:
     )
 
 
+class ConnectionPool:
+    """
+    A thread-safe pool of MariaDB connections.
+
+    `min_size` connections are opened when the pool is created, the rest lazily up to
+    `max_size`. They are kept open between requests and
+    handed out in LIFO order so the warmest connection is reused first. Connections
+    idle for longer than `max_idle` seconds are closed, as long as at least
+    `min_size` connections remain open. A connection that was idle for longer than
+    `ping_after` seconds is pinged before being handed out and replaced if it is dead.
+    """
+
+    def __init__(self, min_size: int = _POOL_MIN_SIZE, max_size: int = _POOL_MAX_SIZE,
+                 max_idle: float = _POOL_MAX_IDLE, timeout: float = _POOL_TIMEOUT,
+                 ping_after: float = _POOL_PING_AFTER, connection_factory=_connect):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._connection_factory = connection_factory
+
+        self._idle = deque()  # (connection, returned_at)
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._stats = {
+            "created": 0,
+            "reaped": 0,
+            "failed_health_checks": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+        }
+
+        self._open_min_connections()
+
+    def acquire(self) -> Connection:
+        """
+        Check out a connection, waiting up to `timeout` seconds if the pool is exhausted.
+
+        Returns:
+            Connection: A healthy open connection.
+
+        Raises:
+            PoolTimeoutError: If no connection became available in time.
+        """
+        deadline = None
+        wait_started = None
+        reaped = []
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                reaped.extend(self._reap_idle())
+
+                if self._idle:
+                    connection, returned_at = self._idle.pop()
+                    break
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    connection, returned_at = None, None
+                    break
+
+                if wait_started is None:
+                    wait_started = time.monotonic()
+                    deadline = wait_started + self.timeout
+                    self._stats["waits"] += 1
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {self.timeout}s "
+                        f"(pool size {self.max_size})")
+
+                self._condition.wait(remaining)
+
+            if wait_started is not None:
+                waited = time.monotonic() - wait_started
+                self._stats["wait_time_total"] += waited
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+            self._stats["checkouts"] += 1
+
+        # network I/O happens outside the lock
+        for idle_connection in reaped:
+            self._close_connection(idle_connection)
+
+        if connection is not None and not self._is_healthy(connection, returned_at):
+            self._close_connection(connection)
+            connection = None
+
+        if connection is None:
+            try:
+                connection = self._connection_factory()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._stats["created"] += 1
+
+        return connection
+
+    def release(self, connection: Connection, discard: bool = False) -> None:
+        """
+        Return a connection to the pool.
+
+        Any open transaction is rolled back so the next user starts from a clean state.
+        If that fails, or `discard` is True, the connection is closed instead.
+
+        Parameters:
+            connection (Connection): The connection previously obtained from `acquire`.
+            discard (bool): Whether to close the connection instead of reusing it.
+        """
+        if not discard:
+            try:
+                connection.rollback()
+            except MariaDBError:
+                discard = True
+
+        with self._condition:
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+                connection = None
+            self._condition.notify()
+
+        if connection is not None:
+            self._close_connection(connection)
+
+    def close(self) -> None:
+        """
+        Close every idle connection and refuse further checkouts.
+        Connections currently checked out are closed when they are released.
+        """
+        with self._condition:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for connection in idle:
+            self._close_connection(connection)
+
+    def stats(self) -> dict:
+        """
+        Return a snapshot of the pool counters.
+
+        Returns:
+            dict: Pool size, idle/in-use connections and backpressure metrics
+            (number of checkouts that had to wait, total and max wait time, timeouts).
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+            stats["min_size"] = self.min_size
+            stats["max_size"] = self.max_size
+
+        return stats
+
+    def _open_min_connections(self) -> None:
+        # a database that is down at startup only delays the warm-up: later checkouts open connections lazily
+        for _ in range(self.min_size):
+            try:
+                connection = self._connection_factory()
+            except Exception:
+                logger.warning("Could not open the minimum number of pooled database connections", exc_info=True)
+                return
+            with self._condition:
+                self._size += 1
+                self._stats["created"] += 1
+                self._idle.append((connection, time.monotonic()))
+
+    def _reap_idle(self) -> list[Connection]:
+        # called with the lock held; the caller closes the returned connections after releasing it
+        # the oldest idle connections sit at the left end of the deque
+        now = time.monotonic()
+        reaped = []
+        while (self._idle and self._size > self.min_size
+               and now - self._idle[0][1] > self.max_idle):
+            connection, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats["reaped"] += 1
+            reaped.append(connection)
+
+        return reaped
+
+    def _is_healthy(self, connection: Connection, returned_at: float) -> bool:
+        if time.monotonic() - returned_at < self.ping_after:
+            return True
+        try:
+            connection.ping()
+            return True
+        except MariaDBError:
+            with self._condition:
+                self._stats["failed_health_checks"] += 1
+            logger.warning("Discarding dead pooled database connection")
+            return False
+
+    @staticmethod
+    def _close_connection(connection: Connection) -> None:
+        try:
+            connection.close()
+        except MariaDBError:
+            pass
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+
+class UnitOfWork:
+    """
+    A single connection and transaction shared by every query run while it is bound.
+
+    The connection is borrowed from the pool on first use, so a unit of work that never
+    touches the database costs nothing. Queries run inside it are not committed one by
+    one; `finish` commits (or rolls back) everything at once and returns the connection.
+    """
+
+    def __init__(self):
+        self._connection: Connection | None = None
+        self._finished = False
+        self._on_commit: list = []
+        # serializes queries issued concurrently from async code sharing this unit of work
+        self.lock = threading.RLock()
+
+    @property
+    def is_open(self) -> bool:
+        return not self._finished
+
+    @property
+    def has_connection(self) -> bool:
+        return self._connection is not None
+
+    @property
+    def connection(self) -> Connection:
+        if self._finished:
+            raise RuntimeError("Unit of work is already finished")
+        if self._connection is None:
+            self._connection = get_pool().acquire()
+
+        return self._connection
+
+    def finish(self, commit: bool = True) -> None:
+        """
+        Commit or roll back the transaction and return the connection to the pool.
+
+        Parameters:
+            commit (bool): True to commit the work done so far, False to roll it back.
+        """
+        if self._finished:
+            return
+        self._finished = True
+
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            discard = False
+            try:
+                if commit:
+                    connection.commit()
+                else:
+                    connection.rollback()
+            except MariaDBError:
+                discard = not _is_alive(connection)
+                raise
+            finally:
+                get_pool().release(connection, discard=discard)
+
+        callbacks, self._on_commit = self._on_commit, []
+        if commit:
+            _run_callbacks(callbacks)
+
+
+_current_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar("unit_of_work", default=None)
+
+
+def _active_unit_of_work() -> UnitOfWork | None:
+    uow = _current_unit_of_work.get()
+
+    return uow if uow is not None and uow.is_open else None
+
+
+def on_commit(callback) -> None:
+    """
+    Run a callback once the current unit of work is committed, or right away outside of one.
+    Used to drop cached data only after the change that made it stale is visible to others.
+    The callback is discarded if the unit of work is rolled back.
+
+    Parameters:
+        callback: A function taking no arguments.
+    """
+    uow = _active_unit_of_work()
+    if uow is None:
+        callback()
+    else:
+        uow._on_commit.append(callback)
+
+
+def _run_callbacks(callbacks: list) -> None:
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.exception("On-commit callback failed")
+
+
+@contextmanager
+def bind_unit_of_work():
+    """
+    Bind a fresh UnitOfWork to the current context without doing any I/O.
+    The caller is responsible for calling `finish` on the yielded object.
+    Used by the HTTP middleware, which finishes the unit of work in a worker thread.
+    """
+    uow = UnitOfWork()
+    token = _current_unit_of_work.set(uow)
+    try:
+        yield uow
+    finally:
+        _current_unit_of_work.reset(token)
+
+
+_finish_limiter: anyio.CapacityLimiter | None = None
+
+
+async def finish_unit_of_work(uow: UnitOfWork, commit: bool) -> None:
+    """
+    Finish a unit of work from async code.
+
+    The commit and the release of the connection run on a few threads of their own:
+    request handlers waiting for a pooled connection can fill every other worker thread,
+    and the release that would unblock them must not queue behind them.
+
+    Parameters:
+        uow (UnitOfWork): The unit of work to finish.
+        commit (bool): True to commit the work done, False to roll it back.
+    """
+    global _finish_limiter
+    if _finish_limiter is None:
+        # created lazily because a CapacityLimiter has to be built inside the event loop
+        _finish_limiter = anyio.CapacityLimiter(_FINISH_THREADS)
+
+    await anyio.to_thread.run_sync(uow.finish, commit, limiter=_finish_limiter)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Run the enclosed queries on one connection and commit them together.
+
+    If a unit of work is already active (e.g. the one opened for the current HTTP
+    request), the enclosed queries simply join it and are committed with it.
+    Otherwise a new one is started, committed on normal exit and rolled back if an
+    exception escapes.
+    """
+    if _active_unit_of_work() is not None:
+        yield
+        return
+
+    with bind_unit_of_work() as uow:
+        try:
+            yield
+        except BaseException:
+            uow.finish(commit=False)
+            raise
+        uow.finish(commit=True)
+
+
+@contextmanager
+def _get_connection():
+    uow = _active_unit_of_work()
+    if uow is not None:
+        with uow.lock:
+            yield uow.connection
+        return
+
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    except MariaDBError:
+        pool.release(conn, discard=not _is_alive(conn))
+        raise
+    except BaseException:
+        pool.release(conn)
+        raise
+    else:
+        pool.release(conn)
+
+
+def _commit(conn: Connection) -> None:
+    # inside a unit of work the commit happens once, when it finishes
+    if _active_unit_of_work() is None:
+        conn.commit()
+
+
+def _is_alive(conn: Connection) -> bool:
+    try:
+        conn.ping()
+        return True
+    except MariaDBError:
+        return False
+
+
 def read_query(sql, sql_params=()):
     with _get_connection() as conn:
         cursor = conn.cursor()
@@ -28,18 +490,55 @@ def insert_query(sql, sql_params=()):
     with _get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(sql, sql_params)
-        conn.commit()
+        _commit(conn)
 
         return cursor.lastrowid
 
 
 def update_query(sql, sql_params=()):
+    """
+    Run an UPDATE (or another data-changing) statement.
+
+    Returns:
+        int: The number of changed rows.
+    """
     with _get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(sql, sql_params)
-        conn.commit()
+        _commit(conn)
 
-        return True
+        return cursor.rowcount
+
+
+def upsert_query(sql, sql_params=()) -> int:
+    """
+    Run an INSERT ... ON DUPLICATE KEY UPDATE statement.
+
+    Returns:
+        int: The affected rows as MariaDB reports them for a single-row upsert:
+        1 if the row was inserted, 2 if an existing row was changed and 0 if it already held the values.
+    """
+    with _get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, sql_params)
+        _commit(conn)
+
+        return cursor.rowcount
+
+
+def execute_many(sql, sql_params_seq) -> int:
+    """
+    Run one statement for every parameter tuple in a single batch.
+
+    Returns:
+        int: The total number of affected rows.
+    """
+    with _get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(sql, sql_params_seq)
+        _commit(conn)
+
+        return cursor.rowcount
 
 
 def query_count(sql: str, sql_params=()) -> int:
@@ -48,12 +547,74 @@ def query_count(sql: str, sql_params=()) -> int:
         cursor.execute(sql, sql_params)
 
         return cursor.fetchone()[0]
-    
+
 
 def delete_query(sql, sql_params=()):
     with _get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(sql, sql_params)
-        conn.commit()
+        _commit(conn)
+
+        return cursor.rowcount
+
+
+# threads that may have to check out a connection, and threads of units of work that already hold one
+_db_limiters: dict[str, anyio.CapacityLimiter] = {}
+
+
+def _get_db_limiter(holds_connection: bool) -> anyio.CapacityLimiter:
+    # created lazily because a CapacityLimiter has to be built inside the event loop;
+    # sized from the settings, since creating the pool here would open connections on the event loop
+    name = "connected" if holds_connection else "acquiring"
+    if name not in _db_limiters:
+        _db_limiters[name] = anyio.CapacityLimiter(_POOL_MAX_SIZE)
+
+    return _db_limiters[name]
+
+
+async def run_in_db_thread(func, *args):
+    """
+    Run a blocking database call from async code.
+
+    The call runs in a worker thread taken from limiters reserved for database work, so it
+    neither blocks the event loop nor competes with sync endpoints for Starlette's shared
+    threadpool. Calls that may have to check out a connection share one limiter sized to the pool,
+    so no more threads wait on it than there are connections. Calls whose unit of work already
+    holds a connection use a second limiter: the threads blocked in `acquire` cannot take every
+    token and keep the requests that would release a connection from running their next query.
+
+    Parameters:
+        func: The blocking callable, e.g. a query helper or a service function.
+        *args: Positional arguments passed to `func`.
+
+    Returns:
+        The return value of `func`.
+    """
+    uow = _active_unit_of_work()
+    limiter = _get_db_limiter(uow is not None and uow.has_connection)
+
+    return await anyio.to_thread.run_sync(func, *args, limiter=limiter)
+
+
+async def read_query_async(sql, sql_params=()):
+    return await run_in_db_thread(read_query, sql, sql_params)
+
+
+async def insert_query_async(sql, sql_params=()):
+    return await run_in_db_thread(insert_query, sql, sql_params)
+
+
+async def update_query_async(sql, sql_params=()):
+    return await run_in_db_thread(update_query, sql, sql_params)
+
+
+async def upsert_query_async(sql, sql_params=()):
+    return await run_in_db_thread(upsert_query, sql, sql_params)
+
+
+async def query_count_async(sql: str, sql_params=()) -> int:
+    return await run_in_db_thread(query_count, sql, sql_params)
+
 
-        return cursor.rowcount
\ No newline at end of file
+async def delete_query_async(sql, sql_params=()):
+    return await run_in_db_thread(delete_query, sql, sql_params)
@@ -8,8 +8,12 @@ TRUNCATE TABLE topics;
 
 TRUNCATE TABLE category_accesses;
 
+TRUNCATE TABLE conversation_summaries;
+
 TRUNCATE TABLE conversations;
 
+TRUNCATE TABLE entity_versions;
+
 TRUNCATE TABLE messages;
 
 TRUNCATE TABLE categories;
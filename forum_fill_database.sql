@@ -108,7 +108,7 @@ UNLOCK TABLES;
 
 LOCK TABLES `replies` WRITE;
 /*!40000 ALTER TABLE `replies` DISABLE KEYS */;
-INSERT INTO `replies` VALUES
+INSERT INTO `replies` (`id`, `content`, `is_best_reply`, `created_at`, `topic_id`, `author_id`) VALUES
 (1,'I was working as a PA that night! The champagne thing is just the tip of the iceberg. Two of the contestants almost got into a physical fight over someone who was already eliminated!',1,'2020-06-16 02:15:33',1,5),
 (2,'My cousin works in production and showed me some footage. The eliminated contestant was actually hiding in the bushes trying to sneak back into the mansion that night!',0,'2020-06-17 13:20:45',1,8),
 (3,'The ex already recorded an interview spilling everything! They have screenshots of texts from just days before filming started. This tea is scalding hot!',1,'2021-03-01 09:45:22',2,3),
@@ -150,7 +150,7 @@ UNLOCK TABLES;
 
 LOCK TABLES `topics` WRITE;
 /*!40000 ALTER TABLE `topics` DISABLE KEYS */;
-INSERT INTO `topics` VALUES
+INSERT INTO `topics` (`id`, `title`, `content`, `is_locked`, `created_at`, `category_id`, `author_id`, `best_reply_id`) VALUES
 (1,'Midnight Pool Party Drama','The producers didnt show us everything from that wild pool party! Three contestants were caught sneaking champagne after hours. Sources say there was a secret midnight rendezvous that production had to break up. The camera crew is sitting on MAJOR tea!',0,'2020-06-15 23:45:12',1,4,1),
 (2,'Contestant Past Revealed','Looks like our frontrunner wasnt so honest about their dating history! Multiple sources confirmed they were engaged just months before filming. Their ex is ready to spill all the details. The bachelor/ette is apparently devastated after finding out!',0,'2021-02-28 14:30:45',1,7,3),
 (3,'Kitchen Alliance Exposed','Late night footage reveals a secret alliance formed in the kitchen during midnight snacks. Five houseguests have been plotting while everyone sleeps! They even created a secret hand signal to communicate during nominations. The other houseguests are completely clueless!',1,'2022-07-19 02:15:33',2,5,5),
@@ -344,6 +344,35 @@ INSERT INTO `votes` VALUES
 (143,1,32,9);
 /*!40000 ALTER TABLE `votes` ENABLE KEYS */;
 UNLOCK TABLES;
+
+--
+-- Reply counters of the topics above
+--
+
+UPDATE `topics` t
+LEFT JOIN (SELECT topic_id, COUNT(*) AS replies_count, MAX(created_at) AS last_reply_at
+           FROM `replies` GROUP BY topic_id) r ON r.topic_id = t.id
+SET t.replies_count = COALESCE(r.replies_count, 0), t.last_reply_at = r.last_reply_at;
+
+--
+-- Vote counters of the replies above
+--
+
+UPDATE `replies` r
+LEFT JOIN (SELECT reply_id, SUM(vote_type = 1) AS upvotes, SUM(vote_type = 0) AS downvotes
+           FROM `votes` GROUP BY reply_id) v ON v.reply_id = r.id
+SET r.upvotes = COALESCE(v.upvotes, 0), r.downvotes = COALESCE(v.downvotes, 0);
+
+--
+-- Inbox summaries of the conversations above
+--
+
+INSERT INTO `conversation_summaries` (user_id, conversation_id, other_user_id, last_message_id, last_sent_at, unread_count)
+SELECT p.user_id, p.conversation_id, p.other_user_id, m.id, m.sent_at, 0
+FROM (SELECT id AS conversation_id, user1_id AS user_id, user2_id AS other_user_id FROM `conversations`
+      UNION
+      SELECT id, user2_id, user1_id FROM `conversations`) p
+JOIN `messages` m ON m.id = (SELECT MAX(m2.id) FROM `messages` m2 WHERE m2.conversation_id = p.conversation_id);
 /*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;
 
 /*!40101 SET SQL_MODE=@OLD_SQL_MODE */;
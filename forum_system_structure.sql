@@ -57,6 +57,28 @@ CREATE TABLE `category_accesses` (
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1 COLLATE=latin1_swedish_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `conversation_summaries`
+--
+
+DROP TABLE IF EXISTS `conversation_summaries`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!40101 SET character_set_client = utf8 */;
+CREATE TABLE `conversation_summaries` (
+  `user_id` int(11) NOT NULL,
+  `conversation_id` int(11) NOT NULL,
+  `other_user_id` int(11) NOT NULL,
+  `last_message_id` int(11) NOT NULL,
+  `last_sent_at` datetime NOT NULL,
+  `unread_count` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`user_id`,`conversation_id`),
+  KEY `idx_conversation_summaries_inbox` (`user_id`,`last_sent_at`,`conversation_id`),
+  KEY `fk_conversation_summaries_conversations1_idx` (`conversation_id`),
+  CONSTRAINT `fk_conversation_summaries_conversations1` FOREIGN KEY (`conversation_id`) REFERENCES `conversations` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION,
+  CONSTRAINT `fk_conversation_summaries_users1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION
+) ENGINE=InnoDB DEFAULT CHARSET=latin1 COLLATE=latin1_swedish_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `conversations`
 --
@@ -70,13 +92,30 @@ CREATE TABLE `conversations` (
   `user2_id` int(11) NOT NULL,
   PRIMARY KEY (`id`,`user1_id`,`user2_id`),
   UNIQUE KEY `id_UNIQUE` (`id`),
-  KEY `fk_conversations_users1_idx` (`user1_id`),
+  UNIQUE KEY `uq_conversations_participants` (`user1_id`,`user2_id`),
   KEY `fk_conversations_users2_idx` (`user2_id`),
+  CONSTRAINT `chk_conversations_participants_order` CHECK (`user1_id` <= `user2_id`),
   CONSTRAINT `fk_conversations_users1` FOREIGN KEY (`user1_id`) REFERENCES `users` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION,
   CONSTRAINT `fk_conversations_users2` FOREIGN KEY (`user2_id`) REFERENCES `users` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1 COLLATE=latin1_swedish_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `entity_versions`
+--
+
+DROP TABLE IF EXISTS `entity_versions`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!40101 SET character_set_client = utf8 */;
+CREATE TABLE `entity_versions` (
+  `entity` varchar(20) NOT NULL,
+  `entity_id` int(11) NOT NULL,
+  `version` bigint(20) NOT NULL DEFAULT 1,
+  `updated_at` timestamp NOT NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`entity`,`entity_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1 COLLATE=latin1_swedish_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `messages`
 --
@@ -95,7 +134,7 @@ CREATE TABLE `messages` (
   UNIQUE KEY `id_UNIQUE` (`id`),
   KEY `fk_messages_users1_idx` (`sender_id`),
   KEY `fk_messages_users2_idx` (`receiver_id`),
-  KEY `fk_messages_conversations1_idx` (`conversation_id`),
+  KEY `idx_messages_conversation_history` (`conversation_id`,`id`),
   CONSTRAINT `fk_messages_conversations1` FOREIGN KEY (`conversation_id`) REFERENCES `conversations` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION,
   CONSTRAINT `fk_messages_users1` FOREIGN KEY (`sender_id`) REFERENCES `users` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION,
   CONSTRAINT `fk_messages_users2` FOREIGN KEY (`receiver_id`) REFERENCES `users` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION
@@ -116,10 +155,19 @@ CREATE TABLE `replies` (
   `created_at` datetime NOT NULL DEFAULT current_timestamp(),
   `topic_id` int(11) NOT NULL,
   `author_id` int(11) NOT NULL,
+  `upvotes` int(11) NOT NULL DEFAULT 0,
+  `downvotes` int(11) NOT NULL DEFAULT 0,
+  `score` int(11) GENERATED ALWAYS AS (`upvotes` - `downvotes`) STORED,
+  `version` int(11) NOT NULL DEFAULT 0,
+  `updated_at` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
   PRIMARY KEY (`id`,`topic_id`,`author_id`),
   UNIQUE KEY `id_UNIQUE` (`id`),
   KEY `fk_replies_topics1_idx` (`topic_id`),
   KEY `fk_replies_users1_idx` (`author_id`),
+  KEY `idx_replies_topic_id_created_at` (`topic_id`,`created_at`),
+  KEY `idx_replies_topic_id_score` (`topic_id`,`score`),
+  KEY `idx_replies_topic_id_version` (`topic_id`,`version`,`updated_at`),
+  FULLTEXT KEY `ft_replies_content` (`content`),
   CONSTRAINT `fk_replies_topics1` FOREIGN KEY (`topic_id`) REFERENCES `topics` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION,
   CONSTRAINT `fk_replies_users1` FOREIGN KEY (`author_id`) REFERENCES `users` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION
 ) ENGINE=InnoDB AUTO_INCREMENT=2 DEFAULT CHARSET=latin1 COLLATE=latin1_swedish_ci;
@@ -137,15 +185,25 @@ CREATE TABLE `topics` (
   `title` varchar(45) NOT NULL,
   `content` text NOT NULL,
   `is_locked` tinyint(1) NOT NULL DEFAULT 0,
+  `is_pinned` tinyint(1) NOT NULL DEFAULT 0,
   `created_at` datetime NOT NULL DEFAULT current_timestamp(),
   `category_id` int(11) NOT NULL,
   `author_id` int(11) NOT NULL,
   `best_reply_id` int(11) DEFAULT NULL,
+  `replies_count` int(11) NOT NULL DEFAULT 0,
+  `last_reply_at` datetime DEFAULT NULL,
+  `last_activity_at` datetime GENERATED ALWAYS AS (coalesce(`last_reply_at`,`created_at`)) STORED,
   PRIMARY KEY (`id`,`category_id`,`author_id`),
   UNIQUE KEY `id_UNIQUE` (`id`),
-  KEY `fk_topics_categories1_idx` (`category_id`),
+  KEY `idx_topics_category_created_at_id` (`category_id`,`created_at`,`id`),
+  KEY `idx_topics_category_last_activity_at_id` (`category_id`,`last_activity_at`,`id`),
+  KEY `idx_topics_category_pinned` (`category_id`,`is_pinned`),
   KEY `fk_topics_users1_idx` (`author_id`),
   KEY `fk_topics_replies1_idx` (`best_reply_id`),
+  KEY `idx_topics_created_at_id` (`created_at`,`id`),
+  KEY `idx_topics_replies_count_id` (`replies_count`,`id`),
+  KEY `idx_topics_last_activity_at_id` (`last_activity_at`,`id`),
+  FULLTEXT KEY `ft_topics_title_content` (`title`,`content`),
   CONSTRAINT `fk_topics_categories1` FOREIGN KEY (`category_id`) REFERENCES `categories` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION,
   CONSTRAINT `fk_topics_replies1` FOREIGN KEY (`best_reply_id`) REFERENCES `replies` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION,
   CONSTRAINT `fk_topics_users1` FOREIGN KEY (`author_id`) REFERENCES `users` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION
@@ -190,8 +248,9 @@ CREATE TABLE `votes` (
   `user_id` int(11) NOT NULL,
   PRIMARY KEY (`id`,`reply_id`,`user_id`),
   UNIQUE KEY `id_UNIQUE` (`id`),
-  KEY `fk_votes_replies1_idx` (`reply_id`),
+  UNIQUE KEY `uq_votes_reply_user` (`reply_id`,`user_id`),
   KEY `fk_votes_users1_idx` (`user_id`),
+  KEY `idx_votes_reply_id_vote_type` (`reply_id`,`vote_type`),
   CONSTRAINT `fk_votes_replies1` FOREIGN KEY (`reply_id`) REFERENCES `replies` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION,
   CONSTRAINT `fk_votes_users1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1 COLLATE=latin1_swedish_ci;
@@ -1,6 +1,10 @@
+import os
+from contextlib import asynccontextmanager
+
+import anyio
 import uvicorn
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request
+from starlette.concurrency import run_in_threadpool
 
 from routers.api.categories import categories_router as api_categories_router
 from routers.api.replies import replies_router as api_replies_router
@@ -10,8 +14,15 @@ from routers.api.users import users_router as api_users_router
 from routers.api.votes import votes_router as api_votes_router
 from routers.api.messages import messages_router as api_messages_router
 from routers.api.conversations import conversations_router as api_conversations_router
+from routers.api.search import search_router as api_search_router
 import logging
 
+from common import auth, message_bus
+from common.custom_responses import JSONResponse
+from common.compression import CompressionMiddleware
+from common.static_assets import PrecompressedStaticFiles
+from data import database
+from services import vote_service
 from routers.web.categories import categories_router
 from routers.web.conversations import conversations_router
 from routers.web.home import index_router
@@ -23,9 +34,48 @@ from routers.web.votes import votes_router
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
-app = FastAPI()
 
-app.mount('/static', StaticFiles(directory='static'), name='static')
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # worker threads shared by sync endpoints; async database calls use their own limiter
+    anyio.to_thread.current_default_thread_limiter().total_tokens = int(os.getenv("THREADPOOL_SIZE", 40))
+    await run_in_threadpool(vote_service.start_write_behind)
+    yield
+    await run_in_threadpool(vote_service.stop_write_behind)
+    message_bus.close_bus()
+    auth.shutdown_password_executor()
+    database.close_pool()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=JSONResponse)
+
+
+@app.middleware("http")
+async def unit_of_work(request: Request, call_next):
+    """
+    Run every query made while handling a request on one pooled connection and commit
+    them together once the handler is done. The transaction is rolled back if the
+    handler raises or answers with a 5xx status.
+    """
+    with database.bind_unit_of_work() as uow:
+        try:
+            response = await call_next(request)
+        except Exception:
+            if uow.has_connection:
+                await database.finish_unit_of_work(uow, False)
+            raise
+
+        if uow.has_connection:
+            await database.finish_unit_of_work(uow, response.status_code < 500)
+        else:
+            uow.finish()
+
+        return response
+
+# added last, so it wraps every response, including the static files
+app.add_middleware(CompressionMiddleware)
+
+app.mount('/static', PrecompressedStaticFiles(directory='static'), name='static')
 
 app.include_router(api_categories_router)
 app.include_router(api_topics_router)
@@ -35,6 +85,7 @@ app.include_router(api_votes_router)
 app.include_router(token_router)
 app.include_router(api_messages_router)
 app.include_router(api_conversations_router)
+app.include_router(api_search_router)
 
 
 # web routers
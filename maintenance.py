@@ -0,0 +1,79 @@
+import argparse
+import logging
+
+from data.database import close_pool
+from services import topic_service, vote_service
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_reply_counters(batch_size: int) -> int:
+    """
+    Recompute the denormalized reply counters of all topics, one batch of topics at a time.
+
+    Parameters:
+        batch_size (int): The number of topics recomputed per batch.
+
+    Returns:
+        int: The number of batches processed.
+    """
+    batches = 0
+    last_id = topic_service.recalculate_reply_counters(0, batch_size)
+
+    while last_id is not None:
+        batches += 1
+        logger.info("Reply counters recomputed up to topic ID %s", last_id)
+        last_id = topic_service.recalculate_reply_counters(last_id, batch_size)
+
+    return batches
+
+
+def reconcile_reply_votes(batch_size: int) -> int:
+    """
+    Detect and fix replies whose denormalized vote counters drifted from their votes.
+
+    Parameters:
+        batch_size (int): The number of replies checked per batch.
+
+    Returns:
+        int: The number of batches processed.
+    """
+    batches = 0
+    fixed = 0
+    last_id, drifted_ids = vote_service.reconcile_reply_counters(0, batch_size)
+
+    while last_id is not None:
+        batches += 1
+        fixed += len(drifted_ids)
+        if drifted_ids:
+            logger.warning("Vote counters drifted for reply IDs %s", drifted_ids)
+        last_id, drifted_ids = vote_service.reconcile_reply_counters(last_id, batch_size)
+
+    logger.info("Fixed the vote counters of %s replies", fixed)
+
+    return batches
+
+
+COMMANDS = {
+    "backfill-reply-counters": backfill_reply_counters,
+    "reconcile-reply-votes": reconcile_reply_votes,
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Forum database maintenance commands")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        batches = COMMANDS[args.command](args.batch_size)
+        logger.info("%s finished after %s batches", args.command, batches)
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+-- Indexes backing the server-side topic sorting in topic_service.get_all_topics.
+-- Already part of forum_system_structure.sql, apply to databases created before it.
+
+ALTER TABLE `topics`
+  ADD KEY `idx_topics_created_at_id` (`created_at`,`id`);
+
+ALTER TABLE `replies`
+  ADD KEY `idx_replies_topic_id_created_at` (`topic_id`,`created_at`);
+
+ALTER TABLE `votes`
+  ADD KEY `idx_votes_reply_id_vote_type` (`reply_id`,`vote_type`);
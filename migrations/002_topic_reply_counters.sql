@@ -0,0 +1,9 @@
+-- Denormalized reply counters on topics, maintained by reply_service.create.
+-- After applying, fill them with: python maintenance.py backfill-reply-counters
+
+ALTER TABLE `topics`
+  ADD COLUMN `replies_count` int(11) NOT NULL DEFAULT 0,
+  ADD COLUMN `last_reply_at` datetime DEFAULT NULL,
+  ADD COLUMN `last_activity_at` datetime GENERATED ALWAYS AS (coalesce(`last_reply_at`,`created_at`)) STORED,
+  ADD KEY `idx_topics_replies_count_id` (`replies_count`,`id`),
+  ADD KEY `idx_topics_last_activity_at_id` (`last_activity_at`,`id`);
@@ -0,0 +1,8 @@
+-- Denormalized vote counters on replies, maintained by vote_service.
+-- After applying, fill them with: python maintenance.py reconcile-reply-votes
+
+ALTER TABLE `replies`
+  ADD COLUMN `upvotes` int(11) NOT NULL DEFAULT 0,
+  ADD COLUMN `downvotes` int(11) NOT NULL DEFAULT 0,
+  ADD COLUMN `score` int(11) GENERATED ALWAYS AS (`upvotes` - `downvotes`) STORED,
+  ADD KEY `idx_replies_topic_id_score` (`topic_id`,`score`);
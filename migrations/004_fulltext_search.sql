@@ -0,0 +1,8 @@
+-- Full-text indexes used by search_service (GET /api/search).
+-- InnoDB keeps them up to date on every insert and update.
+
+ALTER TABLE `topics`
+  ADD FULLTEXT KEY `ft_topics_title_content` (`title`,`content`);
+
+ALTER TABLE `replies`
+  ADD FULLTEXT KEY `ft_replies_content` (`content`);
@@ -0,0 +1,24 @@
+-- Inbox read model, one row per conversation participant, maintained by message_service.create.
+
+CREATE TABLE `conversation_summaries` (
+  `user_id` int(11) NOT NULL,
+  `conversation_id` int(11) NOT NULL,
+  `other_user_id` int(11) NOT NULL,
+  `last_message_id` int(11) NOT NULL,
+  `last_sent_at` datetime NOT NULL,
+  `unread_count` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`user_id`,`conversation_id`),
+  KEY `idx_conversation_summaries_inbox` (`user_id`,`last_sent_at`,`conversation_id`),
+  KEY `fk_conversation_summaries_conversations1_idx` (`conversation_id`),
+  CONSTRAINT `fk_conversation_summaries_conversations1` FOREIGN KEY (`conversation_id`) REFERENCES `conversations` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION,
+  CONSTRAINT `fk_conversation_summaries_users1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE NO ACTION ON UPDATE NO ACTION
+) ENGINE=InnoDB DEFAULT CHARSET=latin1 COLLATE=latin1_swedish_ci;
+
+-- existing conversations start with nothing unread
+
+INSERT INTO `conversation_summaries` (user_id, conversation_id, other_user_id, last_message_id, last_sent_at, unread_count)
+SELECT p.user_id, p.conversation_id, p.other_user_id, m.id, m.sent_at, 0
+FROM (SELECT id AS conversation_id, user1_id AS user_id, user2_id AS other_user_id FROM `conversations`
+      UNION
+      SELECT id, user2_id, user1_id FROM `conversations`) p
+JOIN `messages` m ON m.id = (SELECT MAX(m2.id) FROM `messages` m2 WHERE m2.conversation_id = p.conversation_id);
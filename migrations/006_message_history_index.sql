@@ -0,0 +1,6 @@
+-- Message history pages are read by conversation in message ID order (keyset on m.id).
+-- The new index also covers the conversation foreign key, so the single-column one is dropped.
+
+ALTER TABLE `messages`
+  ADD KEY `idx_messages_conversation_history` (`conversation_id`,`id`),
+  DROP KEY `fk_messages_conversations1_idx`;
@@ -0,0 +1,49 @@
+-- Every conversation is stored once per participant pair, lowest user ID first,
+-- so message_service can look it up (or create it) with a single unique key probe.
+
+-- merge conversations that were created twice for the same pair into the oldest one
+
+CREATE TEMPORARY TABLE `conversation_duplicates` AS
+SELECT c.id, k.keeper_id
+FROM `conversations` c
+JOIN (SELECT LEAST(user1_id, user2_id) AS low_id, GREATEST(user1_id, user2_id) AS high_id, MIN(id) AS keeper_id
+      FROM `conversations`
+      GROUP BY low_id, high_id) k
+  ON LEAST(c.user1_id, c.user2_id) = k.low_id AND GREATEST(c.user1_id, c.user2_id) = k.high_id
+WHERE c.id <> k.keeper_id;
+
+UPDATE `messages` m
+JOIN `conversation_duplicates` d ON m.conversation_id = d.id
+SET m.conversation_id = d.keeper_id;
+
+INSERT INTO `conversation_summaries` (user_id, conversation_id, other_user_id, last_message_id, last_sent_at, unread_count)
+SELECT s.user_id, d.keeper_id, s.other_user_id, s.last_message_id, s.last_sent_at, s.unread_count
+FROM `conversation_summaries` s
+JOIN `conversation_duplicates` d ON s.conversation_id = d.id
+ON DUPLICATE KEY UPDATE
+  last_sent_at = IF(VALUES(last_message_id) > last_message_id, VALUES(last_sent_at), last_sent_at),
+  last_message_id = GREATEST(last_message_id, VALUES(last_message_id)),
+  unread_count = unread_count + VALUES(unread_count);
+
+DELETE s FROM `conversation_summaries` s JOIN `conversation_duplicates` d ON s.conversation_id = d.id;
+DELETE c FROM `conversations` c JOIN `conversation_duplicates` d ON c.id = d.id;
+
+DROP TEMPORARY TABLE `conversation_duplicates`;
+
+-- put the lower user ID first (copied aside, because SET assignments see earlier ones)
+
+CREATE TEMPORARY TABLE `conversation_swaps` AS
+SELECT id, user1_id, user2_id FROM `conversations` WHERE user1_id > user2_id;
+
+UPDATE `conversations` c
+JOIN `conversation_swaps` s ON c.id = s.id
+SET c.user1_id = s.user2_id, c.user2_id = s.user1_id;
+
+DROP TEMPORARY TABLE `conversation_swaps`;
+
+-- the unique key also serves the user1_id foreign key
+
+ALTER TABLE `conversations`
+  ADD UNIQUE KEY `uq_conversations_participants` (`user1_id`,`user2_id`),
+  DROP KEY `fk_conversations_users1_idx`,
+  ADD CONSTRAINT `chk_conversations_participants_order` CHECK (`user1_id` <= `user2_id`);
@@ -0,0 +1,16 @@
+-- One vote per user and reply, so vote_service.cast_vote can upsert it in a single statement.
+
+-- keep the latest of any duplicate votes
+DELETE v FROM `votes` v
+JOIN `votes` newer ON newer.reply_id = v.reply_id AND newer.user_id = v.user_id AND newer.id > v.id;
+
+-- the unique key also serves the reply foreign key
+ALTER TABLE `votes`
+  ADD UNIQUE KEY `uq_votes_reply_user` (`reply_id`,`user_id`),
+  DROP KEY `fk_votes_replies1_idx`;
+
+-- counters of replies that had duplicates are recomputed from the remaining votes
+UPDATE `replies` r
+LEFT JOIN (SELECT reply_id, SUM(vote_type = 1) AS upvotes, SUM(vote_type = 0) AS downvotes
+           FROM `votes` GROUP BY reply_id) v ON v.reply_id = r.id
+SET r.upvotes = COALESCE(v.upvotes, 0), r.downvotes = COALESCE(v.downvotes, 0);
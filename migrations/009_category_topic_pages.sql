@@ -0,0 +1,10 @@
+-- Pinned topics and the indexes behind the paginated topic listing of GET /api/categories/{category_id}.
+-- Each page is a range scan of one (category_id, sort column, id) index.
+-- The created_at index also serves the category foreign key, so the single-column one is dropped.
+
+ALTER TABLE `topics`
+  ADD COLUMN `is_pinned` tinyint(1) NOT NULL DEFAULT 0 AFTER `is_locked`,
+  ADD KEY `idx_topics_category_created_at_id` (`category_id`,`created_at`,`id`),
+  ADD KEY `idx_topics_category_last_activity_at_id` (`category_id`,`last_activity_at`,`id`),
+  ADD KEY `idx_topics_category_pinned` (`category_id`,`is_pinned`),
+  DROP KEY `fk_topics_categories1_idx`;
@@ -0,0 +1,11 @@
+-- Version counters of the entities the web pages are rendered from, bumped by the services in the
+-- same transaction as the change, so every application process sees a change at the same time.
+-- Rows are created on the first change; a missing row means version 0.
+
+CREATE TABLE `entity_versions` (
+  `entity` varchar(20) NOT NULL,
+  `entity_id` int(11) NOT NULL,
+  `version` bigint(20) NOT NULL DEFAULT 1,
+  `updated_at` timestamp NOT NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`entity`,`entity_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1 COLLATE=latin1_swedish_ci;
@@ -0,0 +1,7 @@
+-- Version of every reply, increased together with its vote counters. The version stamp of a topic
+-- is derived from the number of its replies and the sum of their versions, so votes no longer
+-- write to the topic's entity_versions row and votes on different replies never wait for each other.
+
+ALTER TABLE `replies`
+  ADD COLUMN `version` int(11) NOT NULL DEFAULT 0,
+  ADD KEY `idx_replies_topic_id_version` (`topic_id`,`version`);
@@ -0,0 +1,8 @@
+-- Time of the latest write to every reply, votes included, so a topic's Last-Modified header
+-- can be derived from its replies like its version stamp. The column joins the
+-- (topic_id, version) index, which keeps the stamp query on the index alone.
+
+ALTER TABLE `replies`
+  ADD COLUMN `updated_at` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  DROP KEY `idx_replies_topic_id_version`,
+  ADD KEY `idx_replies_topic_id_version` (`topic_id`,`version`,`updated_at`);
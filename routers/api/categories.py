@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, Query, Path
+from fastapi import APIRouter, Depends, Query, Path, Request, Response
 from schemas.category import Category, CreateCategoryRequest
-from services import category_service, user_service
+from services import category_service, user_service, version_service
 from common.auth import get_current_user
-from common.custom_responses import ForbiddenAccess, NotFound, OK, BadRequest, OnlyAdminAccess
+from common.custom_responses import ForbiddenAccess, NotFound, OK, BadRequest, OnlyAdminAccess, NotModified, JSONResponse
+from common.http_cache import make_version_etag, is_not_modified, validator_headers
+from data.database import run_in_db_thread
 from typing import Literal
 
 categories_router = APIRouter(prefix="/api/categories", tags=["Categories"])
 
 
 @categories_router.get("/")
-def get_all_categories(
+async def get_all_categories(
+    request: Request,
+    response: Response,
     search: str | None = Query(description="Search for categories by title", default=None),
     sort_by: Literal["title", "created_at"] | None = Query(description="Sort categories by title or created_at", default=None),
     sort: Literal["asc", "desc"] | None = Query(description="Sort categories asc or desc", default=None),
@@ -20,6 +24,7 @@ def get_all_categories(
     """
     View all categories based on optional search, sorting, and pagination parameters if the user
     has access to the categories. Params sort_by and sort must be included together or neither of them.
+    Supports conditional requests with If-None-Match and If-Modified-Since.
 
     Parameters:
         search (str | None): A string to filter categories by title. Defaults to None.
@@ -32,8 +37,8 @@ def get_all_categories(
         dependency.
 
     Returns:
-        Response: List of categories based on the provided parameters or BadRequest error messages
-        for invalid inputs.
+        Response: List of categories based on the provided parameters, BadRequest error messages
+        for invalid inputs or a 304 response if the list did not change.
     """
 
     # validation
@@ -57,37 +62,73 @@ def get_all_categories(
             content=f"Invalid value for offset: {offset}. Valid values are: int >= 0"
         )
 
-    return category_service.get_categories(
-        search, sort, sort_by, limit, offset, current_user_id
+    # the list changes with the categories and with what the user may see
+    version, last_modified = await run_in_db_thread(
+        version_service.stamp_with_last_modified, (version_service.CATEGORIES, 0),
+        (version_service.ACCESS, current_user_id))
+    etag = make_version_etag(version, search, sort_by, sort, limit, offset)
+    if is_not_modified(request, etag, last_modified):
+        return NotModified(etag, last_modified)
+
+    response.headers.update(validator_headers(etag, last_modified))
+
+    categories = await run_in_db_thread(
+        category_service.get_categories, search, sort, sort_by, limit, offset, current_user_id
     )
 
+    return JSONResponse(categories, headers=response.headers)
+
 
 @categories_router.get("/{category_id}")
-def get_category_by_id(category_id: int = Path(description="ID of the category to retrieve"), 
-                       current_user_id: int = Depends(get_current_user)):
+async def get_category_by_id(response: Response,
+                             category_id: int = Path(description="ID of the category to retrieve"),
+                             limit: int = Query(20, ge=1, le=100, description="Limit the number of topics returned"),
+                             cursor: str | None = Query(None, description="Cursor of the page to retrieve, taken "
+                                                                          "from the X-Next-Cursor header of a "
+                                                                          "previous page"),
+                             sort: Literal["newest", "active"] = Query("newest", description="Order topics by "
+                                                                                             "creation time or "
+                                                                                             "last activity"),
+                             pinned_first: bool = Query(True, description="List pinned topics first"),
+                             current_user_id: int = Depends(get_current_user)):
     """
-    View a specific category by its ID, including its associated topics if the user
-    has access to the category.
+    View a specific category by its ID, including one page of its topics if the user
+    has access to the category. The cursor of the next page is returned in the X-Next-Cursor header.
 
     Parameters:
+        response (Response): The outgoing response, used to set the X-Next-Cursor header.
         category_id (int): The ID of the category to retrieve.
+        limit (int): Limit the number of topics returned.
+        cursor (str | None): Cursor of the page to retrieve.
+        sort (Literal["newest", "active"]): Order topics by creation time or last activity, newest first.
+        pinned_first (bool): List the pinned topics on top of the first page.
         current_user_id (int): The ID of the currently authenticated user, provided by the 
         authentication dependency.
 
     Returns:
-        Response: All category details along with associated topics or ForbiddenAccess
-        if access is not granted or NotFound if category with this ID is not found. 
+        Response: All category details along with a page of its topics, BadRequest if the cursor
+        is invalid, ForbiddenAccess if access is not granted or NotFound if category with this ID is not found.
     """
+    decoded_cursor = None
+    if cursor is not None:
+        decoded_cursor = category_service.decode_topics_cursor(cursor)
+        if decoded_cursor is None or decoded_cursor["sort"] != sort:
+            return BadRequest("Invalid cursor")
 
-    category = category_service.get_by_id(category_id)
+    category = await run_in_db_thread(category_service.get_by_id, category_id)
     if category is None:
         return NotFound("Category")
     if category.is_private:
-        if not category_service.validate_user_access(current_user_id, category_id):
+        if not await run_in_db_thread(category_service.validate_user_access, current_user_id, category_id):
             return ForbiddenAccess()
 
-    return category_service.get_by_id_with_topics(category)
-     
+    single_category, next_cursor = await run_in_db_thread(
+        category_service.get_by_id_with_topics, category, limit, decoded_cursor, sort, pinned_first)
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return JSONResponse(single_category, headers=response.headers)
 
 
 @categories_router.post("/", status_code=201)
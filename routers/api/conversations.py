@@ -1,59 +1,252 @@
+import json
+import os
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query, HTTPException
-from starlette.responses import Response
+import anyio
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, WebSocket, status
+from fastapi.security.utils import get_authorization_scheme_param
+from starlette.responses import Response, StreamingResponse
 
+from common import message_bus
 from common.auth import get_current_user
-from common.custom_responses import NotFound
-from services import message_service, user_service, conversation_service
+from common.custom_responses import NotFound, BadRequest, NoContent, NotModified, Unauthorized, JSONResponse
+from common.http_cache import make_etag, make_version_etag, is_not_modified, validator_headers
+from data.database import run_in_db_thread
+from services import message_service, user_service, conversation_service, version_service
 
 conversations_router = APIRouter(prefix="/api/conversations", tags=["Conversations"])
 
+# idle live connections get a keep-alive this often, so proxies do not close them
+_LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_MESSAGES_HEARTBEAT", 15))
+
+
+@conversations_router.websocket("/live")
+async def live_messages_socket(websocket: WebSocket):
+    """
+    Push the current user's new messages, sent and received, over a WebSocket as JSON objects.
+    Browsers cannot set headers on WebSockets, so the token is read from the `token` query parameter or cookie.
+
+    Parameters:
+        websocket (WebSocket): The WebSocket connection.
+
+    Returns:
+        None
+    """
+    current_user_id = await _get_user_id(websocket.query_params.get("token") or websocket.cookies.get("token"))
+    if current_user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # subscribe before accepting, so no message sent after the handshake is missed
+    with message_bus.get_bus().subscribe(message_service.user_channel(current_user_id)) as subscription:
+        await websocket.accept()
+
+        async def forward_messages():
+            while True:
+                message = await subscription.get(_LIVE_HEARTBEAT_SECONDS)
+                if message is None:
+                    await websocket.send_json({"type": "keep-alive"})
+                else:
+                    await websocket.send_json(message)
+
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(forward_messages)
+
+            # clients do not send anything; reading only notices when they disconnect
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+
+            task_group.cancel_scope.cancel()
+
+
+@conversations_router.get("/live")
+async def live_messages_stream(request: Request):
+    """
+    Push the current user's new messages, sent and received, as server-sent events.
+    This is the fallback for clients that cannot use the WebSocket at the same path.
+    The token is read from the Authorization header or, for EventSource clients, from the `token` cookie.
+
+    Parameters:
+        request (Request): The incoming request.
+
+    Returns:
+        Response: An event stream with one `message` event per message,
+        or an Unauthorized response if the token is missing or invalid.
+    """
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    if scheme.lower() != "bearer":
+        token = request.cookies.get("token")
+
+    current_user_id = await _get_user_id(token)
+    if current_user_id is None:
+        return Unauthorized("Could not validate credentials")
+
+    return StreamingResponse(_message_events(current_user_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@conversations_router.get("/count")
+def view_conversations_count(request: Request,
+                             response: Response,
+                             current_user_id: int = Depends(get_current_user)):
+    """
+    Count the conversations of the current user and how many of them have unread messages.
+    The response carries an ETag; a request whose If-None-Match matches it gets 304 Not Modified.
+
+    Parameters:
+        request (Request): The incoming request.
+        response (Response): The outgoing response, used to set the caching headers.
+        current_user_id (int): The ID of the current user (retrieved from the authentication dependency).
+
+    Returns:
+        Response: The conversation and unread conversation counts, or a 304 response if they did not change.
+    """
+    counts = conversation_service.get_inbox_counts(current_user_id)
+
+    etag = make_etag({"user_id": current_user_id, **counts})
+    if is_not_modified(request, etag):
+        return NotModified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+    return counts
+
 
 @conversations_router.get("/{receiver_id}")
-def view_conversation(receiver_id: int,
-                      order: Optional[str] = Query("asc", pattern="^(asc|desc)$"),
-                      current_user_id: int = Depends(get_current_user)):
+async def view_conversation(receiver_id: int,
+                            response: Response,
+                            order: Optional[str] = Query("asc", pattern="^(asc|desc)$"),
+                            limit: int = Query(50, ge=1, le=500, description="Limit the number of messages returned"),
+                            before: Optional[int] = Query(None, description="Only return messages older than this "
+                                                                            "message ID, taken from X-Before-Id"),
+                            after: Optional[int] = Query(None, description="Only return messages newer than this "
+                                                                           "message ID"),
+                            since: Optional[int] = Query(None, description="Incremental refresh: only return messages "
+                                                                           "newer than this message ID, taken from "
+                                                                           "X-Last-Id, or 204 if there are none"),
+                            current_user_id: int = Depends(get_current_user)):
     """
-    View a conversation between the current user and the specified receiver.
+    View a conversation between the current user and the specified receiver, one page of messages at a time.
+    Without cursors the newest messages are returned. The X-Before-Id header holds the cursor of the older
+    messages, if there are any, and X-Last-Id the ID of the newest message returned, for a later `since` refresh.
 
     Parameters:
         receiver_id (int): The ID of the receiver.
+        response (Response): The outgoing response, used to set the cursor headers.
         order (Optional[str]): The order in which to sort the messages (asc or desc).
+        limit (int): Limit the number of messages returned.
+        before (Optional[int]): Only return messages older than this message ID.
+        after (Optional[int]): Only return messages newer than this message ID.
+        since (Optional[int]): Only return messages newer than this message ID, or nothing if there are none.
         current_user_id (int): The ID of the current user (retrieved from the authentication dependency).
 
     Returns:
-        Response: The conversation details or a NotFound response if the user or conversation does not exist.
+        Response: The messages, a BadRequest response if `since` is combined with another cursor,
+        a NoContent response if nothing was sent since the given message
+        or a NotFound response if the user or conversation does not exist.
     """
+    if since is not None and (before is not None or after is not None):
+        return BadRequest("since cannot be combined with before or after")
 
-    if not user_service.id_exists(receiver_id):
+    if not await run_in_db_thread(user_service.id_exists, receiver_id):
         return NotFound(f"User ID: {receiver_id}")
 
-    conversation_id = conversation_service.get_conversation_id(current_user_id, receiver_id)
+    conversation_id = await run_in_db_thread(conversation_service.get_conversation_id, current_user_id, receiver_id)
 
     if not conversation_id:
         return NotFound(f"Conversation with user ID: {receiver_id}")
 
-    return conversation_service.get_conversation(conversation_id, order)
+    after_id = since if since is not None else after
+    forward = after_id is not None and before is None
+    messages, has_more = await run_in_db_thread(conversation_service.get_conversation_page,
+                                                conversation_id, order, limit, before, after_id)
+
+    if since is not None and not messages:
+        return NoContent()
+
+    await run_in_db_thread(conversation_service.mark_as_read, conversation_id, current_user_id)
+
+    if messages:
+        ids = [message["id"] for message in messages]
+        response.headers["X-Last-Id"] = str(max(ids))
+        # a forward page that is cut short is continued by asking for what came since X-Last-Id
+        if has_more and not forward:
+            response.headers["X-Before-Id"] = str(min(ids))
+
+    return JSONResponse(messages, headers=response.headers)
 
 
 @conversations_router.get('/')
-def view_conversations(current_user_id: int = Depends(get_current_user),
-                       order: Optional[str] = Query("asc", pattern="^(asc|desc)$")):
+async def view_conversations(request: Request,
+                             response: Response,
+                             current_user_id: int = Depends(get_current_user),
+                             order: Optional[str] = Query("asc", pattern="^(asc|desc)$"),
+                             limit: int = Query(20, ge=1, le=100,
+                                                description="Limit the number of conversations returned"),
+                             cursor: Optional[str] = Query(None, description="Cursor of the page to retrieve, taken "
+                                                                             "from the X-Next-Cursor header of a "
+                                                                             "previous page")):
     """
-    View all conversations for the current user.
+    View the conversations of the current user, one page at a time.
+    The cursor of the next page is returned in the X-Next-Cursor header.
+    Supports conditional requests with If-None-Match and If-Modified-Since.
 
     Parameters:
         current_user_id (int): The ID of the current user (retrieved from the authentication dependency).
         order (Optional[str]): The order in which to sort the conversations (asc or desc).
+        limit (int): Limit the number of conversations returned.
+        cursor (Optional[str]): Cursor of the page to retrieve.
 
     Returns:
-        Response: A list of conversations or a NotFound response if no conversations are found.
+        Response: A list of conversations, a BadRequest response if the cursor is invalid,
+        a NotFound response if no conversations are found or a 304 response if the page did not change.
     """
-
-    conversations = conversation_service.get_conversations(current_user_id, order)
+    decoded_cursor = None
+    if cursor is not None:
+        decoded_cursor = conversation_service.decode_cursor(cursor)
+        if decoded_cursor is None:
+            return BadRequest("Invalid cursor")
+
+    # new messages and reading a conversation bump the user's inbox version
+    version, last_modified = await run_in_db_thread(version_service.stamp_with_last_modified,
+                                                    (version_service.INBOX, current_user_id))
+    etag = make_version_etag(version, order, limit, cursor)
+    if is_not_modified(request, etag, last_modified):
+        return NotModified(etag, last_modified)
+
+    conversations, next_cursor = await run_in_db_thread(
+        conversation_service.get_conversations_page, current_user_id, order, limit, decoded_cursor)
 
     if not conversations:
         return NotFound("Conversations")
 
-    return conversations
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    response.headers.update(validator_headers(etag, last_modified))
+
+    return JSONResponse(conversations, headers=response.headers)
+
+
+async def _message_events(user_id: int):
+    # subscribed only once streaming starts: a client that leaves before that leaves no subscription behind
+    with message_bus.get_bus().subscribe(message_service.user_channel(user_id)) as subscription:
+        yield "retry: 3000\n\n"
+        while True:
+            message = await subscription.get(_LIVE_HEARTBEAT_SECONDS)
+            if message is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: message\ndata: {json.dumps(message)}\n\n"
+
+
+async def _get_user_id(token: str | None) -> int | None:
+    if not token:
+        return None
+
+    try:
+        # resolving the principal may query the database
+        return await run_in_db_thread(get_current_user, token)
+
+    except HTTPException:
+        return None
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Query, Response
+from common.auth import get_current_user
+from common.custom_responses import BadRequest, JSONResponse
+from services import search_service
+
+search_router = APIRouter(prefix="/api/search", tags=["Search"])
+
+
+@search_router.get("/")
+def search(response: Response,
+           q: str = Query(description="Words to search for in topic titles, topic content and replies",
+                          min_length=3, max_length=100),
+           limit: int = Query(description="Limit the number of results returned", default=10, ge=1, le=50),
+           cursor: str | None = Query(description="Cursor of the page to retrieve, taken from the "
+                                                  "X-Next-Cursor header of a previous page", default=None),
+           current_user_id: int = Depends(get_current_user)):
+    """
+    Search topics and replies, most relevant first.
+    Matching words are wrapped in <mark> tags in the snippet of each result.
+    The cursor of the next page is returned in the X-Next-Cursor header.
+
+    Parameters:
+        q (str): The words to search for.
+        limit (int): Limit the number of results returned.
+        cursor (str | None): Cursor of the page to retrieve.
+        current_user_id (int): The ID of the current user, obtained from the authentication dependency.
+
+    Returns:
+        JSONResponse: A response containing the matching topics and replies
+        from the categories the user can read.
+        - 200 OK: If the search is successful.
+        - 400 Bad Request: If the cursor is invalid.
+    """
+    decoded_cursor = None
+    if cursor is not None:
+        decoded_cursor = search_service.decode_cursor(cursor)
+        if decoded_cursor is None:
+            return BadRequest("Invalid cursor")
+
+    results, next_cursor = search_service.search(q, current_user_id, limit, decoded_cursor)
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return JSONResponse(results, headers=response.headers)
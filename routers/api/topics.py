@@ -1,39 +1,57 @@
 from typing import Literal
-from fastapi import APIRouter, Depends, Query, Path, Body
+from fastapi import APIRouter, Depends, Query, Path, Body, Request, Response
+from fastapi.responses import StreamingResponse
 from common.auth import get_current_user
-from common.custom_responses import ForbiddenAccess, NotFound, OK, Locked, BadRequest, OnlyAdminAccess, OnlyAuthorAccess
-from schemas.topic import CreateTopicRequest
-from services import topic_service, reply_service, user_service, category_service
+from common.custom_responses import ForbiddenAccess, NotFound, OK, Locked, BadRequest, OnlyAdminAccess, OnlyAuthorAccess, NotModified, \
+    JSONResponse
+from common.http_cache import make_version_etag, is_not_modified, validator_headers
+from data.database import run_in_db_thread
+from schemas.topic import CreateTopicRequest, SingleTopic
+from services import topic_service, reply_service, user_service, category_service, version_service
 
 topics_router = APIRouter(prefix="/api/topics", tags=["Topics"])
 
 
 @topics_router.get("/")
-def get_all_topics(
-    sort: Literal["asc", "desc"] | None = Query(description="Sort topics by date", default=None),
+async def get_all_topics(
+    response: Response,
+    sort: Literal["asc", "desc"] | None = Query(description="Sort direction; newest, most replied, most recently "
+                                                            "active and highest scored first by default", default=None),
+    sort_by: Literal["created_at", "replies_count", "last_activity", "score"] = Query(
+        description="Sort topics by creation date, number of replies, date of the latest activity or score",
+        default="created_at"),
     search: str | None = Query(description="Search for topics by title", default=None),
     category_id: int | None = Query(description="Filter topics by category ID", default=None),
     author_id: int | None = Query(description="Filter topics by author ID", default=None),
     is_locked: Literal["true", "false"] | None = Query(description="Filter topics by locked status", default=None),
     current_user_id: int = Depends(get_current_user),
     limit: int = Query(description="Limit the number of topics returned", default=10, ge=1, le=100),
-    offset: int = Query(description="Offset the number of topics returned", default=0, ge=0)):
+    offset: int = Query(description="Offset the number of topics returned", default=0, ge=0),
+    cursor: str | None = Query(description="Cursor of the page to retrieve, taken from the "
+                                           "X-Next-Cursor or X-Prev-Cursor header of a previous page",
+                               default=None)):
     """
     Retrieve all topics based on the provided filters.
+    The cursors of the next and previous pages are returned in the X-Next-Cursor
+    and X-Prev-Cursor headers.
 
     Parameters:
-        sort (Literal["asc", "desc"] | None): Sort topics by date.
+        sort (Literal["asc", "desc"] | None): The sort direction. Defaults to "asc" for "created_at"
+            and to "desc" for the other sort keys.
+        sort_by (Literal["created_at", "replies_count", "last_activity", "score"]): The sort key.
         search (str | None): Search for topics by title.
         category_id (int | None): Filter topics by category ID.
         author_id (int | None): Filter topics by author ID.
         is_locked (Literal["true", "false"] | None): Filter topics by locked status.
         current_user_id (int): The ID of the current user, obtained from the authentication dependency.
         limit (int): Limit the number of topics returned.
-        offset (int): Offset the number of topics returned.
+        offset (int): Offset the number of topics returned. Ignored when a cursor is given.
+        cursor (str | None): Cursor of the page to retrieve.
 
     Returns:
         JSONResponse: A response containing the list of topics matching the filters.
         - 200 OK: If the topics are successfully retrieved.
+        - 400 Bad Request: If the cursor is invalid or was issued for another sort key.
         - 404 Not Found: If the category or author ID does not exist.
         - 403 Forbidden: If the user does not have access to the category.
     """
@@ -41,55 +59,113 @@ def get_all_topics(
     if is_locked is not None:
         is_locked = is_locked == "true"
 
+    decoded_cursor = None
+    if cursor is not None:
+        decoded_cursor = topic_service.decode_cursor(cursor)
+        if decoded_cursor is None or decoded_cursor["sort_by"] != sort_by:
+            return BadRequest("Invalid cursor")
+
+    if sort is None:
+        sort = "asc" if sort_by == "created_at" else "desc"
+
     if category_id is not None:
-        if not category_service.exists(category_id):
+        if not await run_in_db_thread(category_service.exists, category_id):
             return NotFound(f"Category ID: {category_id}")
 
-        elif not user_service.is_admin(current_user_id):
-            if not category_service.validate_user_access(
-                    current_user_id, category_id):
+        elif not await run_in_db_thread(user_service.is_admin, current_user_id):
+            if not await run_in_db_thread(category_service.validate_user_access,
+                                          current_user_id, category_id):
                 return ForbiddenAccess()
 
-    if author_id is not None and not user_service.id_exists(author_id):
+    if author_id is not None and not await run_in_db_thread(user_service.id_exists, author_id):
         return NotFound(f"User ID: {author_id}")
 
-    topics = topic_service.get_all_topics(search, category_id, author_id,
-                                          is_locked, current_user_id, limit, offset)
+    topics, next_cursor, prev_cursor = await run_in_db_thread(
+        topic_service.get_topics_page, search, category_id, author_id, is_locked, current_user_id,
+        limit, offset, sort, decoded_cursor, sort_by)
 
-    if sort:
-        return topic_service.sort_topics(topics, reverse=sort == "desc")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if prev_cursor:
+        response.headers["X-Prev-Cursor"] = prev_cursor
 
-    return topics
+    return JSONResponse(topics, headers=response.headers)
 
 
 @topics_router.get("/{topic_id}")
-def get_topic_by_id(topic_id: int = Path(description="ID of the topic to retrieve"),
-                    current_user_id: int = Depends(get_current_user)):
+async def get_topic_by_id(request: Request,
+                          response: Response,
+                          topic_id: int = Path(description="ID of the topic to retrieve"),
+                          current_user_id: int = Depends(get_current_user),
+                          limit: int = Query(description="Limit the number of replies returned", default=50,
+                                             ge=1, le=500),
+                          cursor: str | None = Query(description="Cursor of the page of replies to retrieve, "
+                                                                 "taken from the X-Next-Cursor header of a "
+                                                                 "previous page", default=None),
+                          best_first: bool = Query(description="Put the best reply before the other replies",
+                                                   default=False),
+                          stream: bool = Query(description="Stream the topic with all of its replies, "
+                                                           "ignoring limit and cursor", default=False)):
     """
-    Retrieve a topic by its ID along with its replies.
+    Retrieve a topic by its ID along with one page of its replies, oldest first.
+    The cursor of the next page of replies is returned in the X-Next-Cursor header.
+    Supports conditional requests with If-None-Match and If-Modified-Since.
 
     Parameters:
         topic_id (int): The ID of the topic to retrieve.
         current_user_id (int): The ID of the current user, obtained from the authentication dependency.
+        limit (int): Limit the number of replies returned.
+        cursor (str | None): Cursor of the page of replies to retrieve.
+        best_first (bool): Put the best reply before the other replies.
+        stream (bool): Stream the topic with all of its replies instead of returning one page.
 
     Returns:
         JSONResponse: A response containing the topic and its replies.
         - 200 OK: If the topic is successfully retrieved.
+        - 304 Not Modified: If the client's copy is still current.
+        - 400 Bad Request: If the cursor is invalid.
         - 404 Not Found: If the topic ID does not exist.
         - 403 Forbidden: If the user does not have access to the category.
     """
 
-    topic = topic_service.get_by_id_with_replies(topic_id)
+    decoded_cursor = None
+    if cursor is not None and not stream:
+        decoded_cursor = topic_service.decode_reply_cursor(cursor)
+        if decoded_cursor is None:
+            return BadRequest("Invalid cursor")
+
+    topic = await run_in_db_thread(topic_service.get_by_id, topic_id)
 
     if topic is None:
         return NotFound(f"Topic ID: {topic_id}")
 
-    if not user_service.is_admin(current_user_id):
-        if not category_service.validate_user_access(
-                current_user_id, topic.topic.category_id):
+    if not await run_in_db_thread(user_service.is_admin, current_user_id):
+        if not await run_in_db_thread(category_service.validate_user_access,
+                                      current_user_id, topic.category_id):
             return ForbiddenAccess()
 
-    return topic
+    # replies and votes change the topic's stamp, so an unchanged topic is answered before its replies are read
+    version, last_modified = await run_in_db_thread(version_service.stamp_with_last_modified,
+                                                    (version_service.TOPIC, topic_id))
+    etag = make_version_etag(version, limit, cursor, best_first, stream)
+    if is_not_modified(request, etag, last_modified):
+        return NotModified(etag, last_modified)
+
+    if stream:
+        # the replies are read after the request's unit of work has finished,
+        # each batch on its own pooled connection
+        return StreamingResponse(topic_service.stream_topic_with_replies(topic, best_first),
+                                 media_type="application/json", headers=validator_headers(etag, last_modified))
+
+    replies, next_cursor = await run_in_db_thread(topic_service.get_replies_page,
+                                                  topic, limit, decoded_cursor, best_first)
+
+    response.headers.update(validator_headers(etag, last_modified))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return JSONResponse(SingleTopic(topic=topic, all_replies=replies), headers=response.headers)
 
 
 @topics_router.post("/", status_code=201)
@@ -166,6 +242,35 @@ def change_topic_lock_status(topic_id: int = Path(description="ID of the topic t
     return OK(f"Topic ID: {topic_id} successfully {locked_status}ed")
 
 
+@topics_router.put("/{topic_id}/pinned-status/{pinned_status}")
+def change_topic_pinned_status(topic_id: int = Path(description="ID of the topic to pin/unpin"),
+                               pinned_status: Literal["pin", "unpin"] = Path(description="Pinned status for the topic"),
+                               current_user_id: int = Depends(get_current_user)):
+    """
+    Pin a topic to the top of its category or unpin it.
+
+    Parameters:
+        topic_id (int): The ID of the topic to pin/unpin.
+        pinned_status (Literal["pin", "unpin"]): The pinned status for the topic.
+        current_user_id (int): The ID of the current user, obtained from the authentication dependency.
+
+    Returns:
+        JSONResponse: A response indicating the result of the pinned status change.
+        - 200 OK: If the pinned status is successfully changed.
+        - 404 Not Found: If the topic ID does not exist.
+        - 403 OnlyAdminAccess: If the user is not an admin.
+    """
+    if not user_service.is_admin(current_user_id):
+        return OnlyAdminAccess(content="change pinned status for topics")
+
+    topic = topic_service.get_by_id(topic_id)
+    if topic is None:
+        return NotFound(f"Topic ID: {topic_id}")
+
+    topic_service.change_topic_pinned_status(topic_id, pinned_status == "pin")
+    return OK(f"Topic ID: {topic_id} successfully {pinned_status}ned")
+
+
 @topics_router.put("/{topic_id}/replies/{reply_id}")
 def chose_topic_best_reply(topic_id: int = Path(description="ID of the topic to choose the best reply for"),
                            reply_id: int = Path(description="ID of the reply to choose as the best reply"),
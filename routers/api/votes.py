@@ -46,15 +46,13 @@ def vote(reply_id: int = Path(description="ID of the reply to vote for"),
         if not access:
             return ForbiddenAccess()
 
-    vote = vote_service.get_vote(reply_id, current_user_id)
-    if vote is None:
-        vote_service.create_vote(reply_id, vote_type, current_user_id)
+    previous_vote = vote_service.cast_vote(reply_id, vote_type, current_user_id)
+    if previous_vote is None:
         return Created(f"User ID: {current_user_id} voted successfully for reply ID: {reply_id}")
 
-    if vote == vote_type:
+    if previous_vote == vote_type:
         return BadRequest(f"User ID: {current_user_id} has already voted for reply ID: {reply_id}")
 
-    vote_service.update_vote(reply_id, vote_type, current_user_id)
     vote_str = "upvote" if vote_type == 1 else "downvote"
 
     return OK(f"Vote for reply ID {reply_id} is successfully changed to {vote_str}")
@@ -94,10 +92,38 @@ def delete_vote(reply_id: int = Path(description="ID of the reply to delete vote
         if not access:
             return ForbiddenAccess()
 
-    vote = vote_service.get_vote(reply_id, current_user_id)
-    if vote is None:
+    if vote_service.delete_vote(reply_id, current_user_id) is None:
         return BadRequest(f"User ID: {current_user_id} has not voted for reply ID: {reply_id}")
 
-    vote_service.delete_vote(reply_id, current_user_id)
-
     return OK(f"Vote for reply ID {reply_id} removed successfully")
+
+
+@votes_router.get("/topics/{topic_id}")
+def view_topic_votes(topic_id: int = Path(description="ID of the topic to get the votes for"),
+                     current_user_id: int = Depends(get_current_user)):
+    """
+    Get the current user's votes for all replies of a topic.
+
+    Parameters:
+        topic_id (int): The ID of the topic.
+        current_user_id (int): The ID of the current user, obtained from the authentication dependency.
+
+    Returns:
+        JSONResponse: The vote type ("upvote" or "downvote") by reply ID, for the replies the user voted for.
+        - 404 Not Found: If the topic ID does not exist.
+        - 403 Forbidden: If the user does not have access to the category.
+    """
+    topic = topic_service.get_by_id(topic_id)
+    if topic is None:
+        return NotFound(f"Topic ID: {topic_id}")
+
+    category = category_service.get_by_id(topic.category_id)
+    if not user_service.is_admin(current_user_id) and category.is_private:
+        access = category_service.validate_user_access(
+            current_user_id, topic.category_id)
+        if not access:
+            return ForbiddenAccess()
+
+    votes = vote_service.get_votes_for_topic(topic_id, current_user_id)
+
+    return {reply_id: "upvote" if vote_type == 1 else "downvote" for reply_id, vote_type in votes.items()}
@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Request, Query, Depends, Form, HTTPException, status
 from starlette.responses import RedirectResponse
-from starlette.templating import Jinja2Templates
+from common.templating import create_templates
 from common.auth import get_current_user
+from common.fragment_cache import fragment_cache
+from common.http_cache import make_version_etag, is_not_modified, validator_headers
 from schemas.category import CreateCategoryRequest
 from services import category_service
 from services import user_service
-from common.custom_responses import ForbiddenAccess, NotFound, OK, BadRequest, OnlyAdminAccess
+from services import version_service
+from common.custom_responses import ForbiddenAccess, NotFound, OK, BadRequest, OnlyAdminAccess, NotModified
 import logging
 
 categories_router = APIRouter(prefix='/categories')
-templates = Jinja2Templates(directory='templates')
+templates = create_templates()
 logger = logging.getLogger(__name__)
 
 @categories_router.get("/")
@@ -46,25 +49,30 @@ def get_categories(
             )
 
 
-        categories = category_service.get_categories(
-            search=search,
-            sort="asc",
-            sort_by="title",
-            limit=100,
-            offset=0,
-            current_user_id=current_user_id
+        version = version_service.stamp((version_service.CATEGORIES, 0))
+        access_profile = category_service.get_access_profile(current_user_id)
+
+        key = ("categories", search.lower(), access_profile, version)
+        # the access profile stands for the user's access in the ETag, so there is no Last-Modified
+        etag = make_version_etag(*key, search, error, flash_message)
+        if is_not_modified(request, etag):
+            return NotModified(etag)
+
+        categories_fragment = fragment_cache.get_or_render(
+            key, lambda: _render_categories(search, current_user_id, is_admin)
         )
 
         response = templates.TemplateResponse(
             request=request, name='categories.html',
             context={
-                "categories": categories,
+                "categories_fragment": categories_fragment,
                 "search": search,
                 "is_admin": is_admin,
                 "error": error_messages.get(error),
                 "flash_message": flash_message,
             }
         )
+        response.headers.update(validator_headers(etag))
         # response.delete_cookie("flash_message")
         return response
 
@@ -72,7 +80,6 @@ def get_categories(
         return templates.TemplateResponse(
             request=request, name="categories.html",
             context={
-                "categories": [],
                 "search": search,
                 "is_admin": is_admin,
                 "error": error_messages.get(error or "unknown_error"),
@@ -80,6 +87,19 @@ def get_categories(
         )
 
 
+def _render_categories(search: str, current_user_id: int, is_admin: bool) -> str:
+    categories = category_service.get_categories(
+        search=search,
+        sort="asc",
+        sort_by="title",
+        limit=100,
+        offset=0,
+        current_user_id=current_user_id
+    )
+
+    return templates.get_template('categories-grid.html').render(categories=categories, is_admin=is_admin)
+
+
 @categories_router.post("/toggle-lock")
 def toggle_lock(
     request: Request,
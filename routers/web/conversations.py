@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Request, Form
 from starlette.responses import RedirectResponse
-from starlette.templating import Jinja2Templates
+from common.templating import create_templates
 from common.auth import get_current_user
+from common.custom_responses import JSONResponse, NotModified
+from common.fragment_cache import fragment_cache
+from common.http_cache import make_etag, make_version_etag, is_not_modified, validator_headers
 from routers.api.categories import categories_router
-from services import conversation_service, user_service
+from services import conversation_service, user_service, version_service
 
 conversations_router = APIRouter(prefix='/conversations')
-templates = Jinja2Templates(directory='templates')
+templates = create_templates()
 
 
 @conversations_router.get('/')
@@ -28,38 +31,57 @@ def view_conversations(request: Request):
                 status_code=302
             )
 
-        conversations = conversation_service.get_conversations(current_user_id, "desc")
+        version, last_modified = version_service.stamp_with_last_modified((version_service.INBOX, current_user_id))
+        key = ("conversations", current_user_id, version)
+        etag = make_version_etag(*key)
+        if is_not_modified(request, etag, last_modified):
+            return NotModified(etag, last_modified)
 
-        return templates.TemplateResponse(
+        conversations_fragment = fragment_cache.get_or_render(key, lambda: _render_conversations(current_user_id))
+
+        response = templates.TemplateResponse(
             request=request, name='conversations.html',
             context={
-                "conversations": conversations
+                "conversations_fragment": conversations_fragment
             }
         )
+        response.headers.update(validator_headers(etag, last_modified))
+        return response
 
     except Exception as e:
         return templates.TemplateResponse(
             request=request, name="conversations.html",
             context={
                 "error": "Oops! Something went wrong while loading conversations 🙈",
-                "conversations": [],
             }
         )
 
 
+def _render_conversations(user_id: int) -> str:
+    conversations = conversation_service.get_conversations(user_id, "desc")
+
+    return templates.get_template('conversations-list.html').render(conversations=conversations)
+
+
 @conversations_router.get('/count')
 def get_conversations_count(request: Request):
     try:
         token = request.cookies.get("token")
         if not token:
-            return {"count": 0}
+            return {"count": 0, "unread": 0}
 
         current_user_id = get_current_user(token)
-        count = len(conversation_service.get_conversations(current_user_id))
-        return {"count": count}
+        counts = conversation_service.get_inbox_counts(current_user_id)
+
+        # the ETag covers the user too, so a shared browser cache never mixes up two accounts
+        etag = make_etag({"user_id": current_user_id, **counts})
+        if is_not_modified(request, etag):
+            return NotModified(etag)
+
+        return JSONResponse(content=counts, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
 
     except Exception:
-        return {"count": 0}
+        return {"count": 0, "unread": 0}
 
 @conversations_router.get("/{receiver_id}")
 def view_conversation(request: Request,
@@ -84,6 +106,7 @@ def view_conversation(request: Request,
 
         conversation_id = conversation_service.get_conversation_id(current_user_id, receiver_id)
         conversation = conversation_service.get_conversation(conversation_id, "desc")
+        conversation_service.mark_as_read(conversation_id, current_user_id)
         receiver = user_service.get_user_by_id(receiver_id)
         return templates.TemplateResponse(
             request=request, name='single-conversation.html',
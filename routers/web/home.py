@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Request
-from fastapi.templating import Jinja2Templates
+from common.templating import create_templates
 
 from common.auth import get_current_user
 from services import user_service
 
 index_router = APIRouter(prefix='')
-templates = Jinja2Templates(directory='templates')
+templates = create_templates()
 
 @index_router.get('/')
 def index(request: Request,
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Request, Form
 from starlette.responses import RedirectResponse
-from starlette.templating import Jinja2Templates
+from common.templating import create_templates
 from common.auth import get_current_user
 from schemas.message import Message
 from services import user_service, message_service
 
 messages_router = APIRouter(prefix='/messages')
-templates = Jinja2Templates(directory='templates')
+templates = create_templates()
 
 
 @messages_router.post('/')
@@ -1,13 +1,13 @@
 from fastapi import APIRouter, Request, Form
 from starlette.responses import RedirectResponse
-from starlette.templating import Jinja2Templates
+from common.templating import create_templates
 
 from common.auth import get_current_user
 from schemas.reply import Reply, CreateReplyRequest
 from services import reply_service, topic_service, vote_service
 
 replies_router = APIRouter(prefix='/replies')
-templates = Jinja2Templates(directory='templates')
+templates = create_templates()
 
 @replies_router.post("/{topic_id}")
 def handle_vote(
@@ -1,14 +1,17 @@
 import mariadb
 from fastapi import APIRouter, Request, Form, Query
 from starlette.responses import RedirectResponse
-from starlette.templating import Jinja2Templates
+from common.templating import create_templates
 
 from common.auth import get_current_user
+from common.custom_responses import NotModified
+from common.fragment_cache import fragment_cache
+from common.http_cache import make_version_etag, is_not_modified, validator_headers
 from schemas.topic import CreateTopicRequest
-from services import topic_service, category_service, user_service, reply_service
+from services import topic_service, category_service, user_service, reply_service, vote_service, version_service
 
 topics_router = APIRouter(prefix='/topics')
-templates = Jinja2Templates(directory='templates')
+templates = create_templates()
 
 
 @topics_router.get("/{topic_id}")
@@ -30,21 +33,27 @@ def get_topic_by_id(request: Request, topic_id: int):
                 status_code=302
             )
 
-        topic = topic_service.get_by_id_with_replies(topic_id)
-        category = category_service.get_by_id(topic.topic.category_id)
-        user = user_service.get_user_by_id(topic.topic.author_id)
-        authors_of_replies = reply_service.get_authors_of_replies(topic.all_replies)
+        # the version is read before rendering, so a fragment is never cached under a newer version than its data
+        version, last_modified = version_service.stamp_with_last_modified((version_service.TOPIC, topic_id))
+        user_votes = vote_service.get_votes_for_topic(topic_id, current_user_id)
 
-        return templates.TemplateResponse(
+        # the user's own votes are highlighted, so only viewers who voted the same way share a fragment
+        key = ("single-topic", topic_id, version, tuple(sorted(user_votes.items())))
+        etag = make_version_etag(*key)
+        if is_not_modified(request, etag, last_modified):
+            return NotModified(etag, last_modified)
+
+        topic_fragment = fragment_cache.get_or_render(key, lambda: _render_topic(topic_id, user_votes))
+
+        response = templates.TemplateResponse(
             request=request, name='single-topic.html',
             context={
-                "topic": topic,
-                "category_title": category.title,
-                "author_username": user.username,
-                "authors_of_replies": authors_of_replies,
+                "topic_fragment": topic_fragment,
                 "topic_id": topic_id,
             }
         )
+        response.headers.update(validator_headers(etag, last_modified))
+        return response
 
     except Exception:
         return templates.TemplateResponse(
@@ -55,6 +64,21 @@ def get_topic_by_id(request: Request, topic_id: int):
         )
 
 
+def _render_topic(topic_id: int, user_votes: dict[int, int]) -> str:
+    topic = topic_service.get_by_id_with_replies(topic_id)
+    category = category_service.get_by_id(topic.topic.category_id)
+    user = user_service.get_user_by_id(topic.topic.author_id)
+    authors_of_replies = reply_service.get_authors_of_replies(topic.all_replies)
+
+    return templates.get_template('single-topic-content.html').render(
+        topic=topic,
+        category_title=category.title,
+        author_username=user.username,
+        authors_of_replies=authors_of_replies,
+        user_votes=user_votes,
+    )
+
+
 @topics_router.get("/")
 def get_all_topics(
         request: Request,
@@ -95,16 +119,11 @@ def get_all_topics(
             is_locked=None,
         )
 
-        authors_of_topics = topic_service.get_authors_of_topics(topics)
-        categories_of_topics = topic_service.get_categories_of_topics(topics)
-
         return templates.TemplateResponse(
             name="newest-topics.html",
             context={
                 "request": request,
                 "topics": topics,
-                "categories_of_topics": categories_of_topics,
-                "authors_of_topics": authors_of_topics,
                 "category_id": category_id,
                 "category_title": category_title,
                 "search": search,
@@ -2,13 +2,13 @@ import mariadb
 from fastapi import APIRouter, Request, Form
 from pydantic import ValidationError
 from starlette.responses import RedirectResponse
-from starlette.templating import Jinja2Templates
+from common.templating import create_templates
 from common.auth import authenticate_user, create_access_token
 from schemas.user import UserCreate
 from services import user_service
 
 users_router = APIRouter(prefix='/users')
-templates = Jinja2Templates(directory='templates')
+templates = create_templates()
 
 @users_router.post('/login')
 def login(request: Request,
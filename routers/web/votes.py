@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Request, Form
 from starlette.responses import RedirectResponse
-from starlette.templating import Jinja2Templates
+from common.templating import create_templates
 
 from common.auth import get_current_user
 from services import reply_service, topic_service, vote_service
 
 votes_router = APIRouter(prefix='/votes')
-templates = Jinja2Templates(directory='templates')
+templates = create_templates()
 
 @votes_router.post("/{reply_id}")
 def handle_vote(
@@ -32,14 +32,10 @@ def handle_vote(
 
         reply = reply_service.get_by_id(reply_id)
 
-        vote = vote_service.get_vote(reply_id, current_user_id)
         vote_type_value = 1 if vote_type == "upvote" else 0
 
-        if vote is None:
-            vote_service.create_vote(reply_id, vote_type_value, current_user_id)
-        elif vote != vote_type_value:
-            vote_service.update_vote(reply_id, vote_type_value, current_user_id)
-        else:
+        # clicking the same vote again takes it back
+        if vote_service.cast_vote(reply_id, vote_type_value, current_user_id) == vote_type_value:
             vote_service.delete_vote(reply_id, current_user_id)
 
         return RedirectResponse(
@@ -25,3 +25,15 @@ class Access_with_usernames(BaseModel):
                    username=username,
                    category_id=category_id,
                    write_access=write_access)
+
+
+class CategoryVisibility(BaseModel):
+    readable: frozenset[int]
+    writable: frozenset[int]
+
+    @classmethod
+    def from_query_result(cls, rows):
+        # rows of (category_id, is_private, write_access), write_access is NULL for public categories
+        return cls(readable=frozenset(category_id for category_id, _, _ in rows),
+                   writable=frozenset(category_id for category_id, is_private, write_access in rows
+                                      if not is_private or write_access))
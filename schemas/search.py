@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Literal
+from pydantic import BaseModel
+
+
+class SearchResult(BaseModel):
+    type: Literal["topic", "reply"]
+    id: int
+    topic_id: int
+    topic_title: str
+    snippet: str
+    created_at: datetime
+    relevance: float
+
+    @classmethod
+    def from_query_result(cls, type, id, topic_id, topic_title, snippet, created_at, relevance):
+        return cls(
+            type=type,
+            id=id,
+            topic_id=topic_id,
+            topic_title=topic_title,
+            snippet=snippet,
+            created_at=created_at,
+            relevance=relevance
+        )
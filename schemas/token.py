@@ -7,4 +7,14 @@ class Token(BaseModel):
 
 
 class TokenData(BaseModel):
-    user_identifier: int | None = None
\ No newline at end of file
+    user_identifier: int | None = None
+
+
+class Principal(BaseModel):
+    id: int
+    is_admin: bool
+
+    @classmethod
+    def from_query_result(cls, id, is_admin):
+        return cls(id=id,
+                   is_admin=bool(is_admin))
@@ -59,9 +59,14 @@ class ViewAllTopics(BaseModel):
     author_id: int
     category_id: int
     replies_count: int
+    last_activity: datetime | None = None
+    score: int | None = None
+    author_username: str | None = None
+    category_title: str | None = None
 
     @classmethod
-    def from_query_result(cls, id, title, is_locked, created_at, author_id, category_id, replies_count):
+    def from_query_result(cls, id, title, is_locked, created_at, author_id, category_id, replies_count,
+                          last_activity=None, score=None, author_username=None, category_title=None):
         return cls(
             id=id,
             title=title,
@@ -69,7 +74,11 @@ class ViewAllTopics(BaseModel):
             created_at=created_at,
             author_id=author_id,
             category_id=category_id,
-            replies_count=replies_count
+            replies_count=replies_count,
+            last_activity=last_activity,
+            score=score,
+            author_username=author_username,
+            category_title=category_title
         )
 
 class ListOfTopics(BaseModel):
@@ -79,9 +88,13 @@ class ListOfTopics(BaseModel):
     created_at: datetime
     author_id: int
     category_id: int
+    is_pinned: bool = False
+    replies_count: int = 0
+    last_activity: Optional[datetime] = None
 
     @classmethod
-    def from_query_result(cls, id, title, is_locked, created_at, author_id, category_id):
+    def from_query_result(cls, id, title, is_locked, created_at, author_id, category_id,
+                          is_pinned=False, replies_count=0, last_activity=None):
         return cls(
             id=id,
             title=title,
@@ -89,4 +102,7 @@ class ListOfTopics(BaseModel):
             created_at=created_at,
             author_id=author_id,
             category_id=category_id,
+            is_pinned=is_pinned,
+            replies_count=replies_count,
+            last_activity=last_activity,
         )
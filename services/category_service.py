@@ -1,20 +1,37 @@
+import hashlib
+import os
+from datetime import datetime
+from common import cursors
+from common.ttl_cache import TTLCache
 from data.database import (
     insert_query,
     read_query,
     query_count,
     update_query,
     delete_query,
+    unit_of_work,
+    on_commit,
 )
 from schemas.category import Category, ViewAllCategories, SingleCategory, CreateCategoryRequest
-from schemas.category_accesses import Accesses, Access_with_usernames
+from schemas.category_accesses import Accesses, Access_with_usernames, CategoryVisibility
 from schemas.topic import ViewAllTopics, ListOfTopics
 from services import topic_service
+from services import version_service
 from services import user_service
 import logging
 
 logger = logging.getLogger(__name__)
 logger.propagate = True
 
+# sort name -> column of the (category_id, column, id) index that serves it
+TOPIC_SORTS = {
+    "newest": "created_at",
+    "active": "last_activity_at",
+}
+
+# user id -> (versions of the categories and of the user's access when read, CategoryVisibility)
+_visibility_cache = TTLCache(float(os.getenv("CATEGORY_ACCESS_CACHE_TTL", 60)))
+
 
 def get_categories(
     search: str = None,
@@ -50,14 +67,10 @@ def get_categories(
 
     if user_service.is_admin(current_user_id):
         query += " WHERE is_private in (0, 1)"
-    elif current_user_id is None:
-        query += " WHERE is_private = 0"
     else:
-        query += """ LEFT JOIN category_accesses ca
-                    ON categories.id = ca.category_id
-                    WHERE (is_private = 0 
-                    OR (ca.user_id = ?))"""
-        params.append(current_user_id)
+        condition, condition_params = visible_categories_condition("id", current_user_id)
+        query += f" WHERE {condition}"
+        params.extend(condition_params)
 
     if search:
         query += " AND lower(title) LIKE ?"
@@ -75,22 +88,25 @@ def get_categories(
     return [ViewAllCategories.from_query_result(*row) for row in data]
 
 
-def get_by_id_with_topics(category: Category):
+def get_by_id_with_topics(category: Category, limit: int, cursor: dict | None = None,
+                          sort: str = "newest", pinned_first: bool = True) -> tuple:
     """
-    Retrieve a category along with its associated topics.
-    Takes a `Category` object as input and fetches all topics related to that category. 
-    
+    Retrieve a category along with one page of its topics.
+
     Parameters:
         category (Category): An instance of the `Category` class.
+        limit (int): The maximum number of topics in the page.
+        cursor (dict | None): A decoded topics cursor (see `decode_topics_cursor`).
+        sort (str): "newest" orders the topics by creation time, "active" by their last activity.
+        pinned_first (bool): Whether the pinned topics are listed before the rest on the first page.
 
     Returns:
-        SingleCategory: An instance of `SingleCategory` containing the category details
-        and a list of its associated topics.
+        tuple: An instance of `SingleCategory` containing the category details and the page of topics,
+        and the cursor of the next page (None if this is the last page).
     """
-    
-    topics = get_category_topics(category.id)
+    topics, next_cursor = get_category_topics(category.id, limit, cursor, sort, pinned_first)
 
-    return SingleCategory(category=category, topics=topics)
+    return SingleCategory(category=category, topics=topics), next_cursor
 
 
 def get_by_id(category_id: int) -> Category:
@@ -116,37 +132,95 @@ def get_by_id(category_id: int) -> Category:
     return Category.from_query_result(*data[0])
 
 
-def get_category_topics(category_id: int) -> list[ListOfTopics]:
+def get_category_topics(category_id: int, limit: int, cursor: dict | None = None,
+                        sort: str = "newest", pinned_first: bool = True) -> tuple:
     """
-    Retrieve from the database a list of topics associated with a specific category.
+    Retrieve from the database one page of the topics of a category, newest first.
+    Pages are read from the (category_id, sort column, id) indexes with a keyset,
+    so the cost of a page does not grow with the size of the category.
+    With `pinned_first`, the pinned topics are listed on top of the first page
+    (in addition to `limit`) and left out of the following pages.
 
     Parameters:
         category_id (int): The ID of the category for which to retrieve topics.
+        limit (int): The maximum number of (unpinned, with `pinned_first`) topics in the page.
+        cursor (dict | None): A decoded topics cursor (see `decode_topics_cursor`);
+            only topics after the cursor position are returned.
+        sort (str): "newest" orders the topics by creation time, "active" by their last activity.
+        pinned_first (bool): Whether the pinned topics are listed before the rest.
 
     Returns:
-        lst: A list of `ListOfTopics` instances representing the topics associated with 
-        the specified category or an empty list if no topics are found.
+        tuple: A list of `ListOfTopics` instances and the cursor of the next page (None if this is the last page).
     """
-        
-    data = read_query(
-        """SELECT id, title, is_locked, created_at, author_id
-            FROM topics
-            WHERE category_id = ?""",
-        (category_id,),
-    )
-    topics = []
-    for row in data:
-        topic = ListOfTopics(
-            id=row[0],
-            title=row[1],
-            is_locked=row[2],
-            created_at=row[3],
-            author_id=row[4],
-            category_id=category_id 
-        )
-        topics.append(topic)
+    column = f"t.{TOPIC_SORTS[sort]}"
+    select = f"""SELECT t.id, t.title, t.is_locked, t.created_at, t.author_id, t.category_id,
+                    t.is_pinned, t.replies_count, t.last_activity_at
+                FROM topics t"""
+
+    pinned = []
+    if pinned_first and cursor is None:
+        pinned = read_query(f"""{select}
+                    WHERE t.category_id = ? AND t.is_pinned = 1
+                    ORDER BY {column} DESC, t.id DESC""", (category_id,))
+
+    conditions, params = ["t.category_id = ?"], [category_id]
+    if pinned_first:
+        conditions.append("t.is_pinned = 0")
+    if cursor is not None:
+        conditions.append(f"({column} < ? OR ({column} = ? AND t.id < ?))")
+        params.extend((cursor["value"], cursor["value"], cursor["id"]))
+
+    # one extra row tells whether there is anything beyond this page
+    params.append(limit + 1)
+    rows = read_query(f"""{select}
+                WHERE {" AND ".join(conditions)}
+                ORDER BY {column} DESC, t.id DESC
+                LIMIT ?""", tuple(params))
+
+    topics = [ListOfTopics.from_query_result(*row) for row in pinned + rows[:limit]]
+    next_cursor = encode_topics_cursor(topics[-1], sort) if len(rows) > limit else None
+
+    return topics, next_cursor
+
+
+def encode_topics_cursor(topic: ListOfTopics, sort: str) -> str:
+    """
+    Encode the position of a topic in a category's topic listing into an opaque cursor.
+
+    Parameters:
+        topic (ListOfTopics): The last topic of a page.
+        sort (str): The sort the page was ordered by.
+
+    Returns:
+        str: The cursor.
+    """
+    value = topic.created_at if sort == "newest" else topic.last_activity
 
-    return topics
+    return cursors.encode({"sort": sort, "value": value.isoformat(), "id": topic.id})
+
+
+def decode_topics_cursor(cursor: str) -> dict | None:
+    """
+    Decode a cursor produced by `encode_topics_cursor`.
+
+    Parameters:
+        cursor (str): The opaque cursor received from the client.
+
+    Returns:
+        dict | None: The sort, sort value and topic ID of the cursor, or None if the cursor is malformed.
+    """
+    payload = cursors.decode(cursor)
+    if payload is None:
+        return None
+
+    try:
+        if payload["sort"] not in TOPIC_SORTS:
+            return None
+
+        return {"sort": payload["sort"], "value": datetime.fromisoformat(payload["value"]), "id": int(payload["id"])}
+
+    except (ValueError, KeyError, TypeError):
+        return None
 
 
 def exists(category_id: int) -> bool:
@@ -232,15 +306,22 @@ def create(category: CreateCategoryRequest, current_user_id: int):
     query = """INSERT INTO categories (title, description, is_private, admin_id)
                 VALUES (?, ?, ?, ? )"""
 
-    generated_id = insert_query(
-        query,
-        (
-            category.title,
-            category.description,
-            category.is_private,
-            current_user_id,
-        ),
-    )
+    with unit_of_work():
+        generated_id = insert_query(
+            query,
+            (
+                category.title,
+                category.description,
+                category.is_private,
+                current_user_id,
+            ),
+        )
+
+        # a new public category is visible to everyone
+        if not category.is_private:
+            _invalidate_visibility_now_and_on_commit()
+
+        version_service.bump(version_service.CATEGORIES, 0)
 
     category = get_by_id(generated_id)
 
@@ -264,13 +345,18 @@ def change_category_private_status(category_id: int, private_status_code: int):
     query = """UPDATE categories 
             SET is_private = ? 
             WHERE id = ?"""
-    update_query(query, (private_status_code, category_id))
-    if private_status_code == 0:
-        # The category was initialy private and now it is changed to public.
-        # Remove all user access to this category from category_accesses.
-        # Public categories are accessible to anyone.
-        # In case the category is changed back to private, no previous user access will exist.
-        _remove_access_from_category(category_id)
+    with unit_of_work():
+        update_query(query, (private_status_code, category_id))
+        if private_status_code == 0:
+            # The category was initialy private and now it is changed to public.
+            # Remove all user access to this category from category_accesses.
+            # Public categories are accessible to anyone.
+            # In case the category is changed back to private, no previous user access will exist.
+            _remove_access_from_category(category_id)
+
+        # the category appears or disappears for every user without access to it
+        _invalidate_visibility_now_and_on_commit()
+        version_service.bump(version_service.CATEGORIES, 0)
   
 
 def _remove_access_from_category(category_id: int):
@@ -324,7 +410,9 @@ def change_category_lock_status(category_id: int, locked_status_code: int):
     query = """UPDATE categories 
             SET is_locked = ? 
             WHERE id = ?"""
-    update_query(query, (locked_status_code, category_id))
+    with unit_of_work():
+        update_query(query, (locked_status_code, category_id))
+        version_service.bump(version_service.CATEGORIES, 0)
 
 
 # Service for category access
@@ -344,29 +432,109 @@ def validate_user_access(user_id: int, category_id: int, access_type: str = "rea
     if access_type not in ("read", "write"):
         raise Exception(f"Invalid access type: {access_type}")
 
+    visibility = get_category_visibility(user_id)
+    allowed = visibility.readable if access_type == "read" else visibility.writable
+    if category_id in allowed:
+        return True
+
     if not exists(category_id):
         raise Exception(f"Category with ID {category_id} not found")
 
+    return user_service.is_admin(user_id)
+
+
+def get_category_visibility(user_id: int | None) -> CategoryVisibility:
+    """
+    Retrieve the IDs of the categories a user can read and write, served from an in-process cache.
+    Public categories are readable and writable by everyone, private ones according to category_accesses.
+    Admins are not special-cased here, callers check `user_service.is_admin` themselves.
+
+    A cached entry is only used while the version counters of the categories and of the user's access
+    are the ones it was read with, so a grant revoked through another worker process takes effect at once.
+
+    Parameters:
+        user_id (int | None): The ID of the user, None for an anonymous user.
+
+    Returns:
+        CategoryVisibility: The readable and writable category IDs.
+    """
+    keys = [(version_service.CATEGORIES, 0)]
+    if user_id is not None:
+        keys.append((version_service.ACCESS, user_id))
+    # read before the categories: a change committed in between only makes the entry look stale
+    versions = version_service.get_versions(*keys)
+
+    cached = _visibility_cache.get(user_id)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+
+    query = """SELECT c.id, c.is_private, ca.write_access
+                FROM categories c
+                LEFT JOIN category_accesses ca
+                ON ca.category_id = c.id AND ca.user_id = ?
+                WHERE c.is_private = 0 OR ca.user_id IS NOT NULL"""
+
+    visibility = CategoryVisibility.from_query_result(read_query(query, (user_id,)))
+    _visibility_cache.set(user_id, (versions, visibility))
+
+    return visibility
+
+
+def visible_categories_condition(column: str, user_id: int | None) -> tuple:
+    """
+    Build a condition restricting a category ID column to the categories a user can read.
+
+    Parameters:
+        column (str): The SQL column holding the category ID, e.g. "t.category_id".
+        user_id (int | None): The ID of the user, None for an anonymous user.
+
+    Returns:
+        tuple: The SQL condition and the list of its parameters.
+    """
+    readable = sorted(get_category_visibility(user_id).readable)
+    if not readable:
+        return "1 = 0", []
+
+    return f"{column} IN ({', '.join('?' * len(readable))})", readable
+
+
+def get_access_profile(user_id: int | None) -> str:
+    """
+    Describe what a user can see, so pages rendered for one user can be served to every user who sees the same.
+    Admins see everything; other users see the categories they can read.
+
+    Parameters:
+        user_id (int | None): The ID of the user, None for an anonymous user.
+
+    Returns:
+        str: "admin", or a digest of the readable category IDs.
+    """
     if user_service.is_admin(user_id):
-        return True
-    if not is_private(category_id):
-        return True
-    if user_id is None:
-        return False
-    
-    query = """SELECT write_access
-            FROM category_accesses 
-            WHERE category_id = ? 
-            AND user_id = ?"""
+        return "admin"
 
-    access = read_query(query, (category_id, user_id))
-    
-    if not access:
-        return False
-    if access_type == "read":
-        return True
+    readable = ",".join(str(category_id) for category_id in sorted(get_category_visibility(user_id).readable))
+
+    return "read:" + hashlib.sha1(readable.encode()).hexdigest()[:16]
+
+
+def invalidate_category_visibility(user_id: int | None = None) -> None:
+    """
+    Drop a user's cached category visibility, or the whole cache when no user ID is given.
+
+    Parameters:
+        user_id (int | None): The ID of the user whose access changed.
+    """
+    if user_id is None:
+        _visibility_cache.clear()
     else:
-        return bool(access[0][0])
+        _visibility_cache.invalidate(user_id)
+
+
+def _invalidate_visibility_now_and_on_commit(user_id: int | None = None) -> None:
+    # dropped right away for the rest of this unit of work, and again once the change is
+    # committed, in case another request cached the old state in the meantime
+    invalidate_category_visibility(user_id)
+    on_commit(lambda: invalidate_category_visibility(user_id))
 
 
 # Service for category access
@@ -409,6 +577,8 @@ def manage_user_access_to_private_category(
                 WHERE category_id = ?
                 AND user_id = ?"""
         update_query(query, (write_access_code,  category_id, user_id))
+        _invalidate_visibility_now_and_on_commit(user_id)
+        version_service.bump(version_service.ACCESS, user_id)
         logger.info(
             f"Access for user ID {user_id} and category ID {category_id} updated"
         )
@@ -420,6 +590,8 @@ def manage_user_access_to_private_category(
                 VALUES (?, ?, ?)"""
 
         insert_query(query, (user_id, category_id, write_access_code))
+        _invalidate_visibility_now_and_on_commit(user_id)
+        version_service.bump(version_service.ACCESS, user_id)
         logger.info(f"Access for user ID {user_id} and category ID {category_id} added")
 
         return
@@ -448,6 +620,8 @@ def remove_user_access_to_private_category(
     )
     if data:
         _remove_access_from_category_for_user(category_id, user_id)
+        _invalidate_visibility_now_and_on_commit(user_id)
+        version_service.bump(version_service.ACCESS, user_id)
         message = "Access was successfully deleted"
     else:
         message = "User has no access to the category"
@@ -1,44 +1,105 @@
-from starlette.responses import Response
+import os
+from datetime import datetime
 
-from common.auth import get_password_hash
-from data.database import insert_query, read_query
+from common import cursors
+from common.ttl_cache import TTLCache
+from data.database import insert_query, read_query, update_query, on_commit
+from services import version_service
 
+# user id -> {"count": ..., "unread": ...}; kept short because the navbar polls it
+_inbox_counts_cache = TTLCache(float(os.getenv("CONVERSATION_COUNT_CACHE_TTL", 5)))
 
-def get_conversation(conversation_id: int, order: str = "asc") -> list[dict]:
+# (lower user id, higher user id) -> conversation id; conversations are never deleted or re-paired
+_conversation_id_cache = TTLCache(float(os.getenv("CONVERSATION_ID_CACHE_TTL", 3600)), max_size=50_000)
+
+
+def get_conversation(conversation_id: int, order: str = "asc", limit: int | None = None,
+                     before_id: int | None = None, after_id: int | None = None) -> list[dict]:
     """
-    Retrieve messages for a given conversation ID, ordered by the message sent time.
+    Retrieve messages for a given conversation ID, ordered by the message ID (the order they were sent in).
 
     Parameters:
         conversation_id (int): The ID of the conversation.
         order (str): The order in which to sort the messages (asc or desc).
+        limit (int | None): The maximum number of messages to return; None returns them all.
+        before_id (int | None): Only return messages older than this message ID.
+        after_id (int | None): Only return messages newer than this message ID.
 
     Returns:
-        list[dict]: A list of messages with text, sent time, sender's first name and picture
+        list[dict]: A list of messages with ID, text, sender, sent time, sender's first name and picture.
+        When limited, these are the newest matching messages, or the oldest ones if only `after_id` is given.
+    """
+    messages, _ = get_conversation_page(conversation_id, order, limit, before_id, after_id)
+
+    return messages
+
+
+def get_conversation_page(conversation_id: int, order: str, limit: int | None,
+                          before_id: int | None = None, after_id: int | None = None) -> tuple:
     """
+    Retrieve one page of the messages of a conversation using the message ID as the keyset.
+    Without cursors the page holds the newest messages; `before_id` walks back through the history
+    and `after_id` fetches what was sent after a message the client already has.
+
+    Parameters:
+        conversation_id (int): The ID of the conversation.
+        order (str): The order in which to sort the messages (asc or desc).
+        limit (int | None): The maximum number of messages to return; None returns them all.
+        before_id (int | None): Only return messages older than this message ID.
+        after_id (int | None): Only return messages newer than this message ID.
+
+    Returns:
+        tuple: The list of messages and whether more messages exist beyond the page,
+        older ones when walking back and newer ones when walking forward.
+    """
+    conditions, params = ["m.conversation_id = ?"], [conversation_id]
+    if before_id is not None:
+        conditions.append("m.id < ?")
+        params.append(before_id)
+    if after_id is not None:
+        conditions.append("m.id > ?")
+        params.append(after_id)
+
+    # walk forward from after_id, otherwise back from the newest message (or before_id)
+    forward = after_id is not None and before_id is None
+
     query = f"""
-            SELECT m.text, m.sender_id, u.first_name, m.sent_at, u.picture
+            SELECT m.id, m.text, m.sender_id, u.first_name, m.sent_at, u.picture
             FROM messages m
             JOIN users u ON m.sender_id = u.id
-            WHERE m.conversation_id = ?
-            ORDER BY m.sent_at {order}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY m.id {"ASC" if forward else "DESC"}
             """
-    result = read_query(query, (conversation_id,))
+    if limit is not None:
+        # one extra row tells whether there is anything beyond this page
+        query += " LIMIT ?"
+        params.append(limit + 1)
+
+    result = read_query(query, tuple(params))
+
+    has_more = limit is not None and len(result) > limit
+    if has_more:
+        result = result[:limit]
+    if forward != (order == "asc"):
+        result = result[::-1]
+
     messages = []
     for message in result:
         messages.append({
-            "text": message[0],
-            "from_id": message[1],
-            "from": message[2],
-            "sent_at": message[3],
-            "picture": message[4]
+            "id": message[0],
+            "text": message[1],
+            "from_id": message[2],
+            "from": message[3],
+            "sent_at": message[4],
+            "picture": message[5]
         })
 
-    return messages
+    return messages, has_more
 
 
 def get_conversation_id(user1_id: int, user2_id: int) -> int | None:
     """
-    Retrieve the conversation ID for the given user IDs.
+    Retrieve the conversation ID for the given user IDs, in either order.
 
     Parameters:
         user1_id (int): The ID of the first user.
@@ -47,64 +108,97 @@ def get_conversation_id(user1_id: int, user2_id: int) -> int | None:
     Returns:
         int | None: The ID of the conversation between the two users, or None if no conversation exists.
     """
-    if user1_id == user2_id:
-        query = """
-                    SELECT id FROM conversations
-                    WHERE user1_id = ? AND user2_id = ?
-                    """
-        result = read_query(query, (user1_id, user2_id))
-    else:
-        query = """
-                    SELECT id FROM conversations
-                    WHERE (user1_id = ? AND user2_id = ?)
-                    OR (user1_id = ? AND user2_id = ?)
-                    """
-        result = read_query(query, (user1_id, user2_id, user2_id, user1_id))
+    participants = _participants(user1_id, user2_id)
+
+    conversation_id = _conversation_id_cache.get(participants)
+    if conversation_id is not None:
+        return conversation_id
+
+    query = """
+            SELECT id FROM conversations
+            WHERE user1_id = ? AND user2_id = ?
+            """
+    result = read_query(query, participants)
+    if not result:
+        return None
+
+    _conversation_id_cache.set(participants, result[0][0])
+
+    return result[0][0]
+
+
+def get_or_create_conversation_id(user1_id: int, user2_id: int) -> int:
+    """
+    Retrieve the conversation ID for the given user IDs, creating the conversation if it does not exist.
+    The unique participant pair makes this safe when both users send their first message at the same time.
 
-    return result[0][0] if result else None
+    Parameters:
+        user1_id (int): The ID of the first user.
+        user2_id (int): The ID of the second user.
+
+    Returns:
+        int: The ID of the conversation between the two users.
+    """
+    participants = _participants(user1_id, user2_id)
 
+    conversation_id = _conversation_id_cache.get(participants)
+    if conversation_id is not None:
+        return conversation_id
 
-def get_conversations(user_id: int, order="asc") -> list[dict]:
+    # on a duplicate pair LAST_INSERT_ID(id) makes the existing row's ID the insert ID
+    query = """
+            INSERT INTO conversations(user1_id, user2_id)
+            VALUES(?, ?)
+            ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)
+            """
+    conversation_id = insert_query(query, participants)
+
+    # a new conversation only exists for others once it is committed
+    on_commit(lambda: _conversation_id_cache.set(participants, conversation_id))
+
+    return conversation_id
+
+
+def get_conversations(user_id: int, order="asc", limit: int | None = None,
+                      cursor: dict | None = None) -> list[dict]:
     """
     Retrieve all conversations for a given user ID, ordered by the last message sent time.
+    Read from the conversation_summaries table, which message_service.create keeps up to date.
 
     Parameters:
         user_id (int): The ID of the user.
         order (str): The order in which to sort the conversations (asc or desc).
+        limit (int | None): The maximum number of conversations to return, None for all of them.
+        cursor (dict | None): A decoded inbox cursor (see `decode_cursor`);
+            only conversations after the cursor position are returned.
 
     Returns:
-        list[dict]: A list of conversations with conversation ID, username, first name, last message, and sent time.
+        list[dict]: A list of conversations with conversation ID, username, first name, last message,
+        sent time and the number of messages the user has not read yet.
     """
-    query = f"""
-            SELECT DISTINCT c.id AS conversation_id,
-                   CASE 
-                       WHEN c.user1_id = ? THEN u2.id 
-                       ELSE u1.id 
-                   END AS user_id,
-                   CASE 
-                       WHEN c.user1_id = ? THEN u2.first_name 
-                       ELSE u1.first_name 
-                   END AS first_name,
-                   CASE 
-                       WHEN c.user1_id = ? THEN u2.picture 
-                       ELSE u1.picture
-                   END AS picture,
-                   m.text AS last_message,
-                   m.sent_at AS last_sent_at
-            FROM conversations c
-            JOIN users u1 ON c.user1_id = u1.id
-            JOIN users u2 ON c.user2_id = u2.id
-            JOIN messages m ON c.id = m.conversation_id
-            WHERE m.sent_at = (
-                SELECT MAX(m2.sent_at)
-                FROM messages m2
-                WHERE m2.conversation_id = c.id
-            )
-            AND (c.user1_id = ? OR c.user2_id = ?)
-            ORDER BY m.sent_at {order}
+    direction = "DESC" if order == "desc" else "ASC"
+    query = """
+            SELECT s.conversation_id, s.other_user_id, u.first_name, u.picture,
+                   m.text AS last_message, s.last_sent_at, s.unread_count
+            FROM conversation_summaries s
+            JOIN users u ON s.other_user_id = u.id
+            JOIN messages m ON s.last_message_id = m.id
+            WHERE s.user_id = ?
             """
+    params = [user_id]
+
+    if cursor is not None:
+        operator = "<" if direction == "DESC" else ">"
+        query += f""" AND (s.last_sent_at {operator} ? OR (s.last_sent_at = ? AND s.conversation_id {operator} ?))"""
+        params.extend((cursor["sent_at"], cursor["sent_at"], cursor["conversation_id"]))
 
-    result = read_query(query, (user_id, user_id, user_id, user_id, user_id))
+    query += f" ORDER BY s.last_sent_at {direction}, s.conversation_id {direction}"
+
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    result = read_query(query, tuple(params))
     conversations = []
     for conversation in result:
         conversations.append({
@@ -114,27 +208,172 @@ def get_conversations(user_id: int, order="asc") -> list[dict]:
             "picture": None if conversation[3] == 1 else f"{conversation[3]}",
             "last_message": conversation[4],
             "sent_at": conversation[5],
+            "unread_count": conversation[6],
         })
 
     return conversations
 
 
-def _get_last_message(conversation_id: int) -> tuple | None:
+def get_conversations_page(user_id: int, order: str, limit: int, cursor: dict | None = None) -> tuple:
     """
-    Retrieve the last message for a given conversation ID.
+    Retrieve one page of the conversations of a user together with the cursor of the next page.
+
+    Parameters:
+        user_id (int): The ID of the user.
+        order (str): The order in which to sort the conversations (asc or desc).
+        limit (int): The maximum number of conversations to return.
+        cursor (dict | None): A decoded inbox cursor of the page to retrieve.
+
+    Returns:
+        tuple: The list of conversations and the cursor of the next page (None if this is the last page).
+    """
+    # one extra row tells whether there is anything beyond this page
+    conversations = get_conversations(user_id, order, limit + 1, cursor)
+
+    if len(conversations) <= limit:
+        return conversations, None
+
+    conversations = conversations[:limit]
+
+    return conversations, encode_cursor(conversations[-1])
+
+
+def encode_cursor(conversation: dict) -> str:
+    """
+    Encode the position of a conversation in the inbox into an opaque cursor.
+
+    Parameters:
+        conversation (dict): The last conversation of a page, as returned by `get_conversations`.
+
+    Returns:
+        str: The cursor.
+    """
+    return cursors.encode({"sent_at": conversation["sent_at"].isoformat(),
+                           "conversation_id": conversation["conversation_id"]})
+
+
+def decode_cursor(cursor: str) -> dict | None:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Parameters:
+        cursor (str): The opaque cursor received from the client.
+
+    Returns:
+        dict | None: The sent time and conversation ID of the cursor, or None if the cursor is malformed.
+    """
+    payload = cursors.decode(cursor)
+    if payload is None:
+        return None
+
+    try:
+        return {"sent_at": datetime.fromisoformat(payload["sent_at"]),
+                "conversation_id": int(payload["conversation_id"])}
+
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def record_message(conversation_id: int, message_id: int, sender_id: int, receiver_id: int) -> None:
+    """
+    Update the inbox summaries of both participants of a conversation with a new message.
+    The receiver's unread count grows by one; a conversation with oneself has a single summary.
 
     Parameters:
         conversation_id (int): The ID of the conversation.
+        message_id (int): The ID of the new message.
+        sender_id (int): The ID of the sender.
+        receiver_id (int): The ID of the receiver.
 
     Returns:
-        tuple | None: A tuple containing the text and sent time of the last message, or None if no messages are found.
+        None
     """
+    # assignments run left to right, so last_sent_at is compared before last_message_id changes
     query = """
-            SELECT text, sent_at
-            FROM messages
-            WHERE conversation_id = ?
-            ORDER BY sent_at DESC
-            LIMIT 1
+            INSERT INTO conversation_summaries
+                (user_id, conversation_id, other_user_id, last_message_id, last_sent_at, unread_count)
+            SELECT ?, m.conversation_id, ?, m.id, m.sent_at, ?
+            FROM messages m
+            WHERE m.id = ?
+            ON DUPLICATE KEY UPDATE
+                last_sent_at = IF(VALUES(last_message_id) > last_message_id, VALUES(last_sent_at), last_sent_at),
+                last_message_id = GREATEST(last_message_id, VALUES(last_message_id)),
+                unread_count = unread_count + VALUES(unread_count)
             """
-    result = read_query(query, (conversation_id,))
-    return result[0] if result else None
+
+    insert_query(query, (sender_id, receiver_id, 0, message_id))
+    if receiver_id != sender_id:
+        insert_query(query, (receiver_id, sender_id, 1, message_id))
+
+    version_service.bump(version_service.INBOX, sender_id, receiver_id)
+    on_commit(lambda: invalidate_inbox_counts(sender_id, receiver_id))
+
+
+def mark_as_read(conversation_id: int, user_id: int) -> None:
+    """
+    Reset the unread count of a conversation for one of its participants.
+
+    Parameters:
+        conversation_id (int): The ID of the conversation.
+        user_id (int): The ID of the user who read the conversation.
+
+    Returns:
+        None
+    """
+    query = """
+            UPDATE conversation_summaries
+            SET unread_count = 0
+            WHERE user_id = ? AND conversation_id = ? AND unread_count > 0
+            """
+    # most views of a conversation find nothing unread, and then the inbox has not changed
+    if update_query(query, (user_id, conversation_id)):
+        version_service.bump(version_service.INBOX, user_id)
+        on_commit(lambda: invalidate_inbox_counts(user_id))
+
+
+def get_inbox_counts(user_id: int) -> dict:
+    """
+    Count the conversations of a user and how many of them have unread messages.
+    The counts come from the user's inbox summaries (a primary key range scan)
+    and are cached for a few seconds, so polling clients do not reach the database on every request.
+
+    Parameters:
+        user_id (int): The ID of the user.
+
+    Returns:
+        dict: The number of conversations ("count") and of conversations with unread messages ("unread").
+    """
+    cached = _inbox_counts_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    query = """
+            SELECT COUNT(*), COALESCE(SUM(unread_count > 0), 0)
+            FROM conversation_summaries
+            WHERE user_id = ?
+            """
+    result = read_query(query, (user_id,))
+    count, unread = result[0] if result else (0, 0)
+
+    counts = {"count": int(count), "unread": int(unread)}
+    _inbox_counts_cache.set(user_id, counts)
+
+    return counts
+
+
+def invalidate_inbox_counts(*user_ids: int) -> None:
+    """
+    Drop the cached inbox counts of the given users.
+
+    Parameters:
+        user_ids (int): The IDs of the users whose inbox changed.
+
+    Returns:
+        None
+    """
+    for user_id in user_ids:
+        _inbox_counts_cache.invalidate(user_id)
+
+
+def _participants(user1_id: int, user2_id: int) -> tuple[int, int]:
+    return min(user1_id, user2_id), max(user1_id, user2_id)
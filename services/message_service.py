@@ -1,7 +1,5 @@
-from starlette.responses import Response
-
-from common.auth import get_password_hash
-from data.database import insert_query, read_query
+from common import message_bus
+from data.database import insert_query, read_query, unit_of_work, on_commit
 from schemas.message import Message
 from services import conversation_service
 from services.user_service import get_user_by_id
@@ -9,7 +7,7 @@ from services.user_service import get_user_by_id
 
 def create(message: Message, receiver_id: int, sender_id: int) -> str:
     """
-    Create a new message.
+    Create a new message. Once it is committed, it is pushed to the live connections of both users.
 
     Parameters:
         message (Message): The message to be sent.
@@ -19,45 +17,77 @@ def create(message: Message, receiver_id: int, sender_id: int) -> str:
     Returns:
         str: A confirmation message indicating the message was sent successfully.
     """
-    conversation_id = _get_conversation_id(sender_id, receiver_id)
-
     query = """
             INSERT INTO messages(text, sender_id, receiver_id, conversation_id)
             VALUES(?, ?, ?, ?)
             """
-    insert_query(query, (message.text, sender_id, receiver_id, conversation_id))
+    with unit_of_work():
+        conversation_id = conversation_service.get_or_create_conversation_id(sender_id, receiver_id)
+        message_id = insert_query(query, (message.text, sender_id, receiver_id, conversation_id))
+        conversation_service.record_message(conversation_id, message_id, sender_id, receiver_id)
+        event = _get_message_event(message_id)
+        on_commit(lambda: publish_message(event))
     first_name = get_user_by_id(receiver_id).first_name
 
     return f"The message to {first_name} was sent successfully!"
 
 
-def _get_conversation_id(user1_id: int, user2_id: int) -> int:
+def publish_message(event: dict) -> None:
     """
-     Retrieve or create a conversation ID for the given user IDs.
+    Push a message to the live connections of its sender and receiver.
 
-     Parameters:
-         user1_id (int): The ID of the first user.
-         user2_id (int): The ID of the second user.
+    Parameters:
+        event (dict): The message, as returned by `_get_message_event`.
 
-     Returns:
-         int: The ID of the conversation between the two users.
-     """
-    result = conversation_service.get_conversation_id(user1_id, user2_id)
+    Returns:
+        None
+    """
+    bus = message_bus.get_bus()
+    bus.publish(user_channel(event["to_id"]), event)
+    if event["from_id"] != event["to_id"]:
+        bus.publish(user_channel(event["from_id"]), event)
 
-    if not result:
-        query = """
-                INSERT INTO conversations(user1_id, user2_id)
-                VALUES(?, ?)
-                """
-        insert_query(query, (user1_id, user2_id))
 
-        select_query = """
-                    SELECT id
-                    FROM conversations
-                    WHERE (user1_id = ? AND user2_id = ?)
-                    OR (user1_id = ? AND user2_id = ?)
-                """
-        result = read_query(select_query, (user1_id, user2_id, user2_id, user1_id))
-        result = result[0][0]
+def user_channel(user_id: int) -> str:
+    """
+    Return the name of the message bus channel that carries a user's new messages.
+
+    Parameters:
+        user_id (int): The ID of the user.
+
+    Returns:
+        str: The channel name.
+    """
+    return f"messages:{user_id}"
+
+
+def _get_message_event(message_id: int) -> dict:
+    """
+    Build the JSON-serializable form of a message that is pushed to live connections.
+    It has the fields of `conversation_service.get_conversation`, plus the message, conversation and receiver IDs.
+
+    Parameters:
+        message_id (int): The ID of the message.
+
+    Returns:
+        dict: The message.
+    """
+    query = """
+            SELECT m.id, m.conversation_id, m.text, m.sender_id, m.receiver_id, u.first_name, m.sent_at, u.picture
+            FROM messages m
+            JOIN users u ON m.sender_id = u.id
+            WHERE m.id = ?
+            """
+    result = read_query(query, (message_id,))
+    id, conversation_id, text, sender_id, receiver_id, first_name, sent_at, picture = result[0]
 
-    return result
+    return {
+        "id": id,
+        "conversation_id": conversation_id,
+        "text": text,
+        "from_id": sender_id,
+        "to_id": receiver_id,
+        "from": first_name,
+        "sent_at": sent_at.isoformat(),
+        "picture": picture
+    }
@@ -1,4 +1,4 @@
-from data.database import read_query, insert_query
+from data.database import read_query, insert_query, update_query, unit_of_work
 from schemas.reply import Reply, CreateReplyRequest
 
 
@@ -13,15 +13,9 @@ def get_by_id(reply_id: int) -> Reply | None:
          Reply | None: The Reply object if found, otherwise None.
      """
     query = """SELECT r.id, r.content, r.topic_id, r.created_at, r.is_best_reply, r.author_id,
-            SUM(CASE 
-                WHEN v.vote_type = True THEN 1 
-                WHEN v.vote_type = False THEN -1 
-                ELSE 0 
-            END) as vote_count
+            r.score as vote_count
     FROM replies r
-    LEFT JOIN votes v ON r.id = v.reply_id
-    WHERE r.id = ?
-    GROUP BY r.id"""
+    WHERE r.id = ?"""
 
     reply_data = read_query(query, (reply_id,))
 
@@ -66,11 +60,33 @@ def create(reply: CreateReplyRequest, user_id: int) -> Reply:
                 VALUES(?, ?, ?)"""
     params = [reply.content, reply.topic_id, user_id]
 
-    generated_id = insert_query(query, (*params,))
+    # the reply and the reply counters of its topic are written in one transaction
+    with unit_of_work():
+        generated_id = insert_query(query, (*params,))
+        _increment_topic_counters(generated_id)
 
     return get_by_id(generated_id)
 
 
+def _increment_topic_counters(reply_id: int) -> None:
+    """
+    Count a new reply in the replies_count and last_reply_at columns of its topic.
+
+    Parameters:
+        reply_id (int): The ID of the new reply.
+
+    Returns:
+        None
+    """
+    query = """UPDATE topics t
+                JOIN replies r ON r.id = ?
+                SET t.replies_count = t.replies_count + 1,
+                    t.last_reply_at = GREATEST(COALESCE(t.last_reply_at, r.created_at), r.created_at)
+                WHERE t.id = r.topic_id"""
+
+    update_query(query, (reply_id,))
+
+
 def reply_belongs_to_topic(reply_id: int, topic_id: int) -> bool:
     """
     Check if a reply belongs to a specific topic.
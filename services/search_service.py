@@ -0,0 +1,138 @@
+import html
+import re
+
+from common import cursors
+from data.database import read_query
+from schemas.search import SearchResult
+from services import user_service, category_service
+
+_SNIPPET_WIDTH = 200
+
+
+def search(text: str, user_id: int, limit: int, cursor: dict | None = None) -> tuple:
+    """
+    Search topic titles, topic content and reply content with the MariaDB full-text indexes.
+    Results are ranked by relevance and limited to the categories the user can read.
+
+    Parameters:
+        text (str): The search terms.
+        user_id (int): The ID of the user searching.
+        limit (int): The maximum number of results to return.
+        cursor (dict | None): A decoded search cursor (see `decode_cursor`);
+            only results after the cursor position are returned.
+
+    Returns:
+        tuple: The list of SearchResult objects, with the matching terms highlighted,
+        and the cursor of the next page (None if this is the last page).
+    """
+    topic_access, reply_access, access_params = "", "", []
+    if not user_service.is_admin(user_id):
+        condition, access_params = category_service.visible_categories_condition("t.category_id", user_id)
+        topic_access = reply_access = f" AND {condition}"
+
+    matches = f"""SELECT 'topic' AS type, t.id, t.id AS topic_id, t.title AS topic_title, t.content AS body,
+                    t.created_at, MATCH(t.title, t.content) AGAINST (?) AS relevance
+                FROM topics t
+                WHERE MATCH(t.title, t.content) AGAINST (?){topic_access}
+                UNION ALL
+                SELECT 'reply', r.id, r.topic_id, t.title, r.content, r.created_at, MATCH(r.content) AGAINST (?)
+                FROM replies r
+                JOIN topics t ON t.id = r.topic_id
+                WHERE MATCH(r.content) AGAINST (?){reply_access}"""
+    params = [text, text, *access_params, text, text, *access_params]
+
+    query = f"SELECT type, id, topic_id, topic_title, body, created_at, relevance FROM ({matches}) s"
+
+    if cursor is not None:
+        query += """ WHERE (s.relevance < ? OR (s.relevance = ? AND (s.type > ? OR (s.type = ? AND s.id > ?))))"""
+        params.extend((cursor["relevance"], cursor["relevance"], cursor["type"], cursor["type"], cursor["id"]))
+
+    # one extra row tells whether there is anything beyond this page
+    query += " ORDER BY s.relevance DESC, s.type, s.id LIMIT ?"
+    params.append(limit + 1)
+
+    rows = read_query(query, tuple(params))
+
+    terms = _terms(text)
+    results = [SearchResult.from_query_result(type, id, topic_id, topic_title, highlight(body, terms),
+                                              created_at, relevance)
+               for type, id, topic_id, topic_title, body, created_at, relevance in rows[:limit]]
+
+    next_cursor = encode_cursor(results[-1]) if len(rows) > limit else None
+
+    return results, next_cursor
+
+
+def highlight(text: str, terms: list[str], width: int = _SNIPPET_WIDTH) -> str:
+    """
+    Cut a snippet around the first matching term and wrap every match in <mark> tags.
+    The rest of the text is HTML-escaped, so the snippet can be rendered as is.
+
+    Parameters:
+        text (str): The text to cut the snippet from.
+        terms (list[str]): The lowercase search terms; words starting with a term match too.
+        width (int): The maximum length of the snippet, before highlighting.
+
+    Returns:
+        str: The highlighted snippet.
+    """
+    if not terms:
+        return html.escape(text[:width])
+
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(term) for term in terms) + r")\w*", re.IGNORECASE)
+
+    first_match = pattern.search(text)
+    start = 0 if first_match is None else max(0, first_match.start() - width // 3)
+    end = min(len(text), start + width)
+    fragment = text[start:end]
+
+    parts = []
+    position = 0
+    for match in pattern.finditer(fragment):
+        parts.append(html.escape(fragment[position:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        position = match.end()
+    parts.append(html.escape(fragment[position:]))
+
+    return ("..." if start > 0 else "") + "".join(parts) + ("..." if end < len(text) else "")
+
+
+def encode_cursor(result: SearchResult) -> str:
+    """
+    Encode the position of a search result in the ranking into an opaque cursor.
+
+    Parameters:
+        result (SearchResult): The last result of a page.
+
+    Returns:
+        str: The cursor.
+    """
+    return cursors.encode({"relevance": result.relevance, "type": result.type, "id": result.id})
+
+
+def decode_cursor(cursor: str) -> dict | None:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Parameters:
+        cursor (str): The opaque cursor received from the client.
+
+    Returns:
+        dict | None: The relevance, type and ID of the result, or None if the cursor is malformed.
+    """
+    payload = cursors.decode(cursor)
+    if payload is None:
+        return None
+
+    try:
+        if payload["type"] not in ("topic", "reply"):
+            return None
+
+        return {"relevance": float(payload["relevance"]), "type": payload["type"], "id": int(payload["id"])}
+
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _terms(text: str) -> list[str]:
+    return list(dict.fromkeys(re.findall(r"\w+", text.lower())))
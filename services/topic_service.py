@@ -1,14 +1,36 @@
-from data.database import insert_query, read_query, update_query
+from collections.abc import Iterator
+from datetime import datetime
+
+from common import cursors
+from data.database import insert_query, read_query, update_query, unit_of_work
 from schemas.reply import Reply
 from schemas.topic import ViewAllTopics, Topic, SingleTopic, CreateTopicRequest
-from services import user_service
+from services import user_service, reply_service, category_service, version_service
+
+
+# sort key -> (SQL expression, whether it is a computed column that can only be filtered in HAVING)
+SORT_KEYS = {
+    "created_at": ("t.created_at", False),
+    "replies_count": ("t.replies_count", False),
+    "last_activity": ("t.last_activity_at", False),
+    "score": ("score", True),
+}
+_DATETIME_SORT_KEYS = ("created_at", "last_activity")
+
+_SCORE_SUBQUERY = """(SELECT COALESCE(SUM(r.score), 0)
+                    FROM replies r
+                    WHERE r.topic_id = t.id)"""
 
 
 def get_all_topics(search: str | None, category_id: int | None,
                    author_id: int | None, is_locked: bool | None,
-                   user_id: int, limit: int, offset: int) -> list[ViewAllTopics]:
+                   user_id: int, limit: int, offset: int,
+                   sort: str = "asc", cursor: dict | None = None,
+                   sort_by: str = "created_at") -> list[ViewAllTopics]:
     """
-    Retrieve all topics based on the provided filters.
+    Retrieve all topics based on the provided filters, sorted by the database, together with
+    the username of their author and the title of their category.
+    Topics with an equal sort value are ordered by ID, so the order is stable across pages.
 
      Parameters:
         search (str | None): A search term to filter topics by title.
@@ -18,30 +40,182 @@ def get_all_topics(search: str | None, category_id: int | None,
         user_id (int): The ID of the user requesting the topics.
         limit (int): The maximum number of topics to return.
         offset (int): The number of topics to skip before starting to return results.
+            Ignored when a cursor is given.
+        sort (str): "asc" or "desc", the direction of the ordering.
+        cursor (dict | None): A decoded cursor (see `decode_cursor`); only topics after
+            (or, for a "prev" cursor, before) the cursor position are returned.
+        sort_by (str): One of SORT_KEYS: "created_at", "replies_count",
+            "last_activity" (date of the latest reply, or of the topic itself) or
+            "score" (sum of the votes on the topic's replies).
 
     Returns:
         list[ViewAllTopics]: A list of topics matching the filters.
     """
+    sort_expression, is_computed = SORT_KEYS[sort_by]
+    # the score is only computed when it is needed for ordering
+    score_column = _SCORE_SUBQUERY if sort_by == "score" else "NULL"
 
-    base_query = """SELECT t.id, t.title, t.is_locked, t.created_at, t.author_id , t.category_id, COALESCE(COUNT(r.id), 0) as replies_count
+    # reply counters are kept on the topic row by reply_service.create, so no join on replies is needed;
+    # the author and category names are primary key lookups for the rows of the page
+    base_query = f"""SELECT t.id, t.title, t.is_locked, t.created_at, t.author_id , t.category_id, t.replies_count,
+                t.last_activity_at as last_activity, {score_column} as score, u.username, c.title
                 FROM topics t
-                JOIN categories c ON t.category_id = c.id
-                LEFT JOIN replies r ON t.id = r.topic_id"""
+                JOIN users u ON u.id = t.author_id
+                JOIN categories c ON c.id = t.category_id"""
 
     # build conditions and params
     where_conditions, params = _build_conditions_and_params(search, category_id,
                                                             author_id, is_locked, user_id)
+    having_conditions, having_params = [], []
+
+    # a "prev" cursor walks the ordering backwards, the page is flipped back below
+    backwards = cursor is not None and cursor["direction"] == "prev"
+    descending = (sort == "desc") != backwards
+
+    if cursor is not None:
+        # computed sort values only exist in the selected row, so they are filtered in HAVING
+        if is_computed:
+            _add_keyset_condition(having_conditions, having_params, sort_expression, cursor, descending)
+        else:
+            _add_keyset_condition(where_conditions, params, sort_expression, cursor, descending)
+        offset = 0
+
+    direction = "DESC" if descending else "ASC"
+    order_by = f" ORDER BY {sort_expression} {direction}, t.id {direction}"
 
     # build final query
     final_query, params = _build_final_query(base_query, where_conditions,
-                                     params, limit, offset)
+                                     params, limit, offset, order_by,
+                                     having_conditions, having_params)
 
     # execute query
     topics = read_query(final_query, (*params,))
+    if backwards:
+        topics = topics[::-1]
 
     return [ViewAllTopics.from_query_result(*topic) for topic in topics]
 
 
+def get_topics_page(search: str | None, category_id: int | None,
+                    author_id: int | None, is_locked: bool | None,
+                    user_id: int, limit: int, offset: int,
+                    sort: str = "asc", cursor: dict | None = None,
+                    sort_by: str = "created_at") -> tuple:
+    """
+    Retrieve one page of topics together with the cursors of the neighbouring pages.
+    Paging with cursors costs the same for every page, unlike a growing offset.
+
+    Parameters:
+        search (str | None): A search term to filter topics by title.
+        category_id (int | None): The ID of the category to filter topics.
+        author_id (int | None): The ID of the author to filter topics.
+        is_locked (bool | None): The lock status to filter topics.
+        user_id (int): The ID of the user requesting the topics.
+        limit (int): The maximum number of topics to return.
+        offset (int): The number of topics to skip. Ignored when a cursor is given.
+        sort (str): "asc" or "desc", the direction of the ordering.
+        cursor (dict | None): A decoded cursor of the page to retrieve.
+        sort_by (str): The sort key, one of SORT_KEYS.
+
+    Returns:
+        tuple: The list of topics, the cursor of the next page and the cursor of the
+        previous page (each cursor is None when there is no such page).
+    """
+    # one extra row tells whether there is anything beyond this page
+    topics = get_all_topics(search, category_id, author_id, is_locked,
+                            user_id, limit + 1, offset, sort, cursor, sort_by)
+
+    backwards = cursor is not None and cursor["direction"] == "prev"
+    has_more = len(topics) > limit
+    topics = topics[-limit:] if backwards else topics[:limit]
+
+    if not topics:
+        return topics, None, None
+
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else (cursor is not None or offset > 0)
+
+    next_cursor = encode_cursor(topics[-1], "next", sort_by) if has_next else None
+    prev_cursor = encode_cursor(topics[0], "prev", sort_by) if has_prev else None
+
+    return topics, next_cursor, prev_cursor
+
+
+def encode_cursor(topic: ViewAllTopics, direction: str, sort_by: str = "created_at") -> str:
+    """
+    Encode the position of a topic in a sort order into an opaque, URL-safe cursor.
+
+    Parameters:
+        topic (ViewAllTopics): The first or last topic of a page.
+        direction (str): "next" to continue after the topic, "prev" to go back before it.
+        sort_by (str): The sort key the page was ordered by.
+
+    Returns:
+        str: The cursor.
+    """
+    value = getattr(topic, sort_by)
+    if sort_by in _DATETIME_SORT_KEYS:
+        value = value.isoformat()
+
+    return cursors.encode({"sort_by": sort_by, "value": value, "id": topic.id, "direction": direction})
+
+
+def decode_cursor(cursor: str) -> dict | None:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Parameters:
+        cursor (str): The opaque cursor received from the client.
+
+    Returns:
+        dict | None: The sort key, sort value, topic ID and direction of the cursor,
+        or None if the cursor is malformed.
+    """
+    payload = cursors.decode(cursor)
+    if payload is None:
+        return None
+
+    try:
+        sort_by = payload["sort_by"]
+        if sort_by not in SORT_KEYS:
+            return None
+
+        value = payload["value"]
+        value = datetime.fromisoformat(value) if sort_by in _DATETIME_SORT_KEYS else int(value)
+
+        return {
+            "sort_by": sort_by,
+            "value": value,
+            "id": int(payload["id"]),
+            "direction": "prev" if payload["direction"] == "prev" else "next",
+        }
+
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _add_keyset_condition(conditions: list, params: list, sort_expression: str,
+                          cursor: dict, descending: bool) -> None:
+    """
+    Restrict the query to the topics that come after the cursor position
+    in the (sort value, id) ordering.
+
+    Parameters:
+        conditions (list): The WHERE or HAVING conditions to extend.
+        params (list): The query parameters to extend.
+        sort_expression (str): The SQL expression of the sort key.
+        cursor (dict): The decoded cursor.
+        descending (bool): Whether the query walks the ordering in descending order.
+
+    Returns:
+        None
+    """
+    operator = "<" if descending else ">"
+    conditions.append(
+        f"({sort_expression} {operator} ? OR ({sort_expression} = ? AND t.id {operator} ?))")
+    params.extend((cursor["value"], cursor["value"], cursor["id"]))
+
+
 def _build_conditions_and_params(search: str | None, category_id: int | None,
                                  author_id: int | None, is_locked: bool | None,
                                  user_id: int) -> tuple:
@@ -63,8 +237,9 @@ def _build_conditions_and_params(search: str | None, category_id: int | None,
 
     # check if user is not admin
     if not user_service.is_admin(user_id):
-        where_conditions.append("""(c.is_private = 0 OR (c.is_private = 1 AND EXISTS (SELECT 1 FROM category_accesses ca WHERE ca.category_id = t.category_id AND ca.user_id = ?)))""")
-        params.append(user_id)
+        condition, condition_params = category_service.visible_categories_condition("t.category_id", user_id)
+        where_conditions.append(condition)
+        params.extend(condition_params)
 
     # check for optional parameters
     if search is not None:
@@ -87,7 +262,8 @@ def _build_conditions_and_params(search: str | None, category_id: int | None,
 
 
 def _build_final_query(base_query: str, where_conditions: list,
-                       params: list, limit: int, offset: int) -> tuple:
+                       params: list, limit: int, offset: int, order_by: str = "",
+                       having_conditions: list = (), having_params: list = ()) -> tuple:
     """
     Build the final SQL query with the provided base query, conditions, and parameters.
 
@@ -97,89 +273,211 @@ def _build_final_query(base_query: str, where_conditions: list,
         params (list): A list of parameters for the SQL query.
         limit (int): The maximum number of records to return.
         offset (int): The number of records to skip before starting to return results.
+        order_by (str): An optional ORDER BY clause.
+        having_conditions (list): HAVING conditions to apply after grouping.
+        having_params (list): The parameters of the HAVING conditions.
 
     Returns:
         tuple: A tuple containing the final SQL query and the list of parameters.
     """
     where_clause = " WHERE " + " AND ".join(where_conditions) if where_conditions else ""
-    final_query = f"{base_query}{where_clause} GROUP BY t.id LIMIT ? OFFSET ?"
+    having_clause = " HAVING " + " AND ".join(having_conditions) if having_conditions else ""
+    final_query = f"{base_query}{where_clause}{having_clause}{order_by} LIMIT ? OFFSET ?"
+    params.extend(having_params)
     params.append(limit)
     params.append(offset)
 
     return final_query, params
 
 
-def sort_topics(topics: list[ViewAllTopics],
-                reverse=False) -> list[ViewAllTopics]:
+def recalculate_reply_counters(after_id: int = 0, batch_size: int = 500) -> int | None:
     """
-    Sort a list of topics by their creation date.
+    Recompute the replies_count and last_reply_at columns of one batch of topics from their replies.
 
     Parameters:
-        topics (list[ViewAllTopics]): The list of topics to sort.
-        reverse (bool): Whether to sort in descending order. Defaults to False.
+        after_id (int): Only topics with a greater ID are recomputed.
+        batch_size (int): The maximum number of topics to recompute.
 
     Returns:
-        list[ViewAllTopics]: The sorted list of topics.
+        int | None: The ID of the last recomputed topic, or None if there were no topics left.
     """
+    topic_ids = read_query("""SELECT id FROM topics WHERE id > ? ORDER BY id LIMIT ?""",
+                           (after_id, batch_size))
+
+    if not topic_ids:
+        return None
+
+    first_id, last_id = topic_ids[0][0], topic_ids[-1][0]
 
-    return sorted(topics,  key=lambda t: t.created_at, reverse=reverse)
+    query = """UPDATE topics t
+                LEFT JOIN (SELECT topic_id, COUNT(*) AS replies_count, MAX(created_at) AS last_reply_at
+                           FROM replies
+                           WHERE topic_id BETWEEN ? AND ?
+                           GROUP BY topic_id) r ON r.topic_id = t.id
+                SET t.replies_count = COALESCE(r.replies_count, 0), t.last_reply_at = r.last_reply_at
+                WHERE t.id BETWEEN ? AND ?"""
 
+    update_query(query, (first_id, last_id, first_id, last_id))
 
-def get_by_id_with_replies(topic_id: int) -> SingleTopic | None:
+    return last_id
+
+
+def get_by_id_with_replies(topic_id: int, best_first: bool = False) -> SingleTopic | None:
     """
-    Retrieve a topic by its ID along with its replies.
+    Retrieve a topic by its ID along with all of its replies.
 
     Parameters:
         topic_id (int): The ID of the topic to retrieve.
+        best_first (bool): Whether to put the best reply before the other replies.
 
     Returns:
         SingleTopic | None: The SingleTopic object containing the topic and its replies if found, otherwise None.
     """
-    query = """
-    SELECT 
-        t.id, t.title, t.content, t.is_locked, t.category_id, t.created_at, t.best_reply_id, t.author_id,
-        r.id as reply_id, r.content as reply_content, r.topic_id as topic_id, r.created_at as reply_created_at, r.is_best_reply as reply_is_best_reply, r.author_id as reply_author_id,
-        SUM(CASE 
-                WHEN v.vote_type = True THEN 1 
-                WHEN v.vote_type = False THEN -1 
-                ELSE 0 
-            END) as vote_count
-    FROM topics t
-    LEFT JOIN replies r ON t.id = r.topic_id
-    LEFT JOIN votes v ON r.id = v.reply_id
-    WHERE t.id = ?
-    GROUP BY t.id, r.id
-    """
-
-    data = read_query(query, (topic_id,))
-    if not data:
+    topic = get_by_id(topic_id)
+    if topic is None:
         return None
 
-    # create topic
-    topic_data = data[0][:8]
-    topic = Topic.from_query_result(*topic_data)
-
-    # create reply list
-    replies = [_create_reply_from_row(row) for row in data if row[8]]
+    replies, _ = get_replies_page(topic, None, best_first=best_first)
 
     return SingleTopic(topic=topic, all_replies=replies)
 
 
-def _create_reply_from_row(row) -> Reply:
+def get_replies_page(topic: Topic, limit: int | None, cursor: dict | None = None,
+                     best_first: bool = False) -> tuple:
+    """
+    Retrieve one page of the replies of a topic, oldest first.
+
+    Parameters:
+        topic (Topic): The topic whose replies to retrieve.
+        limit (int | None): The maximum number of replies to return, None for all of them.
+        cursor (dict | None): A decoded reply cursor (see `decode_reply_cursor`);
+            only replies after the cursor position are returned.
+        best_first (bool): Whether to put the best reply at the top of the first page,
+            on top of the `limit` other replies. It is then left out of the chronological
+            order on every page.
+
+    Returns:
+        tuple: The list of replies and the cursor of the next page (None if this is the last page).
+    """
+    replies = []
+    exclude_reply_id = topic.best_reply_id if best_first else None
+
+    if exclude_reply_id is not None and cursor is None:
+        best_reply = reply_service.get_by_id(exclude_reply_id)
+        if best_reply is not None:
+            replies.append(best_reply)
+
+    # one extra row tells whether there is anything beyond this page
+    page = _get_replies(topic.id, None if limit is None else limit + 1, cursor, exclude_reply_id)
+
+    has_more = limit is not None and len(page) > limit
+    if has_more:
+        page = page[:limit]
+    replies.extend(page)
+
+    next_cursor = encode_reply_cursor(page[-1]) if has_more and page else None
+
+    return replies, next_cursor
+
+
+def stream_topic_with_replies(topic: Topic, best_first: bool = False, batch_size: int = 200) -> Iterator[str]:
+    """
+    Serialize a topic and all of its replies as a SingleTopic JSON document, piece by piece.
+    Replies are read one batch at a time, so the whole thread is never held in memory.
+
+    Parameters:
+        topic (Topic): The topic to serialize.
+        best_first (bool): Whether to put the best reply before the other replies.
+        batch_size (int): The number of replies read per query.
+
+    Returns:
+        Iterator[str]: The chunks of the JSON document.
+    """
+    yield '{"topic":' + topic.model_dump_json() + ',"all_replies":['
+
+    cursor = None
+    separator = ""
+    while True:
+        replies, next_cursor = get_replies_page(topic, batch_size, cursor, best_first)
+        if replies:
+            yield separator + ",".join(reply.model_dump_json() for reply in replies)
+            separator = ","
+
+        if next_cursor is None:
+            break
+        cursor = decode_reply_cursor(next_cursor)
+
+    yield "]}"
+
+
+def encode_reply_cursor(reply: Reply) -> str:
+    """
+    Encode the position of a reply in the chronological order of its topic into a cursor.
+
+    Parameters:
+        reply (Reply): The last reply of a page.
+
+    Returns:
+        str: The cursor.
+    """
+    return cursors.encode({"created_at": reply.created_at.isoformat(), "id": reply.id})
+
+
+def decode_reply_cursor(cursor: str) -> dict | None:
     """
-    Create a Reply object from a database row.
+    Decode a cursor produced by `encode_reply_cursor`.
 
     Parameters:
-        row: The database row containing reply data.
+        cursor (str): The opaque cursor received from the client.
 
     Returns:
-        Reply: The Reply object created from the row data.
+        dict | None: The creation date and ID of the reply, or None if the cursor is malformed.
     """
-    reply_data = row[8:]
-    reply = Reply.from_query_result(*reply_data)
-    reply.vote_count = int(row[14])
+    payload = cursors.decode(cursor)
+    if payload is None:
+        return None
+
+    try:
+        return {"created_at": datetime.fromisoformat(payload["created_at"]), "id": int(payload["id"])}
+
+    except (ValueError, KeyError, TypeError):
+        return None
 
-    return reply
+
+def _get_replies(topic_id: int, limit: int | None, cursor: dict | None,
+                 exclude_reply_id: int | None) -> list[Reply]:
+    """
+    Retrieve the replies of a topic in (created_at, id) order, using the (topic_id, created_at) index.
+
+    Parameters:
+        topic_id (int): The ID of the topic.
+        limit (int | None): The maximum number of replies to return, None for no limit.
+        cursor (dict | None): A decoded reply cursor to continue after.
+        exclude_reply_id (int | None): The ID of a reply to leave out.
+
+    Returns:
+        list[Reply]: The replies.
+    """
+    query = """SELECT r.id, r.content, r.topic_id, r.created_at, r.is_best_reply, r.author_id, r.score
+                FROM replies r
+                WHERE r.topic_id = ?"""
+    params = [topic_id]
+
+    if exclude_reply_id is not None:
+        query += " AND r.id <> ?"
+        params.append(exclude_reply_id)
+
+    if cursor is not None:
+        query += " AND (r.created_at > ? OR (r.created_at = ? AND r.id > ?))"
+        params.extend((cursor["created_at"], cursor["created_at"], cursor["id"]))
+
+    query += " ORDER BY r.created_at, r.id"
+
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    return [Reply.from_query_result(*row) for row in read_query(query, tuple(params))]
 
 
 def get_by_id(topic_id: int) -> Topic | None:
@@ -258,7 +556,29 @@ def change_topic_lock_status(topic_id: int, locked_status_code: bool) -> None:
                 SET is_locked = ? 
                 WHERE id = ?"""
 
-    update_query(query, (locked_status_code, topic_id))
+    with unit_of_work():
+        update_query(query, (locked_status_code, topic_id))
+        version_service.bump(version_service.TOPIC, topic_id)
+
+
+def change_topic_pinned_status(topic_id: int, pinned_status_code: bool) -> None:
+    """
+    Pin a topic to the top of its category's topic listing, or unpin it.
+
+    Parameters:
+        topic_id (int): The ID of the topic to update.
+        pinned_status_code (bool): The new pinned status code to set.
+
+    Returns:
+        None
+    """
+    query = """UPDATE topics 
+                SET is_pinned = ? 
+                WHERE id = ?"""
+
+    with unit_of_work():
+        update_query(query, (pinned_status_code, topic_id))
+        version_service.bump(version_service.TOPIC, topic_id)
 
 
 def validate_topic_author(topic_id: int, user_id: int) -> bool:
@@ -284,6 +604,7 @@ def validate_topic_author(topic_id: int, user_id: int) -> bool:
 def update_best_reply(topic_id: int, reply_id: int, prev_best_reply: int | None) -> None:
     """
     Update the best reply for a topic.
+    All three updates are committed together or not at all.
 
     Parameters:
         topic_id (int): The ID of the topic to update.
@@ -293,11 +614,13 @@ def update_best_reply(topic_id: int, reply_id: int, prev_best_reply: int | None)
     Returns:
         None
     """
-    if prev_best_reply is not None:
-        _mark_reply_as_not_best(prev_best_reply)
+    with unit_of_work():
+        if prev_best_reply is not None:
+            _mark_reply_as_not_best(prev_best_reply)
 
-    _update_topic_best_reply(topic_id, reply_id)
-    _mark_reply_as_best(reply_id)
+        _update_topic_best_reply(topic_id, reply_id)
+        _mark_reply_as_best(reply_id)
+        version_service.bump(version_service.TOPIC, topic_id)
 
 
 def get_topic_best_reply(topic_id: int) -> int | None:
@@ -371,55 +694,3 @@ def _mark_reply_as_best(reply_id: int) -> None:
                 WHERE id = ?"""
 
     update_query(query, (reply_id,))
-
-
-def get_authors_of_topics(topics: list[ViewAllTopics]) -> dict[int, str]:
-    """
-    Retrieve the authors of a list of topics.
-
-    Parameters:
-        topics (list[ViewAllTopics]): The list of topics to retrieve the authors for.
-
-    Returns:
-        dict[int, str]: A dictionary mapping topic IDs to their usernames.
-    """
-    topic_ids = [topic.id for topic in topics]
-
-    if not topic_ids:
-        return {}
-
-    placeholders = ", ".join("?" for _ in topic_ids)
-    query = f"""SELECT t.id, u.username 
-                FROM topics t 
-                JOIN users u ON t.author_id = u.id
-                WHERE t.id IN ({placeholders})"""
-
-    author_data = read_query(query, tuple(topic_ids))
-
-    return {topic_id: username for topic_id, username in author_data}
-
-
-def get_categories_of_topics(topics: list[ViewAllTopics]) -> dict[int, str]:
-    """
-    Retrieve the categories of a list of topics.
-
-    Parameters:
-        topics (list[ViewAllTopics]): The list of topics to retrieve the categories for.
-
-    Returns:
-        dict[int, str]: A dictionary mapping topic IDs to their category titles.
-    """
-    topic_ids = [topic.id for topic in topics]
-
-    if not topic_ids:
-        return {}
-
-    placeholders = ", ".join("?" for _ in topic_ids)
-    query = f"""SELECT t.id, c.title 
-                FROM topics t 
-                JOIN categories c ON t.category_id = c.id
-                WHERE t.id IN ({placeholders})"""
-
-    category_data = read_query(query, tuple(topic_ids))
-
-    return {topic_id: title for topic_id, title in category_data}
@@ -7,14 +7,16 @@ from typing import Union
 import data
 from fastapi import HTTPException
 
-from common.auth import get_password_hash
-from data.database import insert_query, read_query
+from common.auth import get_password_hash, get_principal, invalidate_principal
+from data.database import insert_query, read_query, unit_of_work, on_commit
 from schemas.user import UserCreate, User, UserUpdate
+from services import version_service
 
 
 def is_admin(user_id: int) -> bool:
     """
     Check if a user is an admin.
+    Served from the principal cache, so it is free right after authentication.
 
     Parameters:
         user_id (int): The ID of the user.
@@ -22,10 +24,9 @@ def is_admin(user_id: int) -> bool:
     Returns:
         bool: True if the user is an admin, False otherwise.
     """
-    query = """SELECT is_admin FROM users WHERE id = ?"""
-    result = read_query(query, (user_id,))
+    principal = get_principal(user_id)
 
-    return True if result[0][0] else False
+    return principal is not None and principal.is_admin
 
 
 def id_exists(user_id: int) -> bool:
@@ -111,7 +112,13 @@ def update(user_id: int, is_admin: bool) -> dict:
             SET is_admin = ?
             WHERE id = ?
             """
-    insert_query(query, (is_admin, user_id))
+    with unit_of_work():
+        insert_query(query, (is_admin, user_id))
+        version_service.bump(version_service.ACCESS, user_id)
+        # dropped again once the change is committed, in case another request
+        # cached the old admin status in the meantime
+        invalidate_principal(user_id)
+        on_commit(lambda: invalidate_principal(user_id))
 
     return {"msg": f"User with #ID {user_id} successfully updated to {'admin' if is_admin else 'regular user!'}"}
 
@@ -0,0 +1,132 @@
+from data.database import read_query, execute_many
+
+# entity names of the version counters
+# a topic, by topic ID; its stamp also covers its replies and their votes through the replies' own versions
+TOPIC = "topic"
+CATEGORIES = "categories"  # the list of all categories, a single counter with entity ID 0
+INBOX = "inbox"  # the conversations of a user, by user ID
+ACCESS = "access"  # what a user may see: admin rights and access to private categories, by user ID
+
+_BUMP_UPDATE = "ON DUPLICATE KEY UPDATE version = version + 1, updated_at = CURRENT_TIMESTAMP"
+
+
+def bump(entity: str, *entity_ids: int) -> None:
+    """
+    Increase the version counters of changed entities.
+    Call it in the unit of work that makes the change, so the new version is committed with it.
+
+    Parameters:
+        entity (str): The entity name, e.g. TOPIC.
+        *entity_ids (int): The IDs of the changed entities.
+
+    Returns:
+        None
+    """
+    # counters are locked in ID order, so concurrent transactions never wait for each other in a cycle
+    params = [(entity, entity_id) for entity_id in sorted(set(entity_ids))]
+    if not params:
+        return
+
+    execute_many(f"""INSERT INTO entity_versions (entity, entity_id)
+                    VALUES (?, ?)
+                    {_BUMP_UPDATE}""", params)
+
+
+def get_versions(*keys: tuple[str, int]) -> dict[tuple[str, int], tuple[int, int | None]]:
+    """
+    Retrieve the current version counters of several entities in one query.
+
+    Parameters:
+        *keys (tuple[str, int]): (entity name, entity ID) pairs.
+
+    Returns:
+        dict[tuple[str, int], tuple[int, int | None]]: The version and the UNIX time of the last change
+        by (entity name, entity ID); (0, None) for entities that never changed.
+    """
+    if not keys:
+        return {}
+
+    query = """SELECT entity, entity_id, version, UNIX_TIMESTAMP(updated_at)
+                FROM entity_versions
+                WHERE {}""".format(" OR ".join(["(entity = ? AND entity_id = ?)"] * len(keys)))
+
+    versions = dict.fromkeys(keys, (0, None))
+    for entity, entity_id, version, updated_at in read_query(query, tuple(value for key in keys for value in key)):
+        versions[(entity, entity_id)] = (version, int(updated_at))
+
+    return versions
+
+
+def get_reply_versions(*topic_ids: int) -> dict[int, tuple[int, int, int | None]]:
+    """
+    Retrieve the number of replies of several topics, the sum of their versions and their latest change in one query.
+    A reply's version increases with every change of its vote counters, and a new reply adds to the count,
+    so votes and replies change a topic's stamp without writing to a row shared by the whole topic.
+
+    Parameters:
+        *topic_ids (int): The IDs of the topics.
+
+    Returns:
+        dict[int, tuple[int, int, int | None]]: The reply count, the sum of the reply versions and
+        the UNIX time of the latest reply change by topic ID; None for topics without replies.
+    """
+    if not topic_ids:
+        return {}
+
+    query = """SELECT topic_id, COUNT(*), SUM(version), UNIX_TIMESTAMP(MAX(updated_at))
+                FROM replies
+                WHERE topic_id IN ({})
+                GROUP BY topic_id""".format(", ".join("?" * len(topic_ids)))
+
+    reply_versions = dict.fromkeys(topic_ids, (0, 0, None))
+    for topic_id, count, version_sum, updated_at in read_query(query, topic_ids):
+        reply_versions[topic_id] = (count, int(version_sum), int(updated_at))
+
+    return reply_versions
+
+
+def stamp(*keys: tuple[str, int]) -> str:
+    """
+    Describe the current versions of several entities in one string, which changes whenever any of them changes.
+
+    Parameters:
+        *keys (tuple[str, int]): (entity name, entity ID) pairs.
+
+    Returns:
+        str: The version stamp, e.g. "topic:5@3+12.40" for a topic with 12 replies whose versions add up to 40.
+    """
+    return stamp_with_last_modified(*keys)[0]
+
+
+def stamp_with_last_modified(*keys: tuple[str, int]) -> tuple[str, int | None]:
+    """
+    Describe the current versions of several entities (see `stamp`) and tell when the latest of them changed.
+
+    Parameters:
+        *keys (tuple[str, int]): (entity name, entity ID) pairs.
+
+    Returns:
+        tuple: The version stamp and the UNIX time of the latest change, None if any of the entities
+        never changed. A topic changes with its counter and with its replies, whose rows record
+        when they were last written, votes included.
+    """
+    versions = get_versions(*keys)
+    topic_ids = [entity_id for entity, entity_id in keys if entity == TOPIC]
+    reply_versions = get_reply_versions(*topic_ids)
+
+    parts = []
+    changed_at = []
+    for entity, entity_id in keys:
+        version, updated_at = versions[(entity, entity_id)]
+        part = f"{entity}:{entity_id}@{version}"
+        if entity == TOPIC:
+            count, version_sum, replies_updated_at = reply_versions[entity_id]
+            part += f"+{count}.{version_sum}"
+            updated_at = max(filter(None, (updated_at, replies_updated_at)), default=None)
+        parts.append(part)
+        changed_at.append(updated_at)
+
+    version_stamp = ";".join(parts)
+    last_modified = None if None in changed_at else max(changed_at, default=None)
+
+    return version_stamp, last_modified
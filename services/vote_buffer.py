@@ -0,0 +1,299 @@
+import json
+import logging
+import os
+import threading
+from typing import Callable
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# (reply id, user id) -> vote type (1 for upvote, 0 for downvote), or None for a removed vote
+PendingVotes = dict[tuple[int, int], int | None]
+
+
+class VoteLogInUse(RuntimeError):
+    """
+    Raised when the replay log of a vote buffer is used by another process.
+    """
+
+
+def _lock_log(log_path: str):
+    # an exclusive lock on a file next to the log, held while the file stays open;
+    # the OS releases it when the process dies, so the log of a crashed process can be taken over
+    lock = open(log_path + ".lock", "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock.close()
+        return None
+
+    return lock
+
+
+class VoteBuffer:
+    """
+    Write-behind buffer for votes. Votes are coalesced per (reply, user) in memory,
+    so only the last vote of a user for a reply is written, and flushed in batches
+    by a background thread.
+
+    Every vote is also appended to a local log before it is acknowledged. The log is
+    replayed when the buffer starts, so votes that were not flushed before a crash are
+    not lost; replaying is safe because a vote entry states the final vote, not a change.
+    Each process needs its own log file: the log is locked while the buffer runs,
+    and starting a buffer on a log locked by another process raises VoteLogInUse.
+
+    A batch the writer rejects `max_failures` times in a row is written one vote at a time,
+    so a vote that can never be written (e.g. for a deleted reply) is dropped instead of
+    holding back every later vote.
+    """
+
+    def __init__(self, writer: Callable[[PendingVotes], None], flush_interval: float,
+                 log_path: str | None = None, max_failures: int = 3):
+        """
+        Parameters:
+            writer (Callable): Writes a batch of votes to the database in one transaction.
+            flush_interval (float): The number of seconds between flushes.
+            log_path (str | None): The path of the replay log; None keeps the votes in memory only.
+            max_failures (int): The number of failed flushes after which votes are written one at a time.
+        """
+        self._writer = writer
+        self._flush_interval = flush_interval
+        self._log_path = log_path
+        self._max_failures = max_failures
+        self._failures = 0
+        self._log_lock = None
+        self._pending: PendingVotes = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._log = None
+
+    def start(self) -> None:
+        """
+        Replay the votes left in the log by a previous run and start flushing in the background.
+
+        Raises:
+            VoteLogInUse: If another process holds the log.
+        """
+        if self._log_path is not None:
+            self._log_lock = _lock_log(self._log_path)
+            if self._log_lock is None:
+                raise VoteLogInUse(f"The vote log {self._log_path} is used by another process")
+            for path in (self._flushing_log_path(), self._log_path):
+                self._pending.update(self._replay(path))
+            self._log = open(self._log_path, "a", encoding="utf-8")
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="vote-buffer-flush", daemon=True)
+        self._thread.start()
+
+    def adopt_log(self, log_path: str) -> bool:
+        """
+        Take over the votes left in the log of another buffer whose process is gone,
+        e.g. after the number of worker processes was reduced. The votes move to this buffer's log.
+
+        Parameters:
+            log_path (str): The path of the other buffer's replay log.
+
+        Returns:
+            bool: Whether the log was taken over; False if its process is still running.
+        """
+        lock = _lock_log(log_path)
+        if lock is None:
+            return False
+
+        try:
+            paths = (log_path + ".flushing", log_path)
+            for path in paths:
+                for (reply_id, user_id), vote_type in self._replay(path).items():
+                    self.add(reply_id, user_id, vote_type)
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+        finally:
+            lock.close()
+
+        return True
+
+    def stop(self) -> None:
+        """
+        Stop the background thread and flush the remaining votes.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self.flush()
+
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+        if self._log_lock is not None:
+            # closing the file releases the lock
+            self._log_lock.close()
+            self._log_lock = None
+
+    def add(self, reply_id: int, user_id: int, vote_type: int | None) -> None:
+        """
+        Record the vote of a user for a reply, replacing any pending vote of the same user for it.
+
+        Parameters:
+            reply_id (int): The ID of the reply.
+            user_id (int): The ID of the user.
+            vote_type (int | None): The vote type (1 for upvote, 0 for downvote), or None to remove the vote.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._log is not None:
+                self._log.write(json.dumps([reply_id, user_id, vote_type]) + "\n")
+                # reaches the OS before the vote is acknowledged, so it survives a crash of the process
+                self._log.flush()
+            self._pending[(reply_id, user_id)] = vote_type
+
+    def get(self, reply_id: int, user_id: int, default=None):
+        """
+        Return the pending vote of a user for a reply, so users read their own votes before they are flushed.
+
+        Parameters:
+            reply_id (int): The ID of the reply.
+            user_id (int): The ID of the user.
+            default: The value returned when there is no pending vote.
+
+        Returns:
+            The pending vote type (None for a removed vote), or `default`.
+        """
+        with self._lock:
+            return self._pending.get((reply_id, user_id), default)
+
+    def pending_for_user(self, user_id: int) -> dict[int, int | None]:
+        """
+        Return all pending votes of a user.
+
+        Parameters:
+            user_id (int): The ID of the user.
+
+        Returns:
+            dict[int, int | None]: The pending vote type by reply ID.
+        """
+        with self._lock:
+            return {reply_id: vote_type for (reply_id, voter_id), vote_type in self._pending.items()
+                    if voter_id == user_id}
+
+    def flush(self) -> int:
+        """
+        Write the pending votes to the database in one batch.
+        If writing fails, the votes stay pending (unless newer ones replaced them) and are retried later.
+        After `max_failures` failures in a row the votes are written one at a time and the ones
+        the writer rejects are dropped; if it rejects all of them, the database is taken to be
+        unavailable and they all stay pending.
+
+        Returns:
+            int: The number of votes written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+
+                batch, self._pending = self._pending, {}
+                self._rotate_log()
+
+            try:
+                if self._failures < self._max_failures:
+                    self._writer(batch)
+                    written = len(batch)
+                else:
+                    written = self._write_one_at_a_time(batch)
+
+            except Exception:
+                self._failures += 1
+                with self._lock:
+                    for key, vote_type in batch.items():
+                        self._pending.setdefault(key, vote_type)
+                raise
+
+            self._failures = 0
+            if self._log_path is not None:
+                os.remove(self._flushing_log_path())
+
+            return written
+
+    def _write_one_at_a_time(self, batch: PendingVotes) -> int:
+        written = 0
+        rejected = []
+        error = None
+
+        for key, vote_type in batch.items():
+            try:
+                self._writer({key: vote_type})
+                written += 1
+            except Exception as exc:
+                rejected.append((key, vote_type))
+                error = exc
+
+        if rejected and not written:
+            raise error
+
+        for (reply_id, user_id), vote_type in rejected:
+            logger.error("Dropping the vote %s of user %s for reply %s, which cannot be written",
+                         vote_type, user_id, reply_id)
+
+        return written
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing buffered votes failed, retrying in %s seconds", self._flush_interval)
+
+    def _rotate_log(self) -> None:
+        # caller holds self._lock; the votes being flushed move to the .flushing log until they are written.
+        # A .flushing log left by a failed flush is extended, so it keeps every vote that is not written yet.
+        if self._log is None:
+            return
+
+        self._log.close()
+        with open(self._log_path, encoding="utf-8") as current, \
+                open(self._flushing_log_path(), "a", encoding="utf-8") as flushing:
+            flushing.write(current.read())
+            flushing.flush()
+            os.fsync(flushing.fileno())
+        self._log = open(self._log_path, "w", encoding="utf-8")
+
+    @staticmethod
+    def _replay(path: str) -> PendingVotes:
+        votes: PendingVotes = {}
+        if not os.path.exists(path):
+            return votes
+
+        with open(path, encoding="utf-8") as log:
+            for line in log:
+                try:
+                    reply_id, user_id, vote_type = json.loads(line)
+                except ValueError:
+                    # a line cut short by the crash
+                    continue
+                votes[(reply_id, user_id)] = vote_type
+
+        logger.info("Replayed buffered votes from %s", path)
+
+        return votes
+
+    def _flushing_log_path(self) -> str:
+        return self._log_path + ".flushing"
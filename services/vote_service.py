@@ -1,4 +1,20 @@
-from data.database import read_query, insert_query, update_query, delete_query
+import os
+
+from data.database import read_query, upsert_query, update_query, delete_query, execute_many, unit_of_work
+from services.vote_buffer import VoteBuffer, VoteLogInUse, PendingVotes
+
+# affected rows reported for a single-row INSERT ... ON DUPLICATE KEY UPDATE
+_VOTE_INSERTED = 1
+_VOTE_CHANGED = 2
+
+_WRITE_BEHIND_ENABLED = os.getenv("VOTE_WRITE_BEHIND", "0") == "1"
+_WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("VOTE_FLUSH_INTERVAL_MS", 200)) / 1000
+_WRITE_BEHIND_LOG = os.getenv("VOTE_BUFFER_LOG", "vote_buffer.log") or None
+# every worker process takes the first log not held by another one: VOTE_BUFFER_LOG, VOTE_BUFFER_LOG.1, ...
+_WRITE_BEHIND_LOG_SLOTS = 64
+
+_NOT_BUFFERED = object()
+_vote_buffer: VoteBuffer | None = None
 
 
 def get_vote(reply_id: int, user_id: int) -> bool:
@@ -12,6 +28,11 @@ def get_vote(reply_id: int, user_id: int) -> bool:
     Returns:
         bool: The vote type if found, otherwise None.
     """
+    if _vote_buffer is not None:
+        pending = _vote_buffer.get(reply_id, user_id, _NOT_BUFFERED)
+        if pending is not _NOT_BUFFERED:
+            return pending
+
     query = """SELECT vote_type 
                 FROM votes 
                 WHERE reply_id = ? AND user_id = ?"""
@@ -20,9 +41,34 @@ def get_vote(reply_id: int, user_id: int) -> bool:
     return result[0][0] if result else None
 
 
-def create_vote(reply_id: int, vote_type: int, user_id: int) -> None:
+def get_votes_for_topic(topic_id: int, user_id: int) -> dict[int, int]:
     """
-    Create a new vote for a reply.
+    Retrieve the votes of a user for all replies of a topic in a single query.
+
+    Parameters:
+        topic_id (int): The ID of the topic.
+        user_id (int): The ID of the user.
+
+    Returns:
+        dict[int, int]: The vote type (1 for upvote, 0 for downvote) by reply ID, for the replies the user voted for.
+    """
+    query = """SELECT v.reply_id, v.vote_type
+                FROM votes v
+                JOIN replies r ON r.id = v.reply_id
+                WHERE r.topic_id = ? AND v.user_id = ?"""
+
+    votes = {reply_id: int(vote_type) for reply_id, vote_type in read_query(query, (topic_id, user_id))}
+
+    if _vote_buffer is not None:
+        _apply_pending_votes(votes, topic_id, _vote_buffer.pending_for_user(user_id))
+
+    return votes
+
+
+def cast_vote(reply_id: int, vote_type: int, user_id: int) -> int | None:
+    """
+    Create or change the vote of a user for a reply in a single upsert, keeping the reply's counters in step.
+    The unique (reply_id, user_id) key makes concurrent votes of the same user (e.g. a double click) safe.
 
     Parameters:
         reply_id (int): The ID of the reply to vote on.
@@ -30,49 +76,287 @@ def create_vote(reply_id: int, vote_type: int, user_id: int) -> None:
         user_id (int): The ID of the user casting the vote.
 
     Returns:
-        None
+        int | None: The previous vote type: None if the vote was created,
+        the same vote type if nothing changed and the opposite one if the vote was changed.
     """
     vote_type = True if vote_type == 1 else False
 
+    if _vote_buffer is not None:
+        previous_vote_type = get_vote(reply_id, user_id)
+        _vote_buffer.add(reply_id, user_id, int(vote_type))
+        return None if previous_vote_type is None else int(previous_vote_type)
+
     query = """INSERT INTO votes(reply_id, vote_type, user_id)
-                VALUES(?, ?, ?)"""
-    params = [reply_id, vote_type, user_id]
+                VALUES(?, ?, ?)
+                ON DUPLICATE KEY UPDATE vote_type = VALUES(vote_type)"""
+
+    with unit_of_work():
+        affected_rows = upsert_query(query, (reply_id, vote_type, user_id))
+
+        if affected_rows == _VOTE_INSERTED:
+            _adjust_reply_counters(reply_id, 1 if vote_type else 0, 0 if vote_type else 1)
+            return None
+
+        if affected_rows == _VOTE_CHANGED:
+            delta = 1 if vote_type else -1
+            _adjust_reply_counters(reply_id, delta, -delta)
+            return int(not vote_type)
 
-    insert_query(query, (*params,))
+    return int(vote_type)
 
 
-def update_vote(reply_id: int, vote_type: int, user_id: int) -> None:
+def delete_vote(reply_id: int, user_id: int) -> int | None:
     """
-    Update the vote type for a specific reply and user.
+    Delete a vote for a specific reply and user.
 
     Parameters:
-        reply_id (int): The ID of the reply to update the vote for.
-        vote_type (int): The new vote type (1 for upvote, 0 for downvote).
-        user_id (int): The ID of the user updating the vote.
+        reply_id (int): The ID of the reply to delete the vote for.
+        user_id (int): The ID of the user whose vote is to be deleted.
 
     Returns:
-        None
+        int | None: The type of the deleted vote, or None if the user had not voted for the reply.
     """
-    vote_type = True if vote_type == 1 else False
+    if _vote_buffer is not None:
+        vote_type = get_vote(reply_id, user_id)
+        if vote_type is not None:
+            _vote_buffer.add(reply_id, user_id, None)
+        return None if vote_type is None else int(vote_type)
 
-    query = """UPDATE votes 
-                SET vote_type = ? 
+    query = """DELETE FROM votes 
                 WHERE reply_id = ? AND user_id = ?"""
-    update_query(query, (vote_type, reply_id, user_id))
 
+    with unit_of_work():
+        vote_type = _lock_vote(reply_id, user_id)
+        if vote_type is None:
+            return None
 
-def delete_vote(reply_id: int, user_id: int) -> None:
+        delete_query(query, (reply_id, user_id))
+        _adjust_reply_counters(reply_id, -1 if vote_type else 0, 0 if vote_type else -1)
+
+    return int(vote_type)
+
+
+def start_write_behind() -> bool:
     """
-    Delete a vote for a specific reply and user.
+    Switch voting to write-behind mode if VOTE_WRITE_BEHIND=1: votes are buffered in memory,
+    coalesced per user and reply, and written in batches every VOTE_FLUSH_INTERVAL_MS milliseconds.
+    Each worker process logs its votes to the first free log of VOTE_BUFFER_LOG, VOTE_BUFFER_LOG.1, ...;
+    the votes a previous run left in that log are written first.
+
+    Returns:
+        bool: Whether write-behind mode was started.
+
+    Raises:
+        VoteLogInUse: If all logs are held by other processes.
+    """
+    global _vote_buffer
+    if not _WRITE_BEHIND_ENABLED or _vote_buffer is not None:
+        return False
+
+    _vote_buffer = _start_vote_buffer()
+
+    return True
+
+
+def _start_vote_buffer() -> VoteBuffer:
+    if _WRITE_BEHIND_LOG is None:
+        buffer = VoteBuffer(write_votes, _WRITE_BEHIND_FLUSH_INTERVAL)
+        buffer.start()
+        return buffer
+
+    for slot in range(_WRITE_BEHIND_LOG_SLOTS):
+        log_path = _WRITE_BEHIND_LOG if slot == 0 else f"{_WRITE_BEHIND_LOG}.{slot}"
+        buffer = VoteBuffer(write_votes, _WRITE_BEHIND_FLUSH_INTERVAL, log_path)
+        try:
+            buffer.start()
+        except VoteLogInUse:
+            continue
+
+        # logs of slots no process holds any more, e.g. after the number of workers was reduced
+        for other_slot in range(slot + 1, _WRITE_BEHIND_LOG_SLOTS):
+            other_path = f"{_WRITE_BEHIND_LOG}.{other_slot}"
+            if os.path.exists(other_path) or os.path.exists(other_path + ".flushing"):
+                buffer.adopt_log(other_path)
+
+        return buffer
+
+    raise VoteLogInUse(f"All {_WRITE_BEHIND_LOG_SLOTS} vote logs of {_WRITE_BEHIND_LOG} are in use")
+
+
+def stop_write_behind() -> None:
+    """
+    Write the buffered votes and switch back to writing every vote immediately.
+    """
+    global _vote_buffer
+    if _vote_buffer is None:
+        return
+
+    buffer, _vote_buffer = _vote_buffer, None
+    buffer.stop()
+
+
+def write_votes(votes: PendingVotes) -> None:
+    """
+    Write a batch of final votes, and the matching changes of the replies' counters, in one transaction.
+    The counters are adjusted against the votes stored when the batch is written,
+    so votes written directly in the meantime are accounted for.
 
     Parameters:
-        reply_id (int): The ID of the reply to delete the vote for.
-        user_id (int): The ID of the user whose vote is to be deleted.
+        votes (PendingVotes): The vote type (None for a removed vote) by (reply ID, user ID).
 
     Returns:
         None
     """
-    query = """DELETE FROM votes 
-                WHERE reply_id = ? AND user_id = ?"""
+    keys = list(votes)
+
+    with unit_of_work():
+        query = """SELECT reply_id, user_id, vote_type
+                    FROM votes
+                    WHERE (reply_id, user_id) IN ({})
+                    FOR UPDATE""".format(", ".join(["(?, ?)"] * len(keys)))
+        stored = {(reply_id, user_id): int(vote_type)
+                  for reply_id, user_id, vote_type in read_query(query, tuple(id for key in keys for id in key))}
+
+        upserts, deletes = [], []
+        counter_deltas: dict[int, list[int]] = {}
+        for (reply_id, user_id), vote_type in votes.items():
+            previous_vote_type = stored.get((reply_id, user_id))
+            if previous_vote_type == vote_type:
+                continue
+
+            deltas = counter_deltas.setdefault(reply_id, [0, 0])
+            if previous_vote_type is not None:
+                deltas[0 if previous_vote_type else 1] -= 1
+            if vote_type is None:
+                deletes.append((reply_id, user_id))
+            else:
+                deltas[0 if vote_type else 1] += 1
+                upserts.append((reply_id, bool(vote_type), user_id))
+
+        if upserts:
+            execute_many("""INSERT INTO votes(reply_id, vote_type, user_id)
+                            VALUES(?, ?, ?)
+                            ON DUPLICATE KEY UPDATE vote_type = VALUES(vote_type)""", upserts)
+        if deletes:
+            execute_many("""DELETE FROM votes WHERE reply_id = ? AND user_id = ?""", deletes)
+
+        # replies are updated in ID order, so concurrent batches lock them in the same order
+        counter_updates = [(upvotes, downvotes, reply_id)
+                           for reply_id, (upvotes, downvotes) in sorted(counter_deltas.items())
+                           if upvotes or downvotes]
+        if counter_updates:
+            execute_many("""UPDATE replies
+                            SET upvotes = upvotes + ?, downvotes = downvotes + ?, version = version + 1
+                            WHERE id = ?""", counter_updates)
+
+
+def _apply_pending_votes(votes: dict[int, int], topic_id: int, pending: dict[int, int | None]) -> None:
+    """
+    Overlay a user's buffered votes on the votes read for a topic, keeping only replies of that topic.
+
+    Parameters:
+        votes (dict[int, int]): The stored vote type by reply ID, updated in place.
+        topic_id (int): The ID of the topic.
+        pending (dict[int, int | None]): The user's buffered vote type by reply ID.
+
+    Returns:
+        None
+    """
+    if not pending:
+        return
+
+    query = """SELECT id FROM replies WHERE topic_id = ? AND id IN ({})""".format(", ".join("?" * len(pending)))
+    topic_reply_ids = {row[0] for row in read_query(query, (topic_id, *pending))}
+
+    for reply_id, vote_type in pending.items():
+        if reply_id not in topic_reply_ids:
+            continue
+        if vote_type is None:
+            votes.pop(reply_id, None)
+        else:
+            votes[reply_id] = vote_type
+
+
+def _lock_vote(reply_id: int, user_id: int) -> bool | None:
+    """
+    Retrieve the vote type for a specific reply and user, locking the vote row
+    until the end of the current unit of work.
+
+    Parameters:
+        reply_id (int): The ID of the reply.
+        user_id (int): The ID of the user.
+
+    Returns:
+        bool | None: The vote type if found, otherwise None.
+    """
+    query = """SELECT vote_type 
+                FROM votes 
+                WHERE reply_id = ? AND user_id = ?
+                FOR UPDATE"""
+    result = read_query(query, (reply_id, user_id))
+
+    return result[0][0] if result else None
+
+
+def _adjust_reply_counters(reply_id: int, upvotes_delta: int, downvotes_delta: int) -> None:
+    """
+    Apply a vote change to the upvotes and downvotes counters of a reply and increase its version,
+    which the version stamp of its topic is derived from (see `version_service.stamp_with_last_modified`).
+    The reply row is locked by the counter update anyway, so votes on different replies never wait for each other.
+
+    Parameters:
+        reply_id (int): The ID of the reply.
+        upvotes_delta (int): The change of the upvotes counter.
+        downvotes_delta (int): The change of the downvotes counter.
+
+    Returns:
+        None
+    """
+    query = """UPDATE replies 
+                SET upvotes = upvotes + ?, downvotes = downvotes + ?, version = version + 1
+                WHERE id = ?"""
+
+    update_query(query, (upvotes_delta, downvotes_delta, reply_id))
+
+
+def reconcile_reply_counters(after_id: int = 0, batch_size: int = 500) -> tuple:
+    """
+    Compare the vote counters of one batch of replies with their votes and recompute the ones that drifted.
+
+    Parameters:
+        after_id (int): Only replies with a greater ID are checked.
+        batch_size (int): The maximum number of replies to check.
+
+    Returns:
+        tuple: The ID of the last checked reply (None if there were no replies left)
+        and the list of IDs of the replies whose counters were fixed.
+    """
+    reply_ids = read_query("""SELECT id FROM replies WHERE id > ? ORDER BY id LIMIT ?""",
+                           (after_id, batch_size))
+
+    if not reply_ids:
+        return None, []
+
+    first_id, last_id = reply_ids[0][0], reply_ids[-1][0]
+
+    query = """SELECT r.id
+                FROM replies r
+                LEFT JOIN votes v ON v.reply_id = r.id
+                WHERE r.id BETWEEN ? AND ?
+                GROUP BY r.id
+                HAVING r.upvotes <> COALESCE(SUM(v.vote_type = 1), 0)
+                    OR r.downvotes <> COALESCE(SUM(v.vote_type = 0), 0)"""
+
+    drifted_ids = [row[0] for row in read_query(query, (first_id, last_id))]
+
+    if drifted_ids:
+        # recomputed in a single statement, so votes cast in the meantime are counted too
+        fix_query = """UPDATE replies r
+                    SET r.upvotes = (SELECT COUNT(*) FROM votes v WHERE v.reply_id = r.id AND v.vote_type = 1),
+                        r.downvotes = (SELECT COUNT(*) FROM votes v WHERE v.reply_id = r.id AND v.vote_type = 0),
+                        r.version = r.version + 1
+                    WHERE r.id IN ({})""".format(", ".join("?" * len(drifted_ids)))
+
+        update_query(fix_query, tuple(drifted_ids))
 
-    delete_query(query, (reply_id, user_id))
+    return last_id, drifted_ids
@@ -0,0 +1,156 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import Mock, patch
+
+from fastapi import HTTPException
+
+from common import auth
+
+
+class PasswordHashing_Should(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        auth.shutdown_password_executor()
+
+    def test_verifyPassword_returns_True_when_passwordMatchesHash(self):
+        # Arrange
+        hash_password = auth.get_password_hash('Example123@')
+
+        # Act
+        result = auth.verify_password('Example123@', hash_password)
+
+        # Assert
+        self.assertTrue(result)
+        self.assertFalse(auth.verify_password('Wrong123@', hash_password))
+
+    def test_getPasswordHash_runsInline_when_noWorkersConfigured(self):
+        with patch('common.auth._PASSWORD_HASH_WORKERS', 0), \
+                patch('common.auth._hash_in_worker', return_value='hashed') as mock_hash:
+            # Act
+            result = auth.get_password_hash('Example123@')
+
+            # Assert
+            self.assertEqual('hashed', result)
+            mock_hash.assert_called_once_with('Example123@')
+            self.assertIsNone(auth._password_executor)
+
+    def test_verifyPassword_raises_serviceUnavailable_when_queueIsFull(self):
+        with patch('common.auth._password_slots', threading.BoundedSemaphore(1)) as slots:
+            # Arrange
+            slots.acquire()
+            rejected_before = auth.password_hashing_stats()["rejected"]
+
+            # Act
+            with self.assertRaises(HTTPException) as context:
+                auth.verify_password('Example123@', 'hash')
+
+            # Assert
+            self.assertEqual(503, context.exception.status_code)
+            self.assertEqual(rejected_before + 1, auth.password_hashing_stats()["rejected"])
+
+    def test_verifyPassword_holds_slot_until_timedOutJob_ends(self):
+        # Arrange
+        executor = ThreadPoolExecutor(max_workers=1)
+        job_may_end = threading.Event()
+        slots = threading.BoundedSemaphore(1)
+
+        with patch('common.auth._password_slots', slots), \
+                patch('common.auth._PASSWORD_HASH_TIMEOUT', 0.01), \
+                patch('common.auth._get_password_executor', return_value=executor), \
+                patch('common.auth._verify_in_worker', side_effect=lambda *args: job_may_end.wait(2)):
+            # Act
+            with self.assertRaises(HTTPException) as context:
+                auth.verify_password('Example123@', 'hash')
+
+            # Assert
+            self.assertEqual(503, context.exception.status_code)
+            self.assertFalse(slots.acquire(blocking=False))
+            job_may_end.set()
+            executor.shutdown(wait=True)
+            self.assertTrue(slots.acquire(blocking=False))
+
+    def test_verifyPassword_cancels_queuedJob_when_timedOut(self):
+        # Arrange
+        executor = ThreadPoolExecutor(max_workers=1)
+        job_may_end = threading.Event()
+        executor.submit(job_may_end.wait, 2)
+        slots = threading.BoundedSemaphore(1)
+
+        with patch('common.auth._password_slots', slots), \
+                patch('common.auth._PASSWORD_HASH_TIMEOUT', 0.01), \
+                patch('common.auth._get_password_executor', return_value=executor), \
+                patch('common.auth._verify_in_worker', return_value=True) as mock_verify:
+            # Act
+            with self.assertRaises(HTTPException):
+                auth.verify_password('Example123@', 'hash')
+
+            # Assert
+            self.assertTrue(slots.acquire(blocking=False))
+            job_may_end.set()
+            executor.shutdown(wait=True)
+            mock_verify.assert_not_called()
+
+    def test_verifyPassword_restarts_brokenWorkerPool(self):
+        # Arrange
+        broken_executor = Mock()
+        broken_executor.submit.side_effect = BrokenProcessPool()
+
+        with patch('common.auth._password_executor', broken_executor):
+            # Act
+            with self.assertRaises(HTTPException) as context:
+                auth.verify_password('Example123@', 'hash')
+
+            # Assert
+            self.assertEqual(503, context.exception.status_code)
+            self.assertIsNone(auth._password_executor)
+            broken_executor.shutdown.assert_called_once()
+
+    def test_passwordHashingStats_records_operationTiming(self):
+        with patch('common.auth._PASSWORD_HASH_WORKERS', 0), \
+                patch('common.auth._verify_in_worker', return_value=True):
+            # Arrange
+            count_before = auth.password_hashing_stats()["verify"]["count"]
+
+            # Act
+            auth.verify_password('Example123@', 'hash')
+
+            # Assert
+            stats = auth.password_hashing_stats()["verify"]
+            self.assertEqual(count_before + 1, stats["count"])
+            self.assertGreaterEqual(stats["max_seconds"], 0)
+
+
+class PrincipalCache_Should(unittest.TestCase):
+
+    def setUp(self) -> None:
+        auth.invalidate_principal()
+
+    def tearDown(self) -> None:
+        auth.invalidate_principal()
+
+    def test_getPrincipal_reads_user_once_while_cached(self):
+        with patch('common.auth.read_query', return_value=[(1, 1)]) as mock_read_query:
+            # Act
+            first = auth.get_principal(1)
+            second = auth.get_principal(1)
+
+            # Assert
+            self.assertIs(first, second)
+            mock_read_query.assert_called_once()
+
+    def test_getPrincipal_rereads_user_when_invalidated(self):
+        with patch('common.auth.read_query', side_effect=[[(1, 1)], [(1, 0)]]):
+            # Arrange
+            auth.get_principal(1)
+
+            # Act
+            auth.invalidate_principal(1)
+            result = auth.get_principal(1)
+
+            # Assert
+            self.assertFalse(result.is_admin)
+
+    def test_principalCacheTtl_is_capped_at_a_few_seconds(self):
+        self.assertLessEqual(auth._principal_cache.ttl, auth._PRINCIPAL_CACHE_MAX_TTL)
@@ -0,0 +1,166 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from services import category_service
+
+
+class CategoryVisibility_Should(unittest.TestCase):
+
+    def setUp(self) -> None:
+        category_service.invalidate_category_visibility()
+        self.version_service_patch = patch('services.category_service.version_service')
+        self.mock_version_service = self.version_service_patch.start()
+
+    def tearDown(self) -> None:
+        self.version_service_patch.stop()
+
+    def test_getCategoryVisibility_splits_readableAndWritable(self):
+        with patch('services.category_service.read_query',
+                   return_value=[(1, 0, None), (2, 1, 0), (3, 1, 1)]):
+            # Act
+            result = category_service.get_category_visibility(5)
+
+            # Assert
+            self.assertEqual(frozenset({1, 2, 3}), result.readable)
+            self.assertEqual(frozenset({1, 3}), result.writable)
+
+    def test_getCategoryVisibility_returns_cachedValue_when_calledTwice(self):
+        with patch('services.category_service.read_query',
+                   return_value=[(1, 0, None)]) as mock_read_query:
+            # Act
+            category_service.get_category_visibility(5)
+            category_service.get_category_visibility(5)
+
+            # Assert
+            mock_read_query.assert_called_once()
+
+    def test_getCategoryVisibility_rereads_when_accessVersionChangedElsewhere(self):
+        with patch('services.category_service.read_query',
+                   side_effect=[[(1, 0, None), (2, 1, 0)], [(1, 0, None)]]) as mock_read_query:
+            # Arrange
+            self.mock_version_service.get_versions.side_effect = [{"access": 1}, {"access": 2}]
+            category_service.get_category_visibility(5)
+
+            # Act
+            result = category_service.get_category_visibility(5)
+
+            # Assert
+            self.assertEqual(frozenset({1}), result.readable)
+            self.assertEqual(2, mock_read_query.call_count)
+
+    def test_validateUserAccess_returns_True_without_query_when_categoryIsCached(self):
+        with patch('services.category_service.read_query',
+                   return_value=[(1, 0, None), (2, 1, 1)]) as mock_read_query, \
+                patch('services.category_service.query_count') as mock_query_count:
+            # Act
+            result = category_service.validate_user_access(5, 2, "write")
+
+            # Assert
+            self.assertTrue(result)
+            mock_read_query.assert_called_once()
+            mock_query_count.assert_not_called()
+
+    def test_validateUserAccess_returns_False_when_userHasReadOnlyAccess(self):
+        with patch('services.category_service.read_query', return_value=[(2, 1, 0)]), \
+                patch('services.category_service.query_count', return_value=1), \
+                patch('services.user_service.is_admin', return_value=False):
+            # Act
+            result = category_service.validate_user_access(5, 2, "write")
+
+            # Assert
+            self.assertFalse(result)
+
+    def test_manageUserAccess_invalidates_userVisibility(self):
+        with patch('services.category_service.read_query', return_value=[]) as mock_read_query, \
+                patch('services.category_service.insert_query'):
+            # Arrange
+            category_service.get_category_visibility(5)
+
+            # Act
+            category_service.manage_user_access_to_private_category(2, 5, 1)
+            category_service.get_category_visibility(5)
+
+            # Assert
+            self.assertEqual(3, mock_read_query.call_count)
+
+    def test_visibleCategoriesCondition_returns_inList(self):
+        with patch('services.category_service.read_query', return_value=[(3, 0, None), (1, 1, 0)]):
+            # Act
+            result = category_service.visible_categories_condition("t.category_id", 5)
+
+            # Assert
+            self.assertEqual(("t.category_id IN (?, ?)", [1, 3]), result)
+
+    def test_visibleCategoriesCondition_returns_falseCondition_when_nothingIsVisible(self):
+        with patch('services.category_service.read_query', return_value=[]):
+            # Act
+            result = category_service.visible_categories_condition("t.category_id", 5)
+
+            # Assert
+            self.assertEqual(("1 = 0", []), result)
+
+    def test_getAccessProfile_isShared_by_usersWhoReadTheSameCategories(self):
+        with patch('services.user_service.is_admin', return_value=False), \
+                patch('services.category_service.read_query',
+                      side_effect=[[(1, 0, None), (2, 1, 0)], [(2, 1, 1), (1, 0, None)], [(1, 0, None)]]):
+            # Act
+            first = category_service.get_access_profile(5)
+            second = category_service.get_access_profile(6)
+            third = category_service.get_access_profile(7)
+
+            # Assert
+            self.assertEqual(first, second)
+            self.assertNotEqual(first, third)
+
+    def test_getAccessProfile_returns_admin_when_userIsAdmin(self):
+        with patch('services.user_service.is_admin', return_value=True):
+            # Act
+            result = category_service.get_access_profile(5)
+
+            # Assert
+            self.assertEqual("admin", result)
+
+
+def topic_row(id, created_at, is_pinned=False):
+    return id, f"Topic {id}", False, created_at, 1, 7, is_pinned, 0, created_at
+
+
+class CategoryTopics_Should(unittest.TestCase):
+
+    def test_getCategoryTopics_returns_pinnedFirst_and_nextCursor_when_moreTopicsExist(self):
+        # Arrange
+        pinned = [topic_row(1, datetime(2024, 1, 1), is_pinned=True)]
+        page = [topic_row(5, datetime(2024, 5, 1)), topic_row(4, datetime(2024, 4, 1)),
+                topic_row(3, datetime(2024, 3, 1))]
+        with patch('services.category_service.read_query', side_effect=[pinned, page]) as mock_read_query:
+            # Act
+            topics, next_cursor = category_service.get_category_topics(7, 2)
+
+            # Assert
+            self.assertEqual([1, 5, 4], [topic.id for topic in topics])
+            self.assertEqual({"sort": "newest", "value": datetime(2024, 4, 1), "id": 4},
+                             category_service.decode_topics_cursor(next_cursor))
+            query, params = mock_read_query.call_args.args
+            self.assertIn("t.is_pinned = 0", query)
+            self.assertIn("ORDER BY t.created_at DESC, t.id DESC", query)
+            self.assertEqual((7, 3), params)
+
+    def test_getCategoryTopics_skips_pinnedTopics_after_firstPage(self):
+        # Arrange
+        cursor = {"sort": "active", "value": datetime(2024, 4, 1), "id": 4}
+        with patch('services.category_service.read_query', return_value=[]) as mock_read_query:
+            # Act
+            topics, next_cursor = category_service.get_category_topics(7, 2, cursor, "active")
+
+            # Assert
+            self.assertEqual([], topics)
+            self.assertIsNone(next_cursor)
+            mock_read_query.assert_called_once()
+            query, params = mock_read_query.call_args.args
+            self.assertIn("t.last_activity_at < ?", query)
+            self.assertEqual((7, datetime(2024, 4, 1), datetime(2024, 4, 1), 4, 3), params)
+
+    def test_decodeTopicsCursor_returns_None_when_cursorIsMalformed(self):
+        # Act & Assert
+        self.assertIsNone(category_service.decode_topics_cursor("invalid"))
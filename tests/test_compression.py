@@ -0,0 +1,149 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from common import compression
+from common.compression import CompressionMiddleware, accepted_encodings, choose_encoding
+
+LARGE_TEXT = "tea " * 1000
+
+
+def create_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/large")
+    def large():
+        return PlainTextResponse(LARGE_TEXT, headers={"ETag": '"abc"'})
+
+    @app.get("/not-modified")
+    def not_modified():
+        return Response(status_code=304, headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tea")
+
+    @app.get("/image")
+    def image():
+        return PlainTextResponse(LARGE_TEXT, media_type="image/png")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter(["tea " * 10, "coffee " * 10]), media_type="application/json")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter(["data: tea\n\n"]), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+class AcceptedEncodings_Should(unittest.TestCase):
+
+    def test_acceptedEncodings_orders_by_weight_and_skips_refused(self):
+        # Act
+        result = accepted_encodings("gzip;q=0.5, br, identity;q=0, deflate;q=0.8")
+
+        # Assert
+        self.assertEqual(["br", "deflate", "gzip"], result)
+
+    def test_chooseEncoding_returns_gzip_when_brotliIsMissing(self):
+        # Arrange
+        with patch.object(compression, "brotli", None):
+            # Act
+            result = choose_encoding("br, gzip")
+
+        # Assert
+        self.assertEqual("gzip", result)
+
+    def test_chooseEncoding_returns_none_when_nothingSupportedIsAccepted(self):
+        # Act
+        result = choose_encoding("deflate, gzip;q=0")
+
+        # Assert
+        self.assertIsNone(result)
+
+
+class CompressionMiddleware_Should(unittest.TestCase):
+
+    def setUp(self):
+        self.client = create_client()
+        self.brotli_patcher = patch.object(compression, "brotli", None)
+        self.brotli_patcher.start()
+
+    def tearDown(self):
+        self.brotli_patcher.stop()
+
+    def test_compresses_largeResponse_and_weakensETag(self):
+        # Act
+        response = self.client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        # Assert
+        self.assertEqual("gzip", response.headers["content-encoding"])
+        self.assertEqual("Accept-Encoding", response.headers["vary"])
+        self.assertEqual('W/"abc"', response.headers["etag"])
+        self.assertEqual(LARGE_TEXT, response.text)
+
+    def test_weakens_notModifiedETag_when_clientHoldsCompressedCopy(self):
+        # Act
+        response = self.client.get("/not-modified", headers={"Accept-Encoding": "gzip", "If-None-Match": 'W/"abc"'})
+
+        # Assert
+        self.assertEqual(304, response.status_code)
+        self.assertEqual('W/"abc"', response.headers["etag"])
+
+    def test_sends_smallResponse_uncompressed(self):
+        # Act
+        response = self.client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        # Assert
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual("tea", response.text)
+
+    def test_sends_response_uncompressed_when_encodingIsNotAccepted(self):
+        # Act
+        response = self.client.get("/large", headers={"Accept-Encoding": "identity"})
+
+        # Assert
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual('"abc"', response.headers["etag"])
+
+    def test_sends_image_uncompressed(self):
+        # Act
+        response = self.client.get("/image", headers={"Accept-Encoding": "gzip"})
+
+        # Assert
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_compresses_streamedResponse_chunkByChunk(self):
+        # Act
+        with patch.object(compression, "compress") as compress:
+            response = self.client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+        # Assert
+        compress.assert_not_called()
+        self.assertEqual("gzip", response.headers["content-encoding"])
+        self.assertNotIn("content-length", response.headers)
+        self.assertEqual("tea " * 10 + "coffee " * 10, response.text)
+
+    def test_sends_serverSentEvents_uncompressed(self):
+        # Act
+        response = self.client.get("/events", headers={"Accept-Encoding": "gzip"})
+
+        # Assert
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_uses_fastestLevel_when_cpusAreBusy(self):
+        # Arrange
+        with patch.object(compression, "_is_busy", return_value=True), \
+                patch.object(compression, "compress", side_effect=compression.compress) as compress:
+            # Act
+            response = self.client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        # Assert
+        compress.assert_called_once_with(LARGE_TEXT.encode(), "gzip", 1)
+        self.assertEqual(LARGE_TEXT, response.text)
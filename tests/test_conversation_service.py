@@ -1,4 +1,5 @@
 import unittest
+from datetime import datetime
 from unittest.mock import patch
 from schemas.conversation import Conversation
 from services import conversation_service
@@ -6,28 +7,13 @@ from services import conversation_service
 
 class ConversationServiceShould(unittest.TestCase):
 
-    def test_get_last_message_returns_message_withExistingConvId_when_dataIsPresent(self):
-        with patch('services.conversation_service.read_query') as mock_read_query:
-            # Arrange
-            mock_read_query.return_value = [('test', 1)]
-            expected = ('test', 1)
-
-            # Act
-            result = conversation_service._get_last_message(1)
-
-            # Arrange
-            self.assertEqual(expected, result)
-
-    def test_get_last_message_returns_None_when_dataIsNotPresent(self):
-        with patch('services.conversation_service.read_query') as mock_read_query:
-            # Arrange
-            mock_read_query.return_value = []
-
-            # Act
-            result = conversation_service._get_last_message(1)
+    def setUp(self) -> None:
+        conversation_service._conversation_id_cache.clear()
+        self.version_service_patch = patch('services.conversation_service.version_service')
+        self.mock_version_service = self.version_service_patch.start()
 
-            # Arrange
-            self.assertIsNone(result)
+    def tearDown(self) -> None:
+        self.version_service_patch.stop()
 
     def test_get_conversationId_returns_conversationIdWithTheSameUserIds_when_dataIsPresent(self):
         with patch('services.conversation_service.read_query') as mock_read_query:
@@ -38,7 +24,7 @@ class ConversationServiceShould(unittest.TestCase):
             # Act
             result = conversation_service.get_conversation_id(1, 1)
 
-            # Arrange
+            # Assert
             self.assertEqual(expected, result)
 
     def test_get_conversationId_returns_conversationIdWithDifferentUserIds_when_dataIsPresent(self):
@@ -48,48 +34,99 @@ class ConversationServiceShould(unittest.TestCase):
             expected = 2
 
             # Act
-            result = conversation_service.get_conversation_id(1, 2)
+            result = conversation_service.get_conversation_id(2, 1)
 
-            # Arrange
+            # Assert
             self.assertEqual(expected, result)
+            self.assertEqual((1, 2), mock_read_query.call_args.args[1])
+
+    def test_get_conversationId_returns_cachedId_when_pairWasLookedUp(self):
+        with patch('services.conversation_service.read_query', return_value=[(2,)]) as mock_read_query:
+            # Act
+            conversation_service.get_conversation_id(1, 2)
+            result = conversation_service.get_conversation_id(2, 1)
+
+            # Assert
+            self.assertEqual(2, result)
+            mock_read_query.assert_called_once()
+
+    def test_get_or_create_conversationId_upserts_orderedPair_once(self):
+        with patch('services.conversation_service.insert_query', return_value=7) as mock_insert_query:
+            # Act
+            first = conversation_service.get_or_create_conversation_id(5, 3)
+            second = conversation_service.get_or_create_conversation_id(3, 5)
+
+            # Assert
+            self.assertEqual((7, 7), (first, second))
+            mock_insert_query.assert_called_once()
+            query, params = mock_insert_query.call_args.args
+            self.assertIn("ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)", query)
+            self.assertEqual((3, 5), params)
 
     def test_get_conversation_returns_conversationWithAscOrder_when_dataIsPresent(self):
         with patch('services.conversation_service.read_query') as mock_read_query:
             # Arrange
             mock_read_query.return_value = [
-                ("test", "test", "test", "12"),
-                ("test", "test", "test", "13")]
-            expected = [{"text": "test",
-                         "from": "test",
-                         "sent_at": "12"},
-                        {"text": "test",
-                         "from": "test",
-                         "sent_at": "13"}]
+                (2, "test", 1, "test", "13", "picture"),
+                (1, "test", 1, "test", "12", "picture")]
+            expected = [{"id": 1, "text": "test", "from_id": 1, "from": "test", "sent_at": "12",
+                         "picture": "picture"},
+                        {"id": 2, "text": "test", "from_id": 1, "from": "test", "sent_at": "13",
+                         "picture": "picture"}]
 
             # Act
             result = conversation_service.get_conversation(1)
 
-            # Arrange
+            # Assert
             self.assertEqual(expected, result)
 
     def test_get_conversation_returns_conversationWithDescOrder_when_dataIsPresent(self):
         with patch('services.conversation_service.read_query') as mock_read_query:
             # Arrange
             mock_read_query.return_value = [
-                ("test", "test", "test", "13"),
-                ("test", "test", "test", "12")]
-            expected = [{"text": "test",
-                         "from": "test",
-                         "sent_at": "13"},
-                        {"text": "test",
-                         "from": "test",
-                         "sent_at": "12"}]
+                (2, "test", 1, "test", "13", "picture"),
+                (1, "test", 1, "test", "12", "picture")]
 
             # Act
             result = conversation_service.get_conversation(1, "desc")
 
+            # Assert
+            self.assertEqual([2, 1], [message["id"] for message in result])
+
+    def test_get_conversation_page_returns_newestMessages_and_hasMore_when_olderExist(self):
+        with patch('services.conversation_service.read_query') as mock_read_query:
             # Arrange
-            self.assertEqual(expected, result)
+            mock_read_query.return_value = [
+                (9, "c", 1, "test", "13", "picture"),
+                (8, "b", 1, "test", "12", "picture"),
+                (7, "a", 1, "test", "11", "picture")]
+
+            # Act
+            result, has_more = conversation_service.get_conversation_page(1, "asc", 2, before_id=10)
+
+            # Assert
+            self.assertEqual([8, 9], [message["id"] for message in result])
+            self.assertTrue(has_more)
+            query, params = mock_read_query.call_args.args
+            self.assertIn("m.id < ?", query)
+            self.assertIn("ORDER BY m.id DESC", query)
+            self.assertEqual((1, 10, 3), params)
+
+    def test_get_conversation_page_walksForward_when_afterIdIsGiven(self):
+        with patch('services.conversation_service.read_query') as mock_read_query:
+            # Arrange
+            mock_read_query.return_value = [(8, "b", 1, "test", "12", "picture")]
+
+            # Act
+            result, has_more = conversation_service.get_conversation_page(1, "desc", 50, after_id=7)
+
+            # Assert
+            self.assertEqual([8], [message["id"] for message in result])
+            self.assertFalse(has_more)
+            query, params = mock_read_query.call_args.args
+            self.assertIn("m.id > ?", query)
+            self.assertIn("ORDER BY m.id ASC", query)
+            self.assertEqual((1, 7, 51), params)
 
     def test_get_conversation_returns_emptyList_when_dataIsNotPresent(self):
         with patch('services.conversation_service.read_query') as mock_read_query:
@@ -99,26 +136,110 @@ class ConversationServiceShould(unittest.TestCase):
             # Act
             result = conversation_service.get_conversation(1)
 
-            # Arrange
+            # Assert
             self.assertEqual([], result)
 
     def test_get_conversations_returns_conversationsWithAscOrder_when_dataIsPresent(self):
         with patch('services.conversation_service.read_query') as mock_read_query:
             # Arrange
             mock_read_query.return_value = [
-                (1, "test", "test", "test", "12"),
-                (2, "test", "test", "test", "13")]
+                (1, 2, "test", None, "test", "12", 0),
+                (2, 3, "test", None, "test", "13", 4)]
             expected = [{"conversation_id": 1,
+                         "user_id": 2,
                          "with": "test",
+                         "picture": "None",
                          "last_message": "test",
-                         "sent_at": "12"},
+                         "sent_at": "12",
+                         "unread_count": 0},
                         {"conversation_id": 2,
+                         "user_id": 3,
                          "with": "test",
+                         "picture": "None",
                          "last_message": "test",
-                         "sent_at": "13"}]
+                         "sent_at": "13",
+                         "unread_count": 4}]
 
             # Act
             result = conversation_service.get_conversations(1)
 
             # Arrange
             self.assertEqual(expected, result)
+            query = mock_read_query.call_args[0][0]
+            self.assertIn("FROM conversation_summaries s", query)
+            self.assertNotIn("MAX(", query)
+
+    def test_get_conversations_page_returns_nextCursor_when_moreConversationsExist(self):
+        with patch('services.conversation_service.read_query') as mock_read_query:
+            # Arrange
+            sent_at = datetime(2024, 10, 1, 12, 0)
+            mock_read_query.return_value = [(i, 2, "test", None, "test", sent_at, 0) for i in (5, 4, 3)]
+            cursor = {"sent_at": sent_at, "conversation_id": 6}
+
+            # Act
+            result, next_cursor = conversation_service.get_conversations_page(1, "desc", 2, cursor)
+
+            # Arrange
+            query, params = mock_read_query.call_args[0]
+            self.assertIn("(s.last_sent_at < ? OR (s.last_sent_at = ? AND s.conversation_id < ?))", query)
+            self.assertEqual((1, sent_at, sent_at, 6, 3), params)
+            self.assertEqual([5, 4], [conversation["conversation_id"] for conversation in result])
+            self.assertEqual({"sent_at": sent_at, "conversation_id": 4},
+                             conversation_service.decode_cursor(next_cursor))
+
+    def test_record_message_updates_bothParticipants_and_countsUnreadForReceiver(self):
+        with patch('services.conversation_service.insert_query') as mock_insert_query:
+            # Act
+            conversation_service.record_message(3, 10, 1, 2)
+
+            # Assert
+            self.assertEqual([(1, 2, 0, 10), (2, 1, 1, 10)],
+                             [call.args[1] for call in mock_insert_query.call_args_list])
+            self.mock_version_service.bump.assert_called_once_with(self.mock_version_service.INBOX, 1, 2)
+
+    def test_record_message_updates_singleSummary_when_messageToSelf(self):
+        with patch('services.conversation_service.insert_query') as mock_insert_query:
+            # Act
+            conversation_service.record_message(3, 10, 1, 1)
+
+            # Assert
+            mock_insert_query.assert_called_once()
+
+    def test_get_inbox_counts_returns_cachedCounts_until_inboxChanges(self):
+        with patch('services.conversation_service.read_query', return_value=[(3, 1)]) as mock_read_query, \
+                patch('services.conversation_service.insert_query'):
+            # Arrange
+            conversation_service.invalidate_inbox_counts(1)
+
+            # Act
+            first = conversation_service.get_inbox_counts(1)
+            second = conversation_service.get_inbox_counts(1)
+            conversation_service.record_message(3, 10, 2, 1)
+            conversation_service.get_inbox_counts(1)
+
+            # Assert
+            self.assertEqual({"count": 3, "unread": 1}, first)
+            self.assertEqual(first, second)
+            self.assertEqual(2, mock_read_query.call_count)
+
+    def test_mark_as_read_invalidates_inboxCounts(self):
+        with patch('services.conversation_service.read_query', return_value=[(2, 0)]) as mock_read_query, \
+                patch('services.conversation_service.update_query'):
+            # Arrange
+            conversation_service.invalidate_inbox_counts(1)
+            conversation_service.get_inbox_counts(1)
+
+            # Act
+            conversation_service.mark_as_read(3, 1)
+            conversation_service.get_inbox_counts(1)
+
+            # Assert
+            self.assertEqual(2, mock_read_query.call_count)
+
+    def test_mark_as_read_keeps_inboxVersion_when_nothingWasUnread(self):
+        with patch('services.conversation_service.update_query', return_value=0):
+            # Act
+            conversation_service.mark_as_read(3, 1)
+
+            # Assert
+            self.mock_version_service.bump.assert_not_called()
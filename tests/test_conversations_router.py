@@ -1,9 +1,16 @@
 import unittest
+
+import anyio
 from unittest.mock import Mock, patch
 from fastapi.testclient import TestClient
+from starlette.requests import Request
+from starlette.websockets import WebSocketDisconnect
+
+from common import message_bus
 
 from common.auth import get_current_user
 from main import app
+from routers.api.conversations import live_messages_stream
 
 client = TestClient(app)
 
@@ -13,39 +20,134 @@ class ConversationsRouterShould(unittest.TestCase):
         app.dependency_overrides = {
             get_current_user: lambda: 1
         }
+        self.stamp_patch = patch('services.version_service.stamp_with_last_modified',
+                                 return_value=("inbox:1@1", 1700000000))
+        self.stamp_patch.start()
 
     def tearDown(self):
         app.dependency_overrides = {}
+        self.stamp_patch.stop()
 
     @patch('services.user_service.id_exists', return_value=False)
     def test_view_conversation_returns_404_when_receiver_id_does_not_exist(self, mock_id_exists):
-        response = client.get("/conversations/1")
+        response = client.get("/api/conversations/1")
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json(), {"detail": "User ID: 1 not found"})
 
     @patch('services.user_service.id_exists', return_value=True)
     @patch('services.conversation_service.get_conversation_id', return_value=None)
     def test_view_conversation_returns_404_when_no_conversation_found(self, mock_get_conversation_id, mock_id_exists):
-        response = client.get("/conversations/1")
+        response = client.get("/api/conversations/1")
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json(), {"detail": "Conversation with user ID: 1 not found"})
 
     @patch('services.user_service.id_exists', return_value=True)
     @patch('services.conversation_service.get_conversation_id', return_value=1)
-    @patch('services.conversation_service.get_conversation', return_value={"id": 1, "messages": []})
-    def test_view_conversation_success(self, mock_get_conversation, mock_get_conversation_id, mock_id_exists):
-        response = client.get("/conversations/1")
+    @patch('services.conversation_service.get_conversation_page',
+           return_value=([{"id": 4, "text": "a"}, {"id": 5, "text": "b"}], True))
+    @patch('services.conversation_service.mark_as_read')
+    def test_view_conversation_success(self, mock_mark_as_read, mock_get_conversation_page, mock_get_conversation_id,
+                                       mock_id_exists):
+        response = client.get("/api/conversations/1")
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), {"id": 1, "messages": []})
+        self.assertEqual(response.json(), [{"id": 4, "text": "a"}, {"id": 5, "text": "b"}])
+        self.assertEqual(response.headers["X-Before-Id"], "4")
+        self.assertEqual(response.headers["X-Last-Id"], "5")
+        mock_get_conversation_page.assert_called_once_with(1, "asc", 50, None, None)
+        mock_mark_as_read.assert_called_once_with(1, 1)
+
+    @patch('services.user_service.id_exists', return_value=True)
+    @patch('services.conversation_service.get_conversation_id', return_value=1)
+    @patch('services.conversation_service.get_conversation_page', return_value=([], False))
+    @patch('services.conversation_service.mark_as_read')
+    def test_view_conversation_returns_204_when_nothing_new_since(self, mock_mark_as_read, mock_get_conversation_page,
+                                                                 mock_get_conversation_id, mock_id_exists):
+        response = client.get("/api/conversations/1?since=5")
+        self.assertEqual(response.status_code, 204)
+        mock_get_conversation_page.assert_called_once_with(1, "asc", 50, None, 5)
+        mock_mark_as_read.assert_not_called()
 
-    @patch('services.conversation_service.get_conversations', return_value=[])
-    def test_view_conversations_returns_404_when_no_conversations_found(self, mock_get_conversations):
-        response = client.get("/conversations/")
+    def test_view_conversation_returns_400_when_since_is_combined_with_before(self):
+        response = client.get("/api/conversations/1?since=5&before=9")
+        self.assertEqual(response.status_code, 400)
+
+    @patch('services.conversation_service.get_conversations_page', return_value=([], None))
+    def test_view_conversations_returns_404_when_no_conversations_found(self, mock_get_conversations_page):
+        response = client.get("/api/conversations/")
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json(), {"detail": "Conversations not found"})
 
-    @patch('services.conversation_service.get_conversations', return_value=[{"id": 1, "messages": []}])
-    def test_view_conversations_success(self, mock_get_conversations):
-        response = client.get("/conversations/")
+    @patch('services.conversation_service.get_conversations_page',
+           return_value=([{"id": 1, "messages": []}], "next-cursor"))
+    def test_view_conversations_success(self, mock_get_conversations_page):
+        response = client.get("/api/conversations/?limit=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{"id": 1, "messages": []}])
+        self.assertEqual(response.headers["X-Next-Cursor"], "next-cursor")
+        mock_get_conversations_page.assert_called_once_with(1, "asc", 1, None)
+
+    @patch('services.conversation_service.get_conversations_page', return_value=([{"id": 1}], None))
+    def test_view_conversations_returns_304_when_not_modified_since(self, mock_get_conversations_page):
+        response = client.get("/api/conversations/", headers={"If-Modified-Since": "Tue, 14 Nov 2023 22:13:20 GMT"})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["Cache-Control"], "private, no-cache")
+        mock_get_conversations_page.assert_not_called()
+
+    @patch('services.conversation_service.get_conversations_page', return_value=([{"id": 1}], None))
+    def test_view_conversations_ignores_if_modified_since_when_if_none_match_is_sent(self, mock_get_conversations_page):
+        response = client.get("/api/conversations/", headers={"If-None-Match": '"stale"',
+                                                              "If-Modified-Since": "Tue, 14 Nov 2023 22:13:20 GMT"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Last-Modified"], "Tue, 14 Nov 2023 22:13:20 GMT")
+        mock_get_conversations_page.assert_called_once()
+
+    def test_view_conversations_returns_400_when_cursor_is_invalid(self):
+        response = client.get("/api/conversations/?cursor=invalid")
+        self.assertEqual(response.status_code, 400)
+
+    @patch('services.conversation_service.get_inbox_counts', return_value={"count": 3, "unread": 1})
+    def test_view_conversations_count_returns_counts_with_etag(self, mock_get_inbox_counts):
+        response = client.get("/api/conversations/count")
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), [{"id": 1, "messages": []}])
\ No newline at end of file
+        self.assertEqual(response.json(), {"count": 3, "unread": 1})
+        self.assertIn("ETag", response.headers)
+        mock_get_inbox_counts.assert_called_once_with(1)
+
+    @patch('services.conversation_service.get_inbox_counts', return_value={"count": 3, "unread": 1})
+    def test_view_conversations_count_returns_304_when_etag_matches(self, mock_get_inbox_counts):
+        etag = client.get("/api/conversations/count").headers["ETag"]
+        response = client.get("/api/conversations/count", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+
+    @patch('routers.api.conversations.get_current_user', return_value=1)
+    def test_live_messages_socket_pushes_published_messages(self, mock_get_current_user):
+        with client.websocket_connect("/api/conversations/live?token=token") as websocket:
+            message_bus.get_bus().publish("messages:1", {"id": 5, "text": "hi"})
+            self.assertEqual(websocket.receive_json(), {"id": 5, "text": "hi"})
+        mock_get_current_user.assert_called_once_with("token")
+
+    def test_live_messages_socket_closes_when_token_is_missing(self):
+        with self.assertRaises(WebSocketDisconnect):
+            with client.websocket_connect("/api/conversations/live") as websocket:
+                websocket.receive_json()
+
+    @patch('routers.api.conversations.get_current_user', return_value=1)
+    def test_live_messages_stream_subscribes_only_when_streaming_starts(self, mock_get_current_user):
+        # Arrange
+        request = Request({"type": "http", "headers": [(b"authorization", b"Bearer token")]})
+
+        async def respond_and_disconnect():
+            await live_messages_stream(request)
+            return message_bus.get_bus().subscriber_count("messages:1")
+
+        # Act
+        result = anyio.run(respond_and_disconnect)
+
+        # Assert
+        self.assertEqual(0, result)
+        mock_get_current_user.assert_called_once_with("token")
+
+    def test_live_messages_stream_returns_401_when_token_is_missing(self):
+        response = client.get("/api/conversations/live")
+        self.assertEqual(response.status_code, 401)
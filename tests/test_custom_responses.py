@@ -0,0 +1,44 @@
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from common.custom_responses import JSONResponse, NotFound
+from schemas.reply import Reply
+from schemas.topic import SingleTopic, Topic
+
+
+class JSONResponse_Should(unittest.TestCase):
+
+    def test_render_serializes_nestedModels_with_datetimes(self):
+        # Arrange
+        created_at = datetime(2024, 11, 5, 18, 30, 15)
+        topic = Topic(id=1, title="Tea topic", content="All about tea.", category_id=2, created_at=created_at)
+        reply = Reply(id=3, content="Green tea.", topic_id=1, created_at=created_at)
+
+        # Act
+        response = JSONResponse(SingleTopic(topic=topic, all_replies=[reply]))
+
+        # Assert
+        self.assertIn(b'"topic":{"id":1,"title":"Tea topic"', response.body)
+        self.assertIn(b'"created_at":"2024-11-05T18:30:15"', response.body)
+        self.assertEqual("application/json", response.headers["content-type"])
+
+    def test_render_serializes_intKeys_and_decimals(self):
+        # Act
+        response = JSONResponse({1: "upvote", "total": Decimal("3"), "average": Decimal("2.5")})
+
+        # Assert
+        self.assertEqual(b'{"1":"upvote","total":3,"average":2.5}', response.body)
+
+    def test_render_raises_typeError_when_typeIsUnknown(self):
+        # Act & Assert
+        with self.assertRaises(TypeError):
+            JSONResponse({"value": object()})
+
+    def test_customResponses_render_with_orjson(self):
+        # Act
+        response = NotFound("Topic")
+
+        # Assert
+        self.assertEqual(404, response.status_code)
+        self.assertEqual(b'{"detail":"Topic not found"}', response.body)
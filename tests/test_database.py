@@ -0,0 +1,342 @@
+import threading
+import anyio
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+from data import database
+from data.database import ConnectionPool, PoolTimeoutError
+
+
+def fake_connection_factory():
+    return Mock()
+
+
+class ConnectionPool_Should(unittest.TestCase):
+
+    def test_acquire_reuses_releasedConnection(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=2, connection_factory=fake_connection_factory)
+        connection = pool.acquire()
+        pool.release(connection)
+
+        # Act
+        result = pool.acquire()
+
+        # Assert
+        self.assertIs(connection, result)
+        self.assertEqual(1, pool.stats()["created"])
+        connection.rollback.assert_called_once()
+
+    def test_acquire_raises_poolTimeoutError_when_poolIsExhausted(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=1, timeout=0.01,
+                              connection_factory=fake_connection_factory)
+        pool.acquire()
+
+        # Act & Assert
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire()
+
+        stats = pool.stats()
+        self.assertEqual(1, stats["waits"])
+        self.assertEqual(1, stats["timeouts"])
+
+    def test_acquire_waits_for_releasedConnection(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=1, timeout=2,
+                              connection_factory=fake_connection_factory)
+        connection = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, args=(connection,))
+
+        # Act
+        timer.start()
+        result = pool.acquire()
+
+        # Assert
+        self.assertIs(connection, result)
+        self.assertEqual(1, pool.stats()["waits"])
+        self.assertGreater(pool.stats()["wait_time_total"], 0)
+
+    def test_acquire_replaces_connection_when_healthCheckFails(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=1, ping_after=0,
+                              connection_factory=fake_connection_factory)
+        dead_connection = pool.acquire()
+        dead_connection.ping.side_effect = database.MariaDBError()
+        pool.release(dead_connection)
+
+        # Act
+        result = pool.acquire()
+
+        # Assert
+        self.assertIsNot(dead_connection, result)
+        dead_connection.close.assert_called_once()
+        self.assertEqual(1, pool.stats()["failed_health_checks"])
+        self.assertEqual(1, pool.stats()["size"])
+
+    def test_acquire_reaps_idleConnections_above_minSize(self):
+        # Arrange
+        pool = ConnectionPool(min_size=1, max_size=3, max_idle=0,
+                              connection_factory=fake_connection_factory)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        # Act
+        pool.acquire()
+
+        # Assert
+        self.assertEqual(1, pool.stats()["reaped"])
+        first.close.assert_called_once()
+
+    def test_acquire_closes_reapedConnections_outside_the_lock(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=2, max_idle=0,
+                              connection_factory=fake_connection_factory)
+        reaped = pool.acquire()
+        pool.release(reaped)
+        stats_while_closing = []
+
+        def read_stats_from_another_thread():
+            thread = threading.Thread(target=lambda: stats_while_closing.append(pool.stats()))
+            thread.start()
+            thread.join(1)
+
+        reaped.close.side_effect = read_stats_from_another_thread
+
+        # Act
+        pool.acquire()
+
+        # Assert
+        self.assertEqual(1, len(stats_while_closing))
+        self.assertEqual(1, pool.stats()["reaped"])
+
+    def test_init_opens_minSize_connections(self):
+        # Act
+        pool = ConnectionPool(min_size=2, max_size=3, connection_factory=fake_connection_factory)
+
+        # Assert
+        stats = pool.stats()
+        self.assertEqual(2, stats["created"])
+        self.assertEqual(2, stats["idle"])
+
+    def test_init_leaves_connections_to_lazyCheckouts_when_databaseIsDown(self):
+        # Arrange
+        factory = Mock(side_effect=database.MariaDBError())
+
+        # Act
+        pool = ConnectionPool(min_size=2, max_size=3, connection_factory=factory)
+
+        # Assert
+        self.assertEqual(0, pool.stats()["size"])
+        factory.assert_called_once()
+
+    def test_release_discards_connection_when_rollbackFails(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=1, connection_factory=fake_connection_factory)
+        connection = pool.acquire()
+        connection.rollback.side_effect = database.MariaDBError()
+
+        # Act
+        pool.release(connection)
+
+        # Assert
+        connection.close.assert_called_once()
+        self.assertEqual(0, pool.stats()["size"])
+
+    def test_close_closes_idleConnections_and_refusesCheckouts(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=1, connection_factory=fake_connection_factory)
+        connection = pool.acquire()
+        pool.release(connection)
+
+        # Act
+        pool.close()
+
+        # Assert
+        connection.close.assert_called_once()
+        with self.assertRaises(RuntimeError):
+            pool.acquire()
+
+    def test_readQuery_returns_connection_to_pool(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=1, connection_factory=fake_connection_factory)
+        with patch('data.database.get_pool', return_value=pool):
+            connection = pool.acquire()
+            cursor = MagicMock()
+            cursor.__iter__.return_value = iter([(1,), (2,)])
+            connection.cursor.return_value = cursor
+            pool.release(connection)
+
+            # Act
+            result = database.read_query("SELECT 1")
+
+        # Assert
+        self.assertEqual([(1,), (2,)], result)
+        self.assertEqual(1, pool.stats()["idle"])
+
+
+class UnitOfWork_Should(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.pool = ConnectionPool(min_size=0, max_size=2, connection_factory=fake_connection_factory)
+        self.pool_patch = patch('data.database.get_pool', return_value=self.pool)
+        self.pool_patch.start()
+
+    def tearDown(self) -> None:
+        self.pool_patch.stop()
+
+    def test_unitOfWork_reuses_oneConnection_and_commitsOnce(self):
+        # Act
+        with database.unit_of_work():
+            database.insert_query("INSERT 1")
+            database.update_query("UPDATE 1")
+            connection = database._active_unit_of_work().connection
+
+        # Assert
+        connection.commit.assert_called_once()
+        self.assertEqual(1, self.pool.stats()["checkouts"])
+        self.assertEqual(1, self.pool.stats()["idle"])
+
+    def test_unitOfWork_rollsBack_when_exceptionIsRaised(self):
+        # Act
+        with self.assertRaises(ValueError):
+            with database.unit_of_work():
+                database.insert_query("INSERT 1")
+                connection = database._active_unit_of_work().connection
+                raise ValueError()
+
+        # Assert
+        connection.commit.assert_not_called()
+        connection.rollback.assert_called()
+        self.assertIsNone(database._active_unit_of_work())
+
+    def test_unitOfWork_joins_activeUnitOfWork(self):
+        # Act
+        with database.unit_of_work():
+            outer = database._active_unit_of_work()
+            with database.unit_of_work():
+                inner = database._active_unit_of_work()
+                database.update_query("UPDATE 1")
+            outer.connection.commit.assert_not_called()
+
+        # Assert
+        self.assertIs(outer, inner)
+        outer_connection = self.pool._idle[0][0]
+        outer_connection.commit.assert_called_once()
+
+    def test_unitOfWork_doesNotAcquireConnection_when_noQueryRuns(self):
+        # Act
+        with database.unit_of_work():
+            pass
+
+        # Assert
+        self.assertEqual(0, self.pool.stats()["checkouts"])
+
+    def test_onCommit_runsCallback_only_afterCommit(self):
+        # Arrange
+        callback = Mock()
+
+        # Act
+        with database.unit_of_work():
+            database.update_query("UPDATE 1")
+            database.on_commit(callback)
+            callback.assert_not_called()
+
+        # Assert
+        callback.assert_called_once()
+
+    def test_onCommit_dropsCallback_when_rolledBack(self):
+        # Arrange
+        callback = Mock()
+
+        # Act
+        with self.assertRaises(ValueError):
+            with database.unit_of_work():
+                database.on_commit(callback)
+                raise ValueError()
+
+        # Assert
+        callback.assert_not_called()
+
+
+class AsyncQueries_Should(unittest.TestCase):
+
+    def test_finishUnitOfWork_commits_when_defaultThreadPoolIsExhausted(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=1, connection_factory=fake_connection_factory)
+
+        async def finish_with_no_default_threads_left(uow):
+            limiter = anyio.to_thread.current_default_thread_limiter()
+            limiter.total_tokens = 1
+            await limiter.acquire()
+            try:
+                with anyio.fail_after(2):
+                    await database.finish_unit_of_work(uow, True)
+            finally:
+                limiter.release()
+
+        with patch('data.database.get_pool', return_value=pool):
+            with database.bind_unit_of_work() as uow:
+                connection = uow.connection
+
+                # Act
+                anyio.run(finish_with_no_default_threads_left, uow)
+
+        # Assert
+        connection.commit.assert_called_once()
+        self.assertEqual(1, pool.stats()["idle"])
+
+    def test_readQueryAsync_returns_readQueryResult(self):
+        with patch('data.database.read_query', return_value=[(1,)]) as mock_read_query:
+            # Act
+            result = anyio.run(database.read_query_async, "SELECT 1", (1,))
+
+            # Assert
+            self.assertEqual([(1,)], result)
+            mock_read_query.assert_called_once_with("SELECT 1", (1,))
+
+    def test_runInDbThread_sees_activeUnitOfWork(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=1, connection_factory=fake_connection_factory)
+
+        async def run_two_queries():
+            await database.update_query_async("UPDATE 1")
+            await database.update_query_async("UPDATE 2")
+
+        with patch('data.database.get_pool', return_value=pool):
+            # Act
+            with database.unit_of_work():
+                anyio.run(run_two_queries)
+                connection = database._active_unit_of_work().connection
+
+        # Assert
+        self.assertEqual(1, pool.stats()["checkouts"])
+        connection.commit.assert_called_once()
+
+    def test_runInDbThread_runs_query_of_connectedUnitOfWork_when_acquiringThreadsTakeEveryToken(self):
+        # Arrange
+        pool = ConnectionPool(min_size=0, max_size=1, connection_factory=fake_connection_factory)
+
+        async def query_while_acquiring_threads_wait(uow):
+            limiter = database._get_db_limiter(False)
+            borrowers = [object() for _ in range(int(limiter.total_tokens))]
+            for borrower in borrowers:
+                await limiter.acquire_on_behalf_of(borrower)
+            try:
+                with anyio.fail_after(2):
+                    await database.update_query_async("UPDATE 1")
+            finally:
+                for borrower in borrowers:
+                    limiter.release_on_behalf_of(borrower)
+
+        with patch('data.database.get_pool', return_value=pool):
+            with database.unit_of_work():
+                uow = database._active_unit_of_work()
+                connection = uow.connection
+
+                # Act
+                anyio.run(query_while_acquiring_threads_wait, uow)
+
+        # Assert
+        connection.cursor.return_value.execute.assert_called_once_with("UPDATE 1", ())
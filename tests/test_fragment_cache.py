@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import Mock
+
+from common.fragment_cache import FragmentCache
+
+
+class FragmentCache_Should(unittest.TestCase):
+
+    def test_getOrRender_renders_once_and_countsHitsAndMisses(self):
+        # Arrange
+        cache = FragmentCache(max_chars=100)
+        render = Mock(return_value="<p>tea</p>")
+
+        # Act
+        first = cache.get_or_render(("topic", 1, "topic:1@3"), render)
+        second = cache.get_or_render(("topic", 1, "topic:1@3"), render)
+
+        # Assert
+        self.assertEqual("<p>tea</p>", first)
+        self.assertEqual(first, second)
+        render.assert_called_once()
+        stats = cache.stats()
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(1, stats["misses"])
+
+    def test_getOrRender_renders_again_when_versionChanges(self):
+        # Arrange
+        cache = FragmentCache(max_chars=100)
+        cache.set(("topic", 1, "topic:1@3"), "old")
+
+        # Act
+        result = cache.get_or_render(("topic", 1, "topic:1@4"), lambda: "new")
+
+        # Assert
+        self.assertEqual("new", result)
+
+    def test_set_evicts_leastRecentlyUsed_when_full(self):
+        # Arrange
+        cache = FragmentCache(max_chars=10)
+        cache.set("a", "aaaa")
+        cache.set("b", "bbbb")
+        cache.get("a")
+
+        # Act
+        cache.set("c", "cccc")
+
+        # Assert
+        self.assertEqual("aaaa", cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(1, cache.stats()["evictions"])
+        self.assertEqual(8, cache.stats()["chars"])
+
+    def test_set_skips_fragment_largerThanCache(self):
+        # Arrange
+        cache = FragmentCache(max_chars=10)
+        cache.set("a", "aaaa")
+
+        # Act
+        cache.set("b", "b" * 11)
+
+        # Assert
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual("aaaa", cache.get("a"))
+
+    def test_getOrRender_cachesNothing_when_renderFails(self):
+        # Arrange
+        cache = FragmentCache(max_chars=100)
+
+        # Act & Assert
+        with self.assertRaises(AttributeError):
+            cache.get_or_render("a", Mock(side_effect=AttributeError()))
+
+        self.assertEqual(0, cache.stats()["entries"])
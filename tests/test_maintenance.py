@@ -0,0 +1,29 @@
+import unittest
+from unittest.mock import patch
+
+import maintenance
+
+
+class Maintenance_Should(unittest.TestCase):
+
+    def test_backfillReplyCounters_walks_allBatches(self):
+        with patch('services.topic_service.recalculate_reply_counters',
+                   side_effect=[2, 4, None]) as mock_recalculate:
+            # Act
+            result = maintenance.backfill_reply_counters(batch_size=2)
+
+            # Assert
+            self.assertEqual(2, result)
+            self.assertEqual([(0, 2), (2, 2), (4, 2)],
+                             [call.args for call in mock_recalculate.call_args_list])
+
+    def test_reconcileReplyVotes_walks_allBatches(self):
+        with patch('services.vote_service.reconcile_reply_counters',
+                   side_effect=[(3, [2]), (6, []), (None, [])]) as mock_reconcile:
+            # Act
+            result = maintenance.reconcile_reply_votes(batch_size=3)
+
+            # Assert
+            self.assertEqual(2, result)
+            self.assertEqual([(0, 3), (3, 3), (6, 3)],
+                             [call.args for call in mock_reconcile.call_args_list])
@@ -0,0 +1,74 @@
+import threading
+import unittest
+
+import anyio
+
+from common.message_bus import InProcessBus
+
+
+class InProcessBus_Should(unittest.TestCase):
+
+    def test_publish_delivers_message_to_channelSubscribers_only(self):
+        # Arrange
+        bus = InProcessBus()
+
+        async def receive():
+            with bus.subscribe("messages:1") as subscription, bus.subscribe("messages:2") as other:
+                bus.publish("messages:1", {"text": "hi"})
+                return await subscription.get(1), await other.get(0.01)
+
+        # Act
+        message, other_message = anyio.run(receive)
+
+        # Assert
+        self.assertEqual({"text": "hi"}, message)
+        self.assertIsNone(other_message)
+
+    def test_publish_delivers_message_from_anotherThread(self):
+        # Arrange
+        bus = InProcessBus()
+
+        async def receive():
+            with bus.subscribe("messages:1") as subscription:
+                publisher = threading.Thread(target=bus.publish, args=("messages:1", {"text": "hi"}))
+                publisher.start()
+                publisher.join()
+                return await subscription.get(1)
+
+        # Act
+        result = anyio.run(receive)
+
+        # Assert
+        self.assertEqual({"text": "hi"}, result)
+
+    def test_subscription_drops_oldestMessages_when_subscriberFallsBehind(self):
+        # Arrange
+        bus = InProcessBus(max_queued=2)
+
+        async def receive():
+            with bus.subscribe("messages:1") as subscription:
+                for number in range(3):
+                    bus.publish("messages:1", {"number": number})
+                first, second = await subscription.get(1), await subscription.get(1)
+                return first, second, subscription.dropped
+
+        # Act
+        first, second, dropped = anyio.run(receive)
+
+        # Assert
+        self.assertEqual(({"number": 1}, {"number": 2}), (first, second))
+        self.assertEqual(1, dropped)
+
+    def test_close_unsubscribes(self):
+        # Arrange
+        bus = InProcessBus()
+
+        async def subscribe_and_close():
+            with bus.subscribe("messages:1"):
+                self.assertEqual(1, bus.subscriber_count("messages:1"))
+
+        # Act
+        anyio.run(subscribe_and_close)
+
+        # Assert
+        self.assertEqual(0, bus.subscriber_count())
@@ -8,46 +8,32 @@ class MessageServiceShould(unittest.TestCase):
     def test_create_returns_message_when_dataIsPresent(self):
         with patch('services.message_service.get_user_by_id') as mock_get_user_by_id:
             with patch('services.message_service.insert_query') as mock_insert_query:
-                with patch('services.message_service._get_conversation_id') as mock_get_conversation_id:
+                with patch('services.conversation_service.get_or_create_conversation_id') as mock_get_conversation_id, \
+                        patch('services.conversation_service.record_message') as mock_record_message, \
+                        patch('services.message_service._get_message_event', return_value={"id": 5}), \
+                        patch('services.message_service.publish_message') as mock_publish_message:
                     # Arrange
                     message = Message(text="test")
                     mock_get_user_by_id.return_value.first_name = "Test"
-                    mock_insert_query.return_value = 1
+                    mock_insert_query.return_value = 5
                     mock_get_conversation_id.return_value = 1
 
                     # Act
-                    result = message_service.create(message, 1, 1)
+                    result = message_service.create(message, 2, 1)
 
                     # Assert
                     self.assertEqual("The message to Test was sent successfully!", result)
+                    mock_record_message.assert_called_once_with(1, 5, 1, 2)
+                    mock_publish_message.assert_called_once_with({"id": 5})
 
-    def test_get_conversation_id_returns_conversation_id_withPreviousConv_when_dataIsPresent(self):
-        with patch('services.message_service.conversation_service.get_conversation_id') as mock_get_conversation_id:
-            with patch('services.message_service.insert_query') as mock_insert_query:
-                with patch('services.message_service.read_query') as mock_read_query:
-                    # Arrange
-                    mock_get_conversation_id.return_value = 1
-
-                    # Act
-                    result = message_service._get_conversation_id(1, 1)
-
-                    # Assert
-                    self.assertEqual(1, result)
-                    mock_insert_query.assert_not_called()
-                    mock_read_query.assert_not_called()
-
-    def test_get_conversation_id_returns_conversation_id_withNoPreviousConv_when_dataIsPresent(self):
-        with patch('services.message_service.conversation_service.get_conversation_id') as mock_get_conversation_id:
-            with patch('services.message_service.insert_query') as mock_insert_query:
-                with patch('services.message_service.read_query') as mock_read_query:
-                    # Arrange
-                    mock_get_conversation_id.return_value = None
-                    mock_read_query.return_value = [(1,)]
+    def test_publish_message_notifies_sender_and_receiver(self):
+        with patch('services.message_service.message_bus.get_bus') as mock_get_bus:
+            # Arrange
+            event = {"id": 5, "from_id": 1, "to_id": 2}
 
-                    # Act
-                    result = message_service._get_conversation_id(1, 1)
+            # Act
+            message_service.publish_message(event)
 
-                    # Assert
-                    self.assertEqual(1, result)
-                    mock_insert_query.assert_called_once()
-                    mock_read_query.assert_called_once()
\ No newline at end of file
+            # Assert
+            self.assertEqual([("messages:2", event), ("messages:1", event)],
+                             [call.args for call in mock_get_bus.return_value.publish.call_args_list])
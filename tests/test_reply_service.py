@@ -57,7 +57,8 @@ class ReplyService_Should(unittest.TestCase):
             mock_read_query.assert_called_once()
 
     def test_create_returns_reply_when_dataIsPresent(self):
-        with patch('services.reply_service.insert_query') as mock_insert_query:
+        with patch('services.reply_service.insert_query') as mock_insert_query, \
+                patch('services.reply_service.update_query') as mock_update_query:
             with patch('services.reply_service.get_by_id') as mock_get_by_id:
                 # Arrange
                 mock_insert_query.return_value = 1
@@ -77,6 +78,8 @@ class ReplyService_Should(unittest.TestCase):
                 # Arrange
                 self.assertEqual(expected, result)
                 mock_insert_query.assert_called_once()
+                mock_update_query.assert_called_once()
+                self.assertEqual((1,), mock_update_query.call_args[0][1])
                 mock_get_by_id.assert_called_once()
 
     def test_replyBelongsToTopic_returns_True_when_dataIsPresent(self):
@@ -0,0 +1,53 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+import test_data as td
+from main import app
+from routers.api import search as search_router
+from schemas.search import SearchResult
+
+client = TestClient(app)
+
+
+class SearchRouter_Should(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.test_results = [SearchResult.from_query_result('reply', 2, 1, 'Pool party',
+                                                            'the <mark>pool</mark>', td.TEST_CREATED_AT, 1.5)]
+
+        app.dependency_overrides = {
+            search_router.get_current_user: lambda: 1
+        }
+
+    def tearDown(self) -> None:
+        app.dependency_overrides = {}
+
+    def test_search_returns_results_and_cursorHeader(self):
+        with patch('services.search_service.search',
+                   return_value=(self.test_results, "next-cursor")) as mock_search:
+            # Act
+            response = client.get("/api/search/?q=pool&limit=5")
+
+            # Assert
+            self.assertEqual(200, response.status_code)
+            self.assertEqual([r.model_dump(mode="json") for r in self.test_results], response.json())
+            self.assertEqual("next-cursor", response.headers["X-Next-Cursor"])
+            mock_search.assert_called_once_with("pool", 1, 5, None)
+
+    def test_search_returns_badRequest_when_cursorIsInvalid(self):
+        with patch('services.search_service.search') as mock_search:
+            # Act
+            response = client.get("/api/search/?q=pool&cursor=invalid")
+
+            # Assert
+            self.assertEqual(400, response.status_code)
+            mock_search.assert_not_called()
+
+    def test_search_returns_unprocessableEntity_when_queryIsTooShort(self):
+        # Act
+        response = client.get("/api/search/?q=a")
+
+        # Assert
+        self.assertEqual(422, response.status_code)
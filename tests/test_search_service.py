@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import patch
+
+import test_data as td
+from services import search_service
+
+
+class SearchService_Should(unittest.TestCase):
+
+    def test_search_returns_highlightedResults_and_nextCursor(self):
+        # Arrange
+        rows = [('topic', 3, 3, 'Pool party', 'The pool party drama', td.TEST_CREATED_AT, 2.5),
+                ('reply', 8, 3, 'Pool party', 'Nobody saw the pool', td.TEST_CREATED_AT, 1.5)]
+
+        with (patch('services.search_service.read_query', return_value=rows) as mock_read_query,
+              patch('services.user_service.is_admin', return_value=True)):
+            # Act
+            results, next_cursor = search_service.search('pool', 1, 1)
+
+            # Assert
+            query, params = mock_read_query.call_args[0]
+            self.assertIn("ORDER BY s.relevance DESC, s.type, s.id LIMIT ?", query)
+            self.assertEqual(('pool', 'pool', 'pool', 'pool', 2), params)
+            self.assertEqual(1, len(results))
+            self.assertEqual('The <mark>pool</mark> party drama', results[0].snippet)
+            self.assertEqual({"relevance": 2.5, "type": "topic", "id": 3},
+                             search_service.decode_cursor(next_cursor))
+
+    def test_search_filters_visibleCategories_when_userNotAdmin(self):
+        with (patch('services.search_service.read_query', return_value=[]) as mock_read_query,
+              patch('services.user_service.is_admin', return_value=False),
+              patch('services.category_service.visible_categories_condition',
+                    return_value=("t.category_id IN (?)", [4]))):
+            # Act
+            results, next_cursor = search_service.search('pool', 1, 10,
+                                                         {"relevance": 1.0, "type": "reply", "id": 2})
+
+            # Assert
+            query, params = mock_read_query.call_args[0]
+            self.assertEqual(2, query.count("AND t.category_id IN (?)"))
+            self.assertEqual(('pool', 'pool', 4, 'pool', 'pool', 4, 1.0, 1.0, 'reply', 'reply', 2, 11), params)
+            self.assertEqual([], results)
+            self.assertIsNone(next_cursor)
+
+    def test_highlight_escapesHtml_and_cutsAroundFirstMatch(self):
+        # Arrange
+        text = "<b>" + "x" * 100 + " Dramatic ending"
+
+        # Act
+        result = search_service.highlight(text, ["drama"], width=40)
+
+        # Assert
+        self.assertTrue(result.startswith("..."))
+        self.assertIn("<mark>Dramatic</mark>", result)
+        self.assertNotIn("<b>", result)
+
+    def test_decodeCursor_returns_None_when_typeIsUnknown(self):
+        # Act
+        result = search_service.decode_cursor(
+            search_service.cursors.encode({"relevance": 1, "type": "user", "id": 1}))
+
+        # Assert
+        self.assertIsNone(result)
@@ -0,0 +1,153 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common import compression
+from common.static_assets import IMMUTABLE, REVALIDATE, PrecompressedStaticFiles, StaticAssets, precompress
+
+STYLESHEET = "body { color: black; }\n" * 100
+
+
+class StaticAssetsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.directory.name, "css"))
+        with open(os.path.join(self.directory.name, "css", "style.css"), "w") as file:
+            file.write(STYLESHEET)
+        with open(os.path.join(self.directory.name, "css", "__init__.py"), "w") as file:
+            file.write("# package marker\n" * 100)
+
+        self.brotli_patcher = patch.object(compression, "brotli", None)
+        self.brotli_patcher.start()
+
+    def tearDown(self):
+        self.brotli_patcher.stop()
+        self.directory.cleanup()
+
+
+class StaticAssets_Should(StaticAssetsTestCase):
+
+    def test_url_returns_contentHashedUrl(self):
+        # Arrange
+        assets = StaticAssets(self.directory.name)
+
+        # Act
+        url = assets.url("css/style.css")
+
+        # Assert
+        self.assertRegex(url, r"^/static/css/style\.[0-9a-f]{12}\.css$")
+
+    def test_url_changes_when_contentChanges(self):
+        # Arrange
+        assets = StaticAssets(self.directory.name)
+        old_url = assets.url("css/style.css")
+        with open(os.path.join(self.directory.name, "css", "style.css"), "a") as file:
+            file.write("a { color: red; }\n")
+
+        # Act
+        new_url = assets.url("css/style.css")
+
+        # Assert
+        self.assertNotEqual(old_url, new_url)
+
+    def test_url_returns_plainUrl_when_fileIsMissing(self):
+        # Act
+        url = StaticAssets(self.directory.name).url("css/missing.css")
+
+        # Assert
+        self.assertEqual("/static/css/missing.css", url)
+
+    def test_resolve_returns_originalPath_and_notImmutable_when_hashIsOutdated(self):
+        # Act
+        result = StaticAssets(self.directory.name).resolve("css/style.0123456789ab.css")
+
+        # Assert
+        self.assertEqual(("css/style.css", False), result)
+
+    def test_resolve_does_not_hash_fileOutsideStaticDirectory(self):
+        # Arrange
+        assets = StaticAssets(self.directory.name)
+        with tempfile.TemporaryDirectory() as outside:
+            with open(os.path.join(outside, "host.conf"), "w") as file:
+                file.write("secret")
+            path = os.path.relpath(os.path.join(outside, "host.0123456789ab.conf"), self.directory.name)
+
+            # Act
+            result = assets.resolve(path)
+
+        # Assert
+        self.assertEqual((path, False), result)
+        self.assertEqual({}, assets._digests)
+
+    def test_precompress_writes_gzipVariants_of_compressibleFilesOnly(self):
+        # Act
+        written = precompress(self.directory.name)
+
+        # Assert
+        self.assertEqual(1, written)
+        with gzip.open(os.path.join(self.directory.name, "css", "style.css.gz"), "rt") as file:
+            self.assertEqual(STYLESHEET, file.read())
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, "css", "__init__.py.gz")))
+
+
+class PrecompressedStaticFiles_Should(StaticAssetsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        app = FastAPI()
+        app.mount("/static", PrecompressedStaticFiles(directory=self.directory.name), name="static")
+        self.client = TestClient(app)
+        self.hashed_url = StaticAssets(self.directory.name).url("css/style.css")
+
+    def test_serves_gzipVariant_with_immutableCaching_for_hashedUrl(self):
+        # Arrange
+        precompress(self.directory.name)
+
+        # Act
+        response = self.client.get(self.hashed_url, headers={"Accept-Encoding": "gzip"})
+
+        # Assert
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("gzip", response.headers["content-encoding"])
+        self.assertTrue(response.headers["content-type"].startswith("text/css"))
+        self.assertEqual(IMMUTABLE, response.headers["cache-control"])
+        self.assertEqual(STYLESHEET, response.text)
+
+    def test_serves_original_when_encodingIsNotAccepted(self):
+        # Arrange
+        precompress(self.directory.name)
+
+        # Act
+        response = self.client.get(self.hashed_url, headers={"Accept-Encoding": "identity"})
+
+        # Assert
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual("Accept-Encoding", response.headers["vary"])
+        self.assertEqual(STYLESHEET, response.text)
+
+    def test_serves_original_when_variantIsOutdated(self):
+        # Arrange
+        precompress(self.directory.name)
+        path = os.path.join(self.directory.name, "css", "style.css")
+        variant_mtime = os.stat(path + ".gz").st_mtime_ns
+        os.utime(path, ns=(variant_mtime + 10 ** 9, variant_mtime + 10 ** 9))
+
+        # Act
+        response = self.client.get("/static/css/style.css", headers={"Accept-Encoding": "gzip"})
+
+        # Assert
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_revalidates_plainUrl(self):
+        # Act
+        response = self.client.get("/static/css/style.css")
+
+        # Assert
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(REVALIDATE, response.headers["cache-control"])
@@ -10,6 +10,13 @@ from services import topic_service
 
 class TopicService_Should(unittest.TestCase):
 
+    def setUp(self) -> None:
+        self.version_service_patch = patch('services.topic_service.version_service')
+        self.mock_version_service = self.version_service_patch.start()
+
+    def tearDown(self) -> None:
+        self.version_service_patch.stop()
+
     def test_getAllTopics_returns_listOfTopics_when_dataIsPresent(self):
         # Arrange
         test_topic_1 = (1, td.TEST_TITLE, False, td.TEST_CREATED_AT, 1, 1, 5)
@@ -60,6 +67,138 @@ class TopicService_Should(unittest.TestCase):
             mock_build_conditions_and_params.assert_called_once()
             mock_build_final_query.assert_called_once()
 
+    def test_getAllTopics_ordersAndFlipsPage_when_prevCursorIsGiven(self):
+        # Arrange
+        test_topic_1 = (1, td.TEST_TITLE, False, td.TEST_CREATED_AT, 1, 1, 5)
+        test_topic_2 = (2, td.TEST_TITLE, False, td.TEST_CREATED_AT, 1, 1, 3)
+        cursor = {"sort_by": "created_at", "value": td.TEST_CREATED_AT, "id": 3, "direction": "prev"}
+
+        with (patch('services.topic_service.read_query',
+                    return_value=[test_topic_2, test_topic_1]) as mock_read_query,
+              patch('services.topic_service._build_conditions_and_params',
+                    return_value=([], []))):
+
+            # Act
+            result = topic_service.get_all_topics(
+                search=None, category_id=None,
+                author_id=None, is_locked=None,
+                user_id=1, limit=10, offset=5, cursor=cursor)
+
+            # Assert
+            query, params = mock_read_query.call_args[0]
+            self.assertIn("(t.created_at < ? OR (t.created_at = ? AND t.id < ?))", query)
+            self.assertIn("ORDER BY t.created_at DESC, t.id DESC", query)
+            self.assertEqual((td.TEST_CREATED_AT, td.TEST_CREATED_AT, 3, 10, 0), params)
+            self.assertEqual([1, 2], [topic.id for topic in result])
+
+    def test_getAllTopics_returns_authorAndCategoryNames_from_singleQuery(self):
+        # Arrange
+        row = (1, td.TEST_TITLE, False, td.TEST_CREATED_AT, 1, 2, 5, td.TEST_CREATED_AT, None, 'author', 'category')
+
+        with (patch('services.topic_service.read_query', return_value=[row]) as mock_read_query,
+              patch('services.topic_service._build_conditions_and_params', return_value=([], []))):
+            # Act
+            result = topic_service.get_all_topics(None, None, None, None, 1, 10, 0)
+
+            # Assert
+            query = mock_read_query.call_args[0][0]
+            self.assertIn("JOIN users u ON u.id = t.author_id", query)
+            self.assertIn("JOIN categories c ON c.id = t.category_id", query)
+            mock_read_query.assert_called_once()
+            self.assertEqual('author', result[0].author_username)
+            self.assertEqual('category', result[0].category_title)
+
+    def test_getTopicsPage_returns_nextCursor_when_moreTopicsExist(self):
+        # Arrange
+        topics = [ViewAllTopics.from_query_result(i, td.TEST_TITLE, False, td.TEST_CREATED_AT, 1, 1, 0)
+                  for i in (1, 2, 3)]
+
+        with patch('services.topic_service.get_all_topics', return_value=topics) as mock_get_all_topics:
+            # Act
+            result, next_cursor, prev_cursor = topic_service.get_topics_page(
+                None, None, None, None, 1, 2, 0)
+
+            # Assert
+            self.assertEqual(topics[:2], result)
+            self.assertEqual({"sort_by": "created_at", "value": td.TEST_CREATED_AT, "id": 2, "direction": "next"},
+                             topic_service.decode_cursor(next_cursor))
+            self.assertIsNone(prev_cursor)
+            self.assertEqual(3, mock_get_all_topics.call_args[0][5])
+
+    def test_getTopicsPage_returns_noNextCursor_when_lastPage(self):
+        # Arrange
+        topics = [ViewAllTopics.from_query_result(i, td.TEST_TITLE, False, td.TEST_CREATED_AT, 1, 1, 0)
+                  for i in (3, 4)]
+        cursor = {"sort_by": "created_at", "value": td.TEST_CREATED_AT, "id": 2, "direction": "next"}
+
+        with patch('services.topic_service.get_all_topics', return_value=topics):
+            # Act
+            result, next_cursor, prev_cursor = topic_service.get_topics_page(
+                None, None, None, None, 1, 2, 0, cursor=cursor)
+
+            # Assert
+            self.assertEqual(topics, result)
+            self.assertIsNone(next_cursor)
+            self.assertEqual(3, topic_service.decode_cursor(prev_cursor)["id"])
+
+    def test_getAllTopics_readsDenormalizedCounter_when_sortingByRepliesCount(self):
+        # Arrange
+        cursor = {"sort_by": "replies_count", "value": 5, "id": 7, "direction": "next"}
+
+        with (patch('services.topic_service.read_query', return_value=[]) as mock_read_query,
+              patch('services.topic_service._build_conditions_and_params',
+                    return_value=(["t.category_id = ?"], [1]))):
+
+            # Act
+            topic_service.get_all_topics(
+                search=None, category_id=1,
+                author_id=None, is_locked=None,
+                user_id=1, limit=10, offset=0, sort="desc",
+                cursor=cursor, sort_by="replies_count")
+
+            # Assert
+            query, params = mock_read_query.call_args[0]
+            self.assertIn("WHERE t.category_id = ? AND "
+                          "(t.replies_count < ? OR (t.replies_count = ? AND t.id < ?)) "
+                          "ORDER BY t.replies_count DESC, t.id DESC", query)
+            self.assertNotIn("GROUP BY", query)
+            self.assertEqual((1, 5, 5, 7, 10, 0), params)
+
+    def test_getAllTopics_selectsScore_only_when_sortingByScore(self):
+        with (patch('services.topic_service.read_query', return_value=[]) as mock_read_query,
+              patch('services.topic_service._build_conditions_and_params',
+                    side_effect=lambda *args: ([], []))):
+            # Act
+            topic_service.get_all_topics(None, None, None, None, 1, 10, 0, sort_by="score")
+            topic_service.get_all_topics(None, None, None, None, 1, 10, 0)
+
+            # Assert
+            score_query = mock_read_query.call_args_list[0][0][0]
+            default_query = mock_read_query.call_args_list[1][0][0]
+            self.assertIn("SUM(r.score)", score_query)
+            self.assertIn("ORDER BY score ASC, t.id ASC", score_query)
+            self.assertNotIn("JOIN replies", default_query)
+            self.assertNotIn("SUM(r.score)", default_query)
+
+    def test_decodeCursor_returns_sortValue_when_encodedForLastActivity(self):
+        # Arrange
+        topic = ViewAllTopics.from_query_result(4, td.TEST_TITLE, False, td.TEST_CREATED_AT, 1, 1, 0,
+                                                td.TEST_CREATED_AT + timedelta(days=1))
+
+        # Act
+        result = topic_service.decode_cursor(topic_service.encode_cursor(topic, "prev", "last_activity"))
+
+        # Assert
+        self.assertEqual({"sort_by": "last_activity", "value": td.TEST_CREATED_AT + timedelta(days=1),
+                          "id": 4, "direction": "prev"}, result)
+
+    def test_decodeCursor_returns_None_when_cursorIsMalformed(self):
+        # Act
+        result = topic_service.decode_cursor("not-a-cursor")
+
+        # Assert
+        self.assertIsNone(result)
+
     def test_buildConditionsAndParams_returns_correctTuple_when_searchIsPresent(self):
         with patch('services.topic_service.user_service') as mock_user_service:
             # Arrange
@@ -141,7 +280,8 @@ class TopicService_Should(unittest.TestCase):
             mock_user_service.is_admin.assert_called_once_with(user_id)
 
     def test_buildConditionsAndParams_returns_correctTuple_when_userNotAdmin(self):
-        with patch('services.topic_service.user_service') as mock_user_service:
+        with (patch('services.topic_service.user_service') as mock_user_service,
+              patch('services.category_service.get_category_visibility') as mock_get_category_visibility):
             # Arrange
             search = None
             category_id = None
@@ -149,8 +289,9 @@ class TopicService_Should(unittest.TestCase):
             is_locked = None
             user_id = 1
             mock_user_service.is_admin.return_value = False
+            mock_get_category_visibility.return_value.readable = frozenset({4, 2})
 
-            expected = (['(c.is_private = 0 OR (c.is_private = 1 AND EXISTS (SELECT 1 FROM category_accesses ca WHERE ca.category_id = t.category_id AND ca.user_id = ?)))'], [1])
+            expected = (['t.category_id IN (?, ?)'], [2, 4])
 
             # Act
             result = topic_service._build_conditions_and_params(
@@ -168,7 +309,7 @@ class TopicService_Should(unittest.TestCase):
         limit = 10
         offset = 0
 
-        expected = ('SELECT * FROM topics t WHERE t.title like ? GROUP BY t.id LIMIT ? OFFSET ?', ['%search%', 10, 0])
+        expected = ('SELECT * FROM topics t WHERE t.title like ? LIMIT ? OFFSET ?', ['%search%', 10, 0])
 
         # Act
         result = topic_service._build_final_query(
@@ -177,62 +318,38 @@ class TopicService_Should(unittest.TestCase):
         # Assert
         self.assertEqual(expected, result)
 
-    def test_sortTopics_returns_sortedList_when_reverseIsFalse(self):
-        # Arrange
-        test_topic_1 = ViewAllTopics.from_query_result(
-            1, td.TEST_TITLE, False, td.TEST_CREATED_AT + timedelta(days=1), 1, 1, 5)
-        test_topic_2 = ViewAllTopics.from_query_result(
-            2, td.TEST_TITLE, True, td.TEST_CREATED_AT, 2, 1, 3)
-
-        topics = [test_topic_1, test_topic_2]
-
-        expected = [test_topic_2, test_topic_1]
-
-        # Act
-        result = topic_service.sort_topics(topics, reverse=False)
-
-        # Assert
-        self.assertEqual(expected, result)
-
-    def test_sortTopics_returns_sortedList_when_reverseIsTrue(self):
-        # Arrange
-        test_topic_1 = ViewAllTopics.from_query_result(
-            1, td.TEST_TITLE, False, td.TEST_CREATED_AT + timedelta(days=1), 1, 1, 5)
-        test_topic_2 = ViewAllTopics.from_query_result(
-            2, td.TEST_TITLE, True, td.TEST_CREATED_AT, 2, 1, 3)
-
-        topics = [test_topic_1, test_topic_2]
+    def test_recalculateReplyCounters_updates_batchOfTopics(self):
+        with (patch('services.topic_service.read_query', return_value=[(3,), (4,), (8,)]) as mock_read_query,
+              patch('services.topic_service.update_query') as mock_update_query):
+            # Act
+            result = topic_service.recalculate_reply_counters(after_id=2, batch_size=3)
 
-        expected = [test_topic_1, test_topic_2]
+            # Assert
+            self.assertEqual(8, result)
+            self.assertEqual((2, 3), mock_read_query.call_args[0][1])
+            self.assertEqual((3, 8, 3, 8), mock_update_query.call_args[0][1])
 
-        # Act
-        result = topic_service.sort_topics(topics, reverse=True)
+    def test_recalculateReplyCounters_returns_None_when_noTopicsLeft(self):
+        with (patch('services.topic_service.read_query', return_value=[]),
+              patch('services.topic_service.update_query') as mock_update_query):
+            # Act
+            result = topic_service.recalculate_reply_counters(after_id=8)
 
-        # Assert
-        self.assertEqual(expected, result)
+            # Assert
+            self.assertIsNone(result)
+            mock_update_query.assert_not_called()
 
     def test_getByIdWithReplies_returns_topic_when_dataIsPresent(self):
         with patch('services.topic_service.read_query') as mock_read_query:
             # Arrange
-            test_data = [
-                (1, td.TEST_TITLE, td.TEST_CONTENT, False, 1, td.TEST_CREATED_AT, None, 1,
-                 1, 'Reply content 1', 1, td.TEST_CREATED_AT, False, 1, 0),
-                (1, td.TEST_TITLE, td.TEST_CONTENT, False, 1, td.TEST_CREATED_AT, None, 1,
-                 2, 'Reply content 2', 1, td.TEST_CREATED_AT, False, 1, 0)]
-
-            mock_read_query.return_value = test_data
-
-            test_topic = Topic.from_query_result(
-                1, td.TEST_TITLE, td.TEST_CONTENT, False,
-                1, td.TEST_CREATED_AT, None, 1)
-
-            test_replies = [
-                Reply.from_query_result(
-                    1, 'Reply content 1', 1,
-                    td.TEST_CREATED_AT, False, 1, 0),
-                Reply.from_query_result(
-                    2, 'Reply content 2', 1,
-                    td.TEST_CREATED_AT, False, 1, 0)]
+            topic_data = (1, td.TEST_TITLE, td.TEST_CONTENT, False, 1, td.TEST_CREATED_AT, None, 1)
+            reply_data = [(1, 'Reply content 1', 1, td.TEST_CREATED_AT, False, 1, 0),
+                          (2, 'Reply content 2', 1, td.TEST_CREATED_AT, False, 1, 0)]
+
+            mock_read_query.side_effect = [[topic_data], reply_data]
+
+            test_topic = Topic.from_query_result(*topic_data)
+            test_replies = [Reply.from_query_result(*row) for row in reply_data]
 
             expected = SingleTopic(topic=test_topic, all_replies=test_replies)
 
@@ -241,7 +358,8 @@ class TopicService_Should(unittest.TestCase):
 
             # Assert
             self.assertEqual(expected, result)
-            mock_read_query.assert_called_once()
+            self.assertEqual(2, mock_read_query.call_count)
+            self.assertNotIn("LIMIT", mock_read_query.call_args[0][0])
 
     def test_getByIdWithReplies_returns_None_when_dataIsNotPresent(self):
         with patch('services.topic_service.read_query') as mock_read_query:
@@ -255,17 +373,58 @@ class TopicService_Should(unittest.TestCase):
             self.assertIsNone(result)
             mock_read_query.assert_called_once()
 
-    def test_createReplyFromRow_returns_reply_when_dataIsPresent(self):
+    def test_getRepliesPage_returns_nextCursor_when_moreRepliesExist(self):
         # Arrange
-        test_data = [1, td.TEST_TITLE, td.TEST_CONTENT, False, 1, td.TEST_CREATED_AT, None, 1,
-                 1, 'Reply content', 1, td.TEST_CREATED_AT, False, 1, 0]
-        expected = Reply.from_query_result(1, 'Reply content', 1, td.TEST_CREATED_AT, False, 1, 0)
+        topic = Topic.from_query_result(1, td.TEST_TITLE, td.TEST_CONTENT, False, 1, td.TEST_CREATED_AT, None, 1)
+        reply_data = [(i, 'Reply content', 1, td.TEST_CREATED_AT, False, 1, 0) for i in (4, 5, 6)]
+        cursor = {"created_at": td.TEST_CREATED_AT, "id": 3}
 
-        # Act
-        result = topic_service._create_reply_from_row(test_data)
+        with patch('services.topic_service.read_query', return_value=reply_data) as mock_read_query:
+            # Act
+            result, next_cursor = topic_service.get_replies_page(topic, 2, cursor)
 
-        # Assert
-        self.assertEqual(expected, result)
+            # Assert
+            query, params = mock_read_query.call_args[0]
+            self.assertIn("(r.created_at > ? OR (r.created_at = ? AND r.id > ?)) "
+                          "ORDER BY r.created_at, r.id LIMIT ?", query)
+            self.assertEqual((1, td.TEST_CREATED_AT, td.TEST_CREATED_AT, 3, 3), params)
+            self.assertEqual([4, 5], [reply.id for reply in result])
+            self.assertEqual({"created_at": td.TEST_CREATED_AT, "id": 5},
+                             topic_service.decode_reply_cursor(next_cursor))
+
+    def test_getRepliesPage_puts_bestReplyFirst_when_bestFirstIsTrue(self):
+        # Arrange
+        topic = Topic.from_query_result(1, td.TEST_TITLE, td.TEST_CONTENT, False, 1, td.TEST_CREATED_AT, 7, 1)
+        best_reply = Reply.from_query_result(7, 'Reply content', 1, td.TEST_CREATED_AT, True, 1, 3)
+        reply_data = [(2, 'Reply content', 1, td.TEST_CREATED_AT, False, 1, 0)]
+
+        with (patch('services.reply_service.get_by_id', return_value=best_reply),
+              patch('services.topic_service.read_query', return_value=reply_data) as mock_read_query):
+            # Act
+            result, next_cursor = topic_service.get_replies_page(topic, 2, best_first=True)
+
+            # Assert
+            query, params = mock_read_query.call_args[0]
+            self.assertIn("r.id <> ?", query)
+            self.assertEqual((1, 7, 3), params)
+            self.assertEqual([7, 2], [reply.id for reply in result])
+            self.assertIsNone(next_cursor)
+
+    def test_streamTopicWithReplies_returns_singleTopicJson(self):
+        # Arrange
+        topic = Topic.from_query_result(1, td.TEST_TITLE, td.TEST_CONTENT, False, 1, td.TEST_CREATED_AT, None, 1)
+        batches = [[(i, 'Reply content', 1, td.TEST_CREATED_AT, False, 1, 0) for i in (1, 2, 3)],
+                   [(3, 'Reply content', 1, td.TEST_CREATED_AT, False, 1, 0)]]
+
+        with patch('services.topic_service.read_query', side_effect=batches) as mock_read_query:
+            # Act
+            result = "".join(topic_service.stream_topic_with_replies(topic, batch_size=2))
+
+            # Assert
+            single_topic = SingleTopic.model_validate_json(result)
+            self.assertEqual(topic, single_topic.topic)
+            self.assertEqual([1, 2, 3], [reply.id for reply in single_topic.all_replies])
+            self.assertEqual(2, mock_read_query.call_count)
 
     def test_getById_returns_topic_when_dataIsPresent(self):
         with patch('services.topic_service.read_query') as mock_read_query:
@@ -350,6 +509,7 @@ class TopicService_Should(unittest.TestCase):
 
             # Assert
             mock_update_query.assert_called_once()
+            self.mock_version_service.bump.assert_called_once_with(self.mock_version_service.TOPIC, test_topic_id)
 
     def test_validateTopicAuthor_returns_true_when_dataIsPresent(self):
         with patch('services.topic_service.read_query') as mock_read_query:
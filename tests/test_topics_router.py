@@ -42,8 +42,13 @@ class TopicsRouter_Should(unittest.TestCase):
             topics_router.get_current_user: lambda: 1
         }
 
+        self.stamp_patch = patch('services.version_service.stamp_with_last_modified',
+                                 return_value=("topic:1@1", None))
+        self.stamp_patch.start()
+
     def tearDown(self) -> None:
         app.dependency_overrides = {}
+        self.stamp_patch.stop()
 
     def test_getAllTopics_return_topics_when_DataIsPresent(self):
         # Arrange
@@ -73,37 +78,85 @@ class TopicsRouter_Should(unittest.TestCase):
 
     def test_getAllTopics_return_topics_whenSortAsc(self):
         # Arrange
-        with (patch('services.topic_service.get_all_topics',
-                   return_value=self.test_topics) as mock_get_all_topics,
-             patch('services.topic_service.sort_topics',
-                   return_value=self.test_topics) as mock_sort_topics):
+        with patch('services.topic_service.get_topics_page',
+                   return_value=(self.test_topics, None, None)) as mock_get_topics_page:
 
             # Act
-            response = client.get("/topics/?sort=asc")
+            response = client.get("/api/topics/?sort=asc")
 
             # Assert
             self.assertEqual(200, response.status_code)
             self.assertIsInstance(response.json(), list)
-            self.assertEqual([t.model_dump() for t in self.test_topics], response.json())
-            mock_get_all_topics.assert_called_once()
-            mock_sort_topics.assert_called_once_with(self.test_topics, reverse=False)
+            self.assertEqual([t.model_dump(mode="json") for t in self.test_topics], response.json())
+            args = mock_get_topics_page.call_args[0]
+            self.assertEqual(("asc", None, "created_at"), args[7:])
 
     def test_getAllTopics_return_topics_when_sortDesc(self):
         # Arrange
-        with (patch('services.topic_service.get_all_topics',
-                   return_value=self.test_topics) as mock_get_all_topics,
-              patch('services.topic_service.sort_topics',
-                  return_value=self.test_topics[::-1]) as mock_sort_topics):
+        with patch('services.topic_service.get_topics_page',
+                   return_value=(self.test_topics[::-1], None, None)) as mock_get_topics_page:
 
             # Act
-            response = client.get("/topics/?sort=desc")
+            response = client.get("/api/topics/?sort=desc")
 
             # Assert
             self.assertEqual(200, response.status_code)
             self.assertIsInstance(response.json(), list)
-            self.assertEqual([t.model_dump() for t in self.test_topics[::-1]], response.json())
-            mock_get_all_topics.assert_called_once()
-            mock_sort_topics.assert_called_once_with(self.test_topics, reverse=True)
+            self.assertEqual([t.model_dump(mode="json") for t in self.test_topics[::-1]], response.json())
+            args = mock_get_topics_page.call_args[0]
+            self.assertEqual(("desc", None, "created_at"), args[7:])
+
+    def test_getAllTopics_sortsDescending_by_default_when_sortByIsNotCreatedAt(self):
+        # Arrange
+        with patch('services.topic_service.get_topics_page',
+                   return_value=(self.test_topics, None, None)) as mock_get_topics_page:
+
+            # Act
+            response = client.get("/api/topics/?sort_by=replies_count")
+
+            # Assert
+            self.assertEqual(200, response.status_code)
+            args = mock_get_topics_page.call_args[0]
+            self.assertEqual(("desc", None, "replies_count"), args[7:])
+
+    def test_getAllTopics_return_badRequest_when_cursorHasOtherSortKey(self):
+        # Arrange
+        cursor = {"sort_by": "created_at", "value": None, "id": 1, "direction": "next"}
+        with (patch('services.topic_service.decode_cursor', return_value=cursor),
+              patch('services.topic_service.get_topics_page') as mock_get_topics_page):
+
+            # Act
+            response = client.get("/api/topics/?sort_by=score&cursor=abc")
+
+            # Assert
+            self.assertEqual(400, response.status_code)
+            mock_get_topics_page.assert_not_called()
+
+    def test_getAllTopics_return_cursorHeaders_when_neighbourPagesExist(self):
+        # Arrange
+        with patch('services.topic_service.get_topics_page',
+                   return_value=(self.test_topics, "next-cursor", "prev-cursor")) as mock_get_topics_page:
+
+            # Act
+            response = client.get("/api/topics/?limit=2")
+
+            # Assert
+            self.assertEqual(200, response.status_code)
+            self.assertEqual([t.model_dump(mode="json") for t in self.test_topics], response.json())
+            self.assertEqual("next-cursor", response.headers["X-Next-Cursor"])
+            self.assertEqual("prev-cursor", response.headers["X-Prev-Cursor"])
+            mock_get_topics_page.assert_called_once_with(None, None, None, None, 1, 2, 0, "asc", None, "created_at")
+
+    def test_getAllTopics_return_badRequest_when_cursorIsInvalid(self):
+        # Arrange
+        with patch('services.topic_service.get_topics_page') as mock_get_topics_page:
+
+            # Act
+            response = client.get("/api/topics/?cursor=invalid")
+
+            # Assert
+            self.assertEqual(400, response.status_code)
+            mock_get_topics_page.assert_not_called()
 
     def test_getAllTopics_return_notFound_when_authorDoesNotExist(self):
         # Arrange
@@ -188,73 +241,143 @@ class TopicsRouter_Should(unittest.TestCase):
 
     def test_getById_return_topic_when_userIsAdmin(self):
         # Arrange
-        with (patch('services.topic_service.get_by_id_with_replies',
-                   return_value=self.topic_with_replies) as mock_get_by_id_with_replies,
+        with (patch('services.topic_service.get_by_id',
+                    return_value=self.test_topics[0]) as mock_get_by_id,
+              patch('services.topic_service.get_replies_page',
+                    return_value=(self.test_replies, "next-cursor")) as mock_get_replies_page,
               patch('services.user_service.is_admin',
                     return_value=True) as mock_is_admin):
             # Act
-            response = client.get("/topics/1")
+            response = client.get("/api/topics/1")
 
             # Assert
             self.assertEqual(200, response.status_code)
             self.assertIsInstance(response.json(), dict)
-            self.assertEqual(self.topic_with_replies.model_dump(), response.json())
-            mock_get_by_id_with_replies.assert_called_once_with(1)
+            self.assertEqual(self.topic_with_replies.model_dump(mode="json"), response.json())
+            self.assertEqual("next-cursor", response.headers["X-Next-Cursor"])
+            mock_get_by_id.assert_called_once_with(1)
+            mock_get_replies_page.assert_called_once_with(self.test_topics[0], 50, None, False)
             mock_is_admin.assert_called_once_with(1)
 
     def test_getById_return_forbiddenAccess_when_userNotAdmin_userHasNoAccess(self):
         # Arrange
-        with (patch('services.topic_service.get_by_id_with_replies',
-                   return_value=self.topic_with_replies) as mock_get_by_id_with_replies,
+        with (patch('services.topic_service.get_by_id',
+                    return_value=self.test_topics[0]) as mock_get_by_id,
+              patch('services.topic_service.get_replies_page') as mock_get_replies_page,
               patch('services.category_service.validate_user_access',
                     return_value=False) as mock_validate_user_access,
               patch('services.user_service.is_admin',
                     return_value=False) as mock_is_admin):
             # Act
-            response = client.get("/topics/1")
+            response = client.get("/api/topics/1")
 
             # Assert
             self.assertEqual(403, response.status_code)
             self.assertIsInstance(response.json(), dict)
             self.assertEqual('User does not have access to this category', response.json()['detail'])
-            mock_get_by_id_with_replies.assert_called_once_with(1)
+            mock_get_by_id.assert_called_once_with(1)
+            mock_get_replies_page.assert_not_called()
             mock_validate_user_access.assert_called_once_with(1, 1)
             mock_is_admin.assert_called_once_with(1)
 
 
     def test_getById_return_topic_when_userNotAdmin_userHasAccess(self):
         # Arrange
-        with (patch('services.topic_service.get_by_id_with_replies',
-                   return_value=self.topic_with_replies) as mock_get_by_id_with_replies,
+        with (patch('services.topic_service.get_by_id',
+                    return_value=self.test_topics[0]) as mock_get_by_id,
+              patch('services.topic_service.get_replies_page',
+                    return_value=(self.test_replies, None)),
               patch('services.category_service.validate_user_access',
                     return_value=True) as mock_validate_user_access,
               patch('services.user_service.is_admin',
                     return_value=False) as mock_is_admin):
             # Act
-            response = client.get("/topics/1")
+            response = client.get("/api/topics/1")
 
-            # Assert
             # Assert
             self.assertEqual(200, response.status_code)
             self.assertIsInstance(response.json(), dict)
-            self.assertEqual(self.topic_with_replies.model_dump(), response.json())
-            mock_get_by_id_with_replies.assert_called_once_with(1)
+            self.assertEqual(self.topic_with_replies.model_dump(mode="json"), response.json())
+            self.assertNotIn("X-Next-Cursor", response.headers)
+            mock_get_by_id.assert_called_once_with(1)
             mock_validate_user_access.assert_called_once_with(1, 1)
             mock_is_admin.assert_called_once_with(1)
 
     def test_getById_return_notFound_when_topicDoesNotExist(self):
         # Arrange
-        with patch('services.topic_service.get_by_id_with_replies',
-                   return_value=None) as mock_get_by_id_with_replies:
+        with patch('services.topic_service.get_by_id',
+                   return_value=None) as mock_get_by_id:
 
             # Act
-            response = client.get("/topics/1")
+            response = client.get("/api/topics/1")
 
             # Assert
             self.assertEqual(404, response.status_code)
             self.assertIsInstance(response.json(), dict)
             self.assertEqual("Topic ID: 1 not found", response.json()['detail'])
-            mock_get_by_id_with_replies.assert_called_once_with(1)
+            mock_get_by_id.assert_called_once_with(1)
+
+    def test_getById_return_badRequest_when_cursorIsInvalid(self):
+        with patch('services.topic_service.get_by_id') as mock_get_by_id:
+            # Act
+            response = client.get("/api/topics/1?cursor=invalid")
+
+            # Assert
+            self.assertEqual(400, response.status_code)
+            mock_get_by_id.assert_not_called()
+
+    def test_getById_return_streamedTopic_when_streamIsTrue(self):
+        # Arrange
+        with (patch('services.topic_service.get_by_id',
+                    return_value=self.test_topics[0]),
+              patch('services.topic_service.get_replies_page',
+                    return_value=(self.test_replies, None)),
+              patch('services.user_service.is_admin',
+                    return_value=True)):
+            # Act
+            response = client.get("/api/topics/1?stream=true")
+
+            # Assert
+            self.assertEqual(200, response.status_code)
+            self.assertEqual("application/json", response.headers["content-type"])
+            self.assertEqual(self.topic_with_replies.model_dump(mode="json"), response.json())
+
+    def test_getById_return_notModified_when_etagMatches_withoutReadingReplies(self):
+        # Arrange
+        with (patch('services.topic_service.get_by_id',
+                    return_value=self.test_topics[0]),
+              patch('services.topic_service.get_replies_page',
+                    return_value=(self.test_replies, None)) as mock_get_replies_page,
+              patch('services.user_service.is_admin',
+                    return_value=True),
+              patch('services.version_service.stamp_with_last_modified',
+                    return_value=("topic:1@3", 1700000000))):
+            etag = client.get("/api/topics/1").headers["ETag"]
+
+            # Act
+            response = client.get("/api/topics/1", headers={"If-None-Match": etag})
+
+            # Assert
+            self.assertEqual(304, response.status_code)
+            self.assertEqual(etag, response.headers["ETag"])
+            self.assertEqual("Tue, 14 Nov 2023 22:13:20 GMT", response.headers["Last-Modified"])
+            mock_get_replies_page.assert_called_once()
+
+    def test_getById_return_topic_when_topicChangedSinceIfModifiedSince(self):
+        # Arrange
+        with (patch('services.topic_service.get_by_id',
+                    return_value=self.test_topics[0]),
+              patch('services.topic_service.get_replies_page',
+                    return_value=(self.test_replies, None)),
+              patch('services.user_service.is_admin',
+                    return_value=True),
+              patch('services.version_service.stamp_with_last_modified',
+                    return_value=("topic:1@4", 1700000001))):
+            # Act
+            response = client.get("/api/topics/1", headers={"If-Modified-Since": "Tue, 14 Nov 2023 22:13:20 GMT"})
+
+            # Assert
+            self.assertEqual(200, response.status_code)
 
     def test_createTopic_return_topic(self):
         # Arrange
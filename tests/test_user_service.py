@@ -1,10 +1,19 @@
 import unittest
 from unittest.mock import patch
+from common import auth
 from schemas.user import UserCreate, User, UserUpdate,UserLogIn
 from services import user_service
 
 
 class UserServiceShould(unittest.TestCase):
+    def setUp(self):
+        auth.invalidate_principal()
+        self.version_service_patch = patch('services.user_service.version_service')
+        self.mock_version_service = self.version_service_patch.start()
+
+    def tearDown(self):
+        self.version_service_patch.stop()
+
     def fake_user(self):
         return User(
             username='validuser',
@@ -15,9 +24,9 @@ class UserServiceShould(unittest.TestCase):
         )
 
     def test_is_admin_returnsTrue_when_dataIsPresent(self):
-        with patch('services.user_service.read_query') as mock_read_query:
+        with patch('common.auth.read_query') as mock_read_query:
             # Arrange
-            mock_read_query.return_value = [(1,)]
+            mock_read_query.return_value = [(1, 1)]
 
             # Act
             result = user_service.is_admin(1)
@@ -27,9 +36,9 @@ class UserServiceShould(unittest.TestCase):
             mock_read_query.assert_called_once()
 
     def test_is_admin_returnsFalse_when_dataIsNotPresent(self):
-        with patch('services.user_service.read_query') as mock_read_query:
+        with patch('common.auth.read_query') as mock_read_query:
             # Arrange
-            mock_read_query.return_value = [(0,)]
+            mock_read_query.return_value = [(1, 0)]
 
             # Act
             result = user_service.is_admin(1)
@@ -38,6 +47,63 @@ class UserServiceShould(unittest.TestCase):
             self.assertFalse(result)
             mock_read_query.assert_called_once()
 
+    def test_is_admin_uses_cachedPrincipal_when_calledTwice(self):
+        with patch('common.auth.read_query') as mock_read_query:
+            # Arrange
+            mock_read_query.return_value = [(1, 1)]
+
+            # Act
+            user_service.is_admin(1)
+            result = user_service.is_admin(1)
+
+            # Assert
+            self.assertTrue(result)
+            mock_read_query.assert_called_once()
+
+    def test_is_admin_returnsFalse_when_userDoesNotExist(self):
+        with patch('common.auth.read_query') as mock_read_query:
+            # Arrange
+            mock_read_query.return_value = []
+
+            # Act
+            result = user_service.is_admin(1)
+
+            # Assert
+            self.assertFalse(result)
+
+    @patch('services.user_service.insert_query')
+    def test_update_invalidates_cachedPrincipal(self, mock_insert_query):
+        with patch('common.auth.read_query') as mock_read_query:
+            # Arrange
+            mock_read_query.side_effect = [[(2, 0)], [(2, 1)]]
+            user_service.is_admin(2)
+
+            # Act
+            user_service.update(2, True)
+            result = user_service.is_admin(2)
+
+            # Assert
+            self.assertTrue(result)
+            self.assertEqual(2, mock_read_query.call_count)
+
+    @patch('services.user_service.insert_query')
+    def test_update_invalidates_cachedPrincipal_again_when_committed(self, mock_insert_query):
+        with patch('common.auth.read_query') as mock_read_query, \
+                patch('services.user_service.on_commit') as mock_on_commit:
+            # Arrange
+            mock_read_query.side_effect = [[(2, 1)], [(2, 0)]]
+            user_service.update(2, False)
+            # a concurrent request caches the old admin status before the change is committed
+            user_service.is_admin(2)
+
+            # Act
+            mock_on_commit.call_args.args[0]()
+            result = user_service.is_admin(2)
+
+            # Assert
+            self.assertFalse(result)
+            self.assertEqual(2, mock_read_query.call_count)
+
     def test_idExists_returns_True_when_dataIsPresent(self):
         with patch('services.user_service.read_query') as mock_read_query:
             # Arrange
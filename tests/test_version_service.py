@@ -0,0 +1,78 @@
+import unittest
+from decimal import Decimal
+from unittest.mock import patch
+
+from services import version_service
+
+
+class VersionService_Should(unittest.TestCase):
+
+    def test_bump_increments_eachEntityOnce_inIdOrder(self):
+        with patch('services.version_service.execute_many') as mock_execute_many:
+            # Act
+            version_service.bump(version_service.INBOX, 7, 2, 7)
+
+            # Assert
+            self.assertIn("ON DUPLICATE KEY UPDATE version = version + 1", mock_execute_many.call_args[0][0])
+            self.assertEqual([("inbox", 2), ("inbox", 7)], mock_execute_many.call_args[0][1])
+
+    def test_stampWithLastModified_includes_replyVersions_of_topics(self):
+        with patch('services.version_service.read_query',
+                   side_effect=[[("topic", 5, 3, 1700000000)], [(5, 12, Decimal(40), 1700000050)]]) as mock_read_query:
+            # Act
+            result = version_service.stamp_with_last_modified(("topic", 5), ("topic", 6))
+
+            # Assert
+            self.assertEqual(("topic:5@3+12.40;topic:6@0+0.0", None), result)
+            self.assertEqual((5, 6), mock_read_query.call_args[0][1])
+
+    def test_stampWithLastModified_returns_latestReplyChange_of_topic(self):
+        with patch('services.version_service.read_query',
+                   side_effect=[[("topic", 5, 3, 1700000000)], [(5, 12, Decimal(40), 1700000050)]]):
+            # Act
+            result = version_service.stamp_with_last_modified(("topic", 5))
+
+            # Assert
+            self.assertEqual(("topic:5@3+12.40", 1700000050), result)
+
+    def test_stampWithLastModified_uses_replies_when_topicCounterNeverChanged(self):
+        with patch('services.version_service.read_query', side_effect=[[], [(5, 1, Decimal(0), 1700000050)]]):
+            # Act
+            _, last_modified = version_service.stamp_with_last_modified(("topic", 5))
+
+            # Assert
+            self.assertEqual(1700000050, last_modified)
+
+    def test_getVersions_returns_zero_when_entityNeverChanged(self):
+        with patch('services.version_service.read_query', return_value=[("topic", 1, 4, 1700000000)]) as mock_read_query:
+            # Act
+            result = version_service.get_versions(("topic", 1), ("topic", 2))
+
+            # Assert
+            self.assertEqual({("topic", 1): (4, 1700000000), ("topic", 2): (0, None)}, result)
+            self.assertEqual(("topic", 1, "topic", 2), mock_read_query.call_args[0][1])
+
+    def test_stamp_returns_versionOfEveryEntity(self):
+        with patch('services.version_service.read_query', return_value=[("categories", 0, 3, 1700000000)]):
+            # Act
+            result = version_service.stamp(("categories", 0), ("inbox", 5))
+
+            # Assert
+            self.assertEqual("categories:0@3;inbox:5@0", result)
+
+    def test_stampWithLastModified_returns_latestChange(self):
+        with patch('services.version_service.read_query',
+                   return_value=[("categories", 0, 3, 1700000000), ("access", 5, 1, 1700000100)]):
+            # Act
+            result = version_service.stamp_with_last_modified(("categories", 0), ("access", 5))
+
+            # Assert
+            self.assertEqual(("categories:0@3;access:5@1", 1700000100), result)
+
+    def test_stampWithLastModified_returns_noLastModified_when_anEntityNeverChanged(self):
+        with patch('services.version_service.read_query', return_value=[("categories", 0, 3, 1700000000)]):
+            # Act
+            _, last_modified = version_service.stamp_with_last_modified(("categories", 0), ("access", 5))
+
+            # Assert
+            self.assertIsNone(last_modified)
@@ -0,0 +1,153 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from services.vote_buffer import VoteBuffer, VoteLogInUse
+
+
+class VoteBuffer_Should(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.directory.name, "votes.log")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_flush_writes_lastVote_per_replyAndUser(self):
+        # Arrange
+        writer = Mock()
+        buffer = VoteBuffer(writer, flush_interval=60)
+        buffer.add(1, 2, 1)
+        buffer.add(1, 2, 0)
+        buffer.add(1, 3, None)
+
+        # Act
+        result = buffer.flush()
+
+        # Assert
+        self.assertEqual(2, result)
+        writer.assert_called_once_with({(1, 2): 0, (1, 3): None})
+        self.assertEqual(0, buffer.flush())
+
+    def test_get_returns_pendingVote_until_flushed(self):
+        # Arrange
+        buffer = VoteBuffer(Mock(), flush_interval=60)
+        buffer.add(1, 2, None)
+
+        # Act & Assert
+        self.assertIsNone(buffer.get(1, 2, "missing"))
+        self.assertEqual({1: None}, buffer.pending_for_user(2))
+        buffer.flush()
+        self.assertEqual("missing", buffer.get(1, 2, "missing"))
+
+    def test_flush_keepsVotes_when_writeFails(self):
+        # Arrange
+        writer = Mock(side_effect=[RuntimeError(), None])
+        buffer = VoteBuffer(writer, flush_interval=60)
+        buffer.add(1, 2, 1)
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            buffer.flush()
+        buffer.add(1, 3, 0)
+        buffer.flush()
+
+        # Assert
+        writer.assert_called_with({(1, 2): 1, (1, 3): 0})
+
+    def test_start_replays_unflushedVotes_from_log(self):
+        # Arrange
+        crashed = VoteBuffer(Mock(side_effect=RuntimeError()), flush_interval=60, log_path=self.log_path)
+        crashed.start()
+        crashed.add(1, 2, 1)
+        with self.assertRaises(RuntimeError):
+            crashed.flush()
+        crashed.add(1, 3, 0)
+        # the process dies: nothing else is flushed
+        crashed._stopped.set()
+        crashed._log.close()
+        # the OS releases the lock of a dead process
+        crashed._log_lock.close()
+        writer = Mock()
+
+        # Act
+        restarted = VoteBuffer(writer, flush_interval=60, log_path=self.log_path)
+        restarted.start()
+        restarted.stop()
+
+        # Assert
+        writer.assert_called_once_with({(1, 2): 1, (1, 3): 0})
+        self.assertFalse(os.path.exists(self.log_path + ".flushing"))
+
+    def test_flush_dropsRejectedVote_after_maxFailures(self):
+        # Arrange
+        def writer(votes):
+            if (9, 2) in votes:
+                raise RuntimeError("reply 9 was deleted")
+        buffer = VoteBuffer(Mock(side_effect=writer), flush_interval=60, max_failures=2)
+        buffer.add(9, 2, 1)
+        buffer.add(1, 2, 0)
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+
+        # Act
+        with self.assertLogs("services.vote_buffer", level="ERROR"):
+            result = buffer.flush()
+
+        # Assert
+        self.assertEqual(1, result)
+        self.assertEqual({}, buffer.pending_for_user(2))
+
+    def test_flush_keepsVotes_when_everyVoteIsRejected(self):
+        # Arrange
+        buffer = VoteBuffer(Mock(side_effect=RuntimeError()), flush_interval=60, max_failures=1)
+        buffer.add(1, 2, 1)
+        buffer.add(1, 3, 0)
+        with self.assertRaises(RuntimeError):
+            buffer.flush()
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            buffer.flush()
+
+        # Assert
+        self.assertEqual(1, buffer.get(1, 2))
+        self.assertEqual(0, buffer.get(1, 3))
+
+    def test_start_raises_when_logIsHeldByAnotherBuffer(self):
+        # Arrange
+        running = VoteBuffer(Mock(), flush_interval=60, log_path=self.log_path)
+        running.start()
+
+        # Act & Assert
+        try:
+            with self.assertRaises(VoteLogInUse):
+                VoteBuffer(Mock(), flush_interval=60, log_path=self.log_path).start()
+        finally:
+            running.stop()
+
+    def test_adoptLog_takesOver_votesOf_stoppedBuffer(self):
+        # Arrange
+        other_log_path = self.log_path + ".1"
+        stopped = VoteBuffer(Mock(side_effect=RuntimeError()), flush_interval=60, log_path=other_log_path)
+        stopped.start()
+        stopped.add(1, 2, 1)
+        # the process dies
+        stopped._stopped.set()
+        stopped._log.close()
+        stopped._log_lock.close()
+        writer = Mock()
+        buffer = VoteBuffer(writer, flush_interval=60, log_path=self.log_path)
+        buffer.start()
+
+        # Act
+        result = buffer.adopt_log(other_log_path)
+        buffer.stop()
+
+        # Assert
+        self.assertTrue(result)
+        writer.assert_called_once_with({(1, 2): 1})
+        self.assertFalse(os.path.exists(other_log_path))
@@ -1,7 +1,10 @@
+import os
+import tempfile
 import unittest
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 from services import vote_service
+from services.vote_buffer import VoteBuffer
 
 
 class VoteService_Should(unittest.TestCase):
@@ -28,29 +31,135 @@ class VoteService_Should(unittest.TestCase):
             # Assert
             self.assertEqual(None, result)
 
-    def test_createVote_calls_insertQuery(self):
+    def test_castVote_return_None_and_incrementsCounter_when_voteIsInserted(self):
         # Arrange
-        with patch('services.vote_service.insert_query') as mock_insert_query:
+        with patch('services.vote_service.upsert_query', return_value=1) as mock_upsert_query, \
+                patch('services.vote_service.update_query') as mock_update_query:
             # Act
-            vote_service.create_vote(1, 1, 1)
+            result = vote_service.cast_vote(1, 1, 1)
 
             # Assert
-            mock_insert_query.assert_called_once()
+            self.assertIsNone(result)
+            self.assertIn("ON DUPLICATE KEY UPDATE", mock_upsert_query.call_args[0][0])
+            self.assertEqual((1, 0, 1), mock_update_query.call_args[0][1])
+            self.assertIn("version = version + 1", mock_update_query.call_args[0][0])
 
-    def test_updateVote_calls_updateQuery(self):
+    def test_castVote_return_previousVote_and_movesCounters_when_voteIsChanged(self):
         # Arrange
-        with patch('services.vote_service.update_query') as mock_update_query:
+        with patch('services.vote_service.upsert_query', return_value=2), \
+                patch('services.vote_service.update_query') as mock_update_query:
             # Act
-            vote_service.update_vote(1, 1, 1)
+            result = vote_service.cast_vote(1, 1, 1)
 
             # Assert
-            mock_update_query.assert_called_once()
+            self.assertEqual(0, result)
+            self.assertEqual((1, -1, 1), mock_update_query.call_args[0][1])
+
+    def test_castVote_doesNotChangeCounters_when_voteTypeIsUnchanged(self):
+        # Arrange
+        with patch('services.vote_service.upsert_query', return_value=0), \
+                patch('services.vote_service.update_query') as mock_update_query:
+            # Act
+            result = vote_service.cast_vote(1, 1, 1)
+
+            # Assert
+            self.assertEqual(1, result)
+            mock_update_query.assert_not_called()
+
+    def test_getVotesForTopic_return_voteTypeByReplyId(self):
+        # Arrange
+        with patch('services.vote_service.read_query', return_value=[(3, 1), (4, 0)]) as mock_read_query:
+            # Act
+            result = vote_service.get_votes_for_topic(1, 2)
+
+            # Assert
+            self.assertEqual({3: 1, 4: 0}, result)
+            self.assertEqual((1, 2), mock_read_query.call_args[0][1])
 
     def test_deleteVote_calls_deleteQuery(self):
         # Arrange
-        with patch('services.vote_service.delete_query') as mock_delete_query:
+        with patch('services.vote_service.read_query', return_value=[(0,)]), \
+                patch('services.vote_service.delete_query') as mock_delete_query, \
+                patch('services.vote_service.update_query') as mock_update_query:
+            # Act
+            result = vote_service.delete_vote(1, 1)
+
+            # Assert
+            self.assertEqual(0, result)
+            mock_delete_query.assert_called_once()
+            self.assertEqual((0, -1, 1), mock_update_query.call_args[0][1])
+
+    def test_reconcileReplyCounters_fixes_driftedReplies(self):
+        # Arrange
+        with patch('services.vote_service.read_query',
+                   side_effect=[[(1,), (2,), (5,)], [(2,)]]) as mock_read_query, \
+                patch('services.vote_service.update_query') as mock_update_query:
+            # Act
+            last_id, drifted_ids = vote_service.reconcile_reply_counters(0, 3)
+
+            # Assert
+            self.assertEqual(5, last_id)
+            self.assertEqual([2], drifted_ids)
+            self.assertEqual((1, 5), mock_read_query.call_args[0][1])
+            self.assertEqual((2,), mock_update_query.call_args[0][1])
+
+    def test_reconcileReplyCounters_doesNotUpdate_when_noDrift(self):
+        # Arrange
+        with patch('services.vote_service.read_query', side_effect=[[(1,)], []]), \
+                patch('services.vote_service.update_query') as mock_update_query:
             # Act
-            vote_service.delete_vote(1, 1)
+            last_id, drifted_ids = vote_service.reconcile_reply_counters()
+
+            # Assert
+            self.assertEqual(1, last_id)
+            self.assertEqual([], drifted_ids)
+            mock_update_query.assert_not_called()
+
+    def test_writeVotes_adjustsCounters_against_storedVotes(self):
+        # Arrange
+        stored = [(1, 2, 0), (1, 3, 1)]
+        with patch('services.vote_service.read_query', return_value=stored), \
+                patch('services.vote_service.execute_many') as mock_execute_many:
+            # Act
+            vote_service.write_votes({(1, 2): 1, (1, 3): None, (2, 4): 0, (2, 5): None})
+
+            # Assert
+            upserts, deletes, counters = [call.args[1] for call in mock_execute_many.call_args_list]
+            self.assertEqual([(1, True, 2), (2, False, 4)], upserts)
+            self.assertEqual([(1, 3)], deletes)
+            self.assertEqual([(0, -1, 1), (0, 1, 2)], counters)
+
+    def test_castVote_buffersVote_and_readsItBack_when_writeBehindIsOn(self):
+        # Arrange
+        buffer = VoteBuffer(Mock(), flush_interval=60)
+        with patch('services.vote_service._vote_buffer', buffer), \
+                patch('services.vote_service.read_query', return_value=[]), \
+                patch('services.vote_service.upsert_query') as mock_upsert_query:
+            # Act
+            created = vote_service.cast_vote(1, 1, 2)
+            repeated = vote_service.cast_vote(1, 1, 2)
+            removed = vote_service.delete_vote(1, 2)
+
+            # Assert
+            self.assertIsNone(created)
+            self.assertEqual(1, repeated)
+            self.assertEqual(1, removed)
+            self.assertIsNone(vote_service.get_vote(1, 2))
+            mock_upsert_query.assert_not_called()
+
+    def test_startVoteBuffer_takes_nextFreeLog_when_logIsHeld(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, "votes.log")
+            running = VoteBuffer(Mock(), flush_interval=60, log_path=log_path)
+            running.start()
+            with patch('services.vote_service._WRITE_BEHIND_LOG', log_path):
+                # Act
+                buffer = vote_service._start_vote_buffer()
 
             # Assert
-            mock_delete_query.assert_called_once()
\ No newline at end of file
+            try:
+                self.assertEqual(log_path + ".1", buffer._log_path)
+            finally:
+                buffer.stop()
+                running.stop()
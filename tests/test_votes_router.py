@@ -53,12 +53,10 @@ class VotesRouter_Should(unittest.TestCase):
                     return_value=fake_category()) as mock_category_service,
               patch("services.user_service.is_admin",
                     return_value=True) as mock_user_service,
-              patch("services.vote_service.get_vote",
-                    return_value=0) as mock_get_vote,
-              patch("services.vote_service.update_vote",
-                    return_value=None) as mock_update_vote):
+              patch("services.vote_service.cast_vote",
+                    return_value=0) as mock_cast_vote):
 
-            response = client.put("/votes/1?vote_type=upvote")
+            response = client.put("/api/votes/1?vote_type=upvote")
 
             self.assertEqual(200, response.status_code)
             self.assertEqual("Vote for reply ID 1 is successfully changed to upvote", response.json()["detail"])
@@ -66,8 +64,7 @@ class VotesRouter_Should(unittest.TestCase):
             mock_topic_service.assert_called_once()
             mock_category_service.assert_called_once()
             mock_user_service.assert_called_once()
-            mock_get_vote.assert_called_once()
-            mock_update_vote.assert_called_once()
+            mock_cast_vote.assert_called_once()
 
     def test_vote_return_badRequest_when_sameVote_voteExists(self):
         with (patch("services.reply_service.get_by_id",
@@ -78,10 +75,10 @@ class VotesRouter_Should(unittest.TestCase):
                     return_value=fake_category()) as mock_category_service,
               patch("services.user_service.is_admin",
                     return_value=True) as mock_user_service,
-              patch("services.vote_service.get_vote",
-                    return_value=1) as mock_get_vote):
+              patch("services.vote_service.cast_vote",
+                    return_value=1) as mock_cast_vote):
 
-            response = client.put("/votes/1?vote_type=upvote")
+            response = client.put("/api/votes/1?vote_type=upvote")
 
             self.assertEqual(400, response.status_code)
             self.assertEqual("User ID: 1 has already voted for reply ID: 1", response.json()["detail"])
@@ -89,7 +86,7 @@ class VotesRouter_Should(unittest.TestCase):
             mock_topic_service.assert_called_once()
             mock_category_service.assert_called_once()
             mock_user_service.assert_called_once()
-            mock_get_vote.assert_called_once()
+            mock_cast_vote.assert_called_once()
 
     def test_vote_return_created_when_voteDoesNotExist(self):
         with (patch("services.reply_service.get_by_id",
@@ -100,12 +97,10 @@ class VotesRouter_Should(unittest.TestCase):
                     return_value=fake_category()) as mock_category_service,
               patch("services.user_service.is_admin",
                     return_value=True) as mock_user_service,
-              patch("services.vote_service.get_vote",
-                    return_value=None) as mock_get_vote,
-              patch("services.vote_service.create_vote",
-                    return_value=None) as mock_create_vote):
+              patch("services.vote_service.cast_vote",
+                    return_value=None) as mock_cast_vote):
 
-            response = client.put("/votes/1?vote_type=upvote")
+            response = client.put("/api/votes/1?vote_type=upvote")
 
             self.assertEqual(201, response.status_code)
             self.assertEqual("User ID: 1 voted successfully for reply ID: 1", response.json()["detail"])
@@ -113,8 +108,7 @@ class VotesRouter_Should(unittest.TestCase):
             mock_topic_service.assert_called_once()
             mock_category_service.assert_called_once()
             mock_user_service.assert_called_once()
-            mock_get_vote.assert_called_once()
-            mock_create_vote.assert_called_once()
+            mock_cast_vote.assert_called_once()
 
     def test_vote_return_forbiddenAccess_when_userNotAdmin_userHasNoAccess(self):
         with (patch("services.reply_service.get_by_id",
@@ -128,7 +122,7 @@ class VotesRouter_Should(unittest.TestCase):
               patch("services.category_service.validate_user_access",
                     return_value=False) as mock_validate_user_access):
 
-            response = client.put("/votes/1?vote_type=upvote")
+            response = client.put("/api/votes/1?vote_type=upvote")
 
             self.assertEqual(403, response.status_code)
             self.assertEqual("User does not have access to this category", response.json()["detail"])
@@ -149,12 +143,10 @@ class VotesRouter_Should(unittest.TestCase):
                     return_value=False) as mock_user_service,
               patch("services.category_service.validate_user_access",
                     return_value=True) as mock_validate_user_access,
-              patch("services.vote_service.get_vote",
-                    return_value=None) as mock_get_vote,
-              patch("services.vote_service.create_vote",
-                    return_value=None) as mock_create_vote):
+              patch("services.vote_service.cast_vote",
+                    return_value=None) as mock_cast_vote):
 
-            response = client.put("/votes/1?vote_type=upvote")
+            response = client.put("/api/votes/1?vote_type=upvote")
 
             self.assertEqual(201, response.status_code)
             self.assertEqual("User ID: 1 voted successfully for reply ID: 1", response.json()["detail"])
@@ -163,8 +155,7 @@ class VotesRouter_Should(unittest.TestCase):
             mock_category_service.assert_called_once()
             mock_user_service.assert_called_once()
             mock_validate_user_access.assert_called_once()
-            mock_get_vote.assert_called_once()
-            mock_create_vote.assert_called_once()
+            mock_cast_vote.assert_called_once()
 
     def test_vote_return_locked_when_topicIsLocked(self):
         with (patch("services.reply_service.get_by_id",
@@ -172,7 +163,7 @@ class VotesRouter_Should(unittest.TestCase):
               patch("services.topic_service.get_by_id",
                     return_value=fake_topic(is_locked=True)) as mock_topic_service):
 
-            response = client.put("/votes/1?vote_type=upvote")
+            response = client.put("/api/votes/1?vote_type=upvote")
 
             self.assertEqual(400, response.status_code)
             self.assertEqual("Topic ID: 1 is locked", response.json()["detail"])
@@ -183,7 +174,7 @@ class VotesRouter_Should(unittest.TestCase):
         with (patch("services.reply_service.get_by_id",
                     return_value=None) as mock_reply_service):
 
-            response = client.put("/votes/1?vote_type=upvote")
+            response = client.put("/api/votes/1?vote_type=upvote")
 
             self.assertEqual(404, response.status_code)
             self.assertEqual("Reply ID: 1 not found", response.json()["detail"])
@@ -198,12 +189,10 @@ class VotesRouter_Should(unittest.TestCase):
                     return_value=fake_category()) as mock_category_service,
               patch("services.user_service.is_admin",
                     return_value=True) as mock_user_service,
-              patch("services.vote_service.get_vote",
-                    return_value=1) as mock_get_vote,
               patch("services.vote_service.delete_vote",
-                    return_value=None) as mock_delete_vote):
+                    return_value=1) as mock_delete_vote):
 
-            response = client.delete("/votes/1")
+            response = client.delete("/api/votes/1")
 
             self.assertEqual(200, response.status_code)
             self.assertEqual("Vote for reply ID 1 removed successfully", response.json()["detail"])
@@ -211,7 +200,6 @@ class VotesRouter_Should(unittest.TestCase):
             mock_topic_service.assert_called_once()
             mock_category_service.assert_called_once()
             mock_user_service.assert_called_once()
-            mock_get_vote.assert_called_once()
             mock_delete_vote.assert_called_once()
 
     def test_deleteVote_return_badRequest_when_voteDoesNotExist(self):
@@ -223,10 +211,10 @@ class VotesRouter_Should(unittest.TestCase):
                     return_value=fake_category()) as mock_category_service,
               patch("services.user_service.is_admin",
                     return_value=True) as mock_user_service,
-              patch("services.vote_service.get_vote",
-                    return_value=None) as mock_get_vote):
+              patch("services.vote_service.delete_vote",
+                    return_value=None) as mock_delete_vote):
 
-            response = client.delete("/votes/1")
+            response = client.delete("/api/votes/1")
 
             self.assertEqual(400, response.status_code)
             self.assertEqual("User ID: 1 has not voted for reply ID: 1", response.json()["detail"])
@@ -234,7 +222,7 @@ class VotesRouter_Should(unittest.TestCase):
             mock_topic_service.assert_called_once()
             mock_category_service.assert_called_once()
             mock_user_service.assert_called_once()
-            mock_get_vote.assert_called_once()
+            mock_delete_vote.assert_called_once()
 
     def test_deleteVote_return_forbiddenAccess_when_userNotAdmin_userHasNoAccess(self):
         with (patch("services.reply_service.get_by_id",
@@ -248,7 +236,7 @@ class VotesRouter_Should(unittest.TestCase):
               patch("services.category_service.validate_user_access",
                     return_value=False) as mock_validate_user_access):
 
-            response = client.delete("/votes/1")
+            response = client.delete("/api/votes/1")
 
             self.assertEqual(403, response.status_code)
             self.assertEqual("User does not have access to this category", response.json()["detail"])
@@ -269,12 +257,10 @@ class VotesRouter_Should(unittest.TestCase):
                     return_value=False) as mock_user_service,
               patch("services.category_service.validate_user_access",
                     return_value=True) as mock_validate_user_access,
-              patch("services.vote_service.get_vote",
-                    return_value=1) as mock_get_vote,
               patch("services.vote_service.delete_vote",
-                    return_value=None) as mock_delete_vote):
+                    return_value=1) as mock_delete_vote):
 
-            response = client.delete("/votes/1")
+            response = client.delete("/api/votes/1")
 
             self.assertEqual(200, response.status_code)
             self.assertEqual("Vote for reply ID 1 removed successfully", response.json()["detail"])
@@ -283,7 +269,6 @@ class VotesRouter_Should(unittest.TestCase):
             mock_category_service.assert_called_once()
             mock_user_service.assert_called_once()
             mock_validate_user_access.assert_called_once()
-            mock_get_vote.assert_called_once()
             mock_delete_vote.assert_called_once()
 
     def test_deleteVote_return_locked_when_topicIsLocked(self):
@@ -292,7 +277,7 @@ class VotesRouter_Should(unittest.TestCase):
               patch("services.topic_service.get_by_id",
                     return_value=fake_topic(id=1, is_locked=True)) as mock_topic_service):
 
-            response = client.delete("/votes/1")
+            response = client.delete("/api/votes/1")
 
             self.assertEqual(400, response.status_code)
             self.assertEqual("Topic ID: 1 is locked", response.json()["detail"])
@@ -303,8 +288,32 @@ class VotesRouter_Should(unittest.TestCase):
         with (patch("services.reply_service.get_by_id",
                     return_value=None) as mock_reply_service):
 
-            response = client.delete("/votes/1")
+            response = client.delete("/api/votes/1")
 
             self.assertEqual(404, response.status_code)
             self.assertEqual("Reply ID: 1 not found", response.json()["detail"])
-            mock_reply_service.assert_called_once()
\ No newline at end of file
+            mock_reply_service.assert_called_once()
+    def test_viewTopicVotes_return_votesByReplyId(self):
+        with (patch("services.topic_service.get_by_id",
+                    return_value=fake_topic()) as mock_topic_service,
+              patch("services.category_service.get_by_id",
+                    return_value=fake_category()),
+              patch("services.user_service.is_admin",
+                    return_value=True),
+              patch("services.vote_service.get_votes_for_topic",
+                    return_value={1: 1, 2: 0}) as mock_get_votes_for_topic):
+
+            response = client.get("/api/votes/topics/1")
+
+            self.assertEqual(200, response.status_code)
+            self.assertEqual({"1": "upvote", "2": "downvote"}, response.json())
+            mock_topic_service.assert_called_once_with(1)
+            mock_get_votes_for_topic.assert_called_once_with(1, 1)
+
+    def test_viewTopicVotes_return_notFound_when_topicDoesNotExist(self):
+        with patch("services.topic_service.get_by_id", return_value=None):
+
+            response = client.get("/api/votes/topics/1")
+
+            self.assertEqual(404, response.status_code)
+            self.assertEqual("Topic ID: 1 not found", response.json()["detail"])